@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+benchmark.py - วัดความเร็วของ ColorExtractor.process_file (main.py) และ ExcelProcessor.process (main2.py)
+ด้วย workbook สังเคราะห์จาก synthetic_xlsx.py และ PDF modes ด้วยใบเสนอราคาสังเคราะห์จาก synthetic_pdf.py:
+PDFExtractorWeb.extract_data_from_file (main3.py), process_text_vs_pdf_comparison และ
+process_pdf_vs_pdf_comparison (main4.py)
+
+แต่ละ case รันใน process ใหม่ (peak RSS ไม่ปนกัน) และรายงาน:
+    - เวลารวมและเวลาแต่ละ phase (วัดจาก method หลักของแต่ละ engine)
+    - throughput เป็น cells/s (Excel: นับเซลล์ <c> ทั้งหมดใน sheet XML รวมเซลล์ว่างที่มี format)
+      หรือ pages/s และ items/s (PDF: หน้าทั้งหมดที่อ่าน, รายการ GLASS ที่ได้/ที่ถูกเปรียบเทียบ)
+    - peak RSS
+ผลลัพธ์ต่อท้ายลงไฟล์ JSON history แล้วเทียบกับครั้งก่อนหน้าเพื่อให้เห็น regression
+
+Example:
+    python benchmark.py                       # default suite
+    python benchmark.py --quick --label "before refactor"
+    python benchmark.py --cases joint-small matrix-small --workers 1
+    python benchmark.py --cases pdf-small compare-text-small compare-pdf-small --no-save
+"""
+
+import argparse
+import contextlib
+import functools
+import json
+import os
+import platform
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from datetime import datetime
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+DEFAULT_HISTORY = BASE_DIR / "benchmark_history.json"
+
+# case -> (engine, generator params) - ขนาด "quick" ใช้ตรวจเร็วๆ ระหว่างพัฒนา
+SUITE = {
+    "matrix-small": ("matrix", dict(sheets=5, heights=20, widths=25, thickness=2, palette=5)),
+    "matrix-large": ("matrix", dict(sheets=30, heights=60, widths=80, thickness=4, palette=12)),
+    "matrix-wide-palette": ("matrix", dict(sheets=10, heights=40, widths=40, thickness=2, palette=200)),
+    "matrix-used-range": ("matrix", dict(sheets=5, heights=20, widths=25, thickness=2, palette=5,
+                                         styled_blank_rows=5000, far_row=1_048_576)),
+    "joint-small": ("joint", dict(tables=10, rows=30)),
+    "joint-large": ("joint", dict(tables=30, rows=150)),
+    "joint-used-range": ("joint", dict(tables=10, rows=30, styled_blank_rows=2000)),
+    "pdf-small": ("pdf", dict(pages=10, rows=20)),
+    "pdf-large": ("pdf", dict(pages=150, rows=30)),
+    "compare-text-small": ("compare-text", dict(pages=10, rows=20, mismatch=0.05)),
+    "compare-text-large": ("compare-text", dict(pages=150, rows=30, mismatch=0.05)),
+    "compare-pdf-small": ("compare-pdf", dict(pages=10, rows=20, mismatch=0.05)),
+    "compare-pdf-large": ("compare-pdf", dict(pages=150, rows=30, mismatch=0.05)),
+}
+QUICK_CASES = ["matrix-small", "matrix-used-range", "joint-small", "pdf-small", "compare-pdf-small"]
+PDF_ENGINES = ("pdf", "compare-text", "compare-pdf")
+# ตั้งค่าเดียวกับ server.py (PDF_TABLE_TEMPLATE=1 เพื่อวัดแบบใช้ TableTemplate)
+PDF_TABLE_TEMPLATE = os.environ.get("PDF_TABLE_TEMPLATE", "0") == "1"
+
+# phase -> method ที่วัดเวลา (เวลาที่ไม่อยู่ใน phase ใดจะรายงานเป็น "other")
+MATRIX_PHASES = {
+    "hash": [("ColorExtractor", "sheet_cache_key")],
+    "extract": [("ColorExtractor", "extract_sheet")],
+    "merge": [("ColorExtractor", "merge_sheet_results")],
+    "write": [(None, "write_price_store"), (None, "write_records")],
+}
+JOINT_PHASES = {
+    "open": [("ExcelProcessor", "get_optimized_workbook")],
+    "read": [("ExcelProcessor", "read_sheet_optimized")],
+    "tables": [("ExcelProcessor", "process_table")],
+    "descriptions": [("ExcelProcessor", "load_descriptions_from_sheet2"),
+                     ("ExcelProcessor", "update_type_descriptions")],
+    "write": [("ExcelProcessor", "save_results")],
+}
+# owner แบบ dotted path ไล่ getattr จาก module ของ engine (เช่น main3.pdfplumber.page.Page)
+PDF_PHASES = {
+    "probe": [(None, "page_may_have_items")],
+    "tables": [("pdfplumber.page.Page", "extract_tables"), ("TableTemplate", "extract_tables")],
+    "rows": [("PDFExtractorWeb", "_process_structured_table"), ("PDFExtractorWeb", "_extract_product_info")],
+}
+COMPARE_PHASES = {
+    "project_info": [(None, "extract_project_info_from_pdf")],
+    "tables": [("PDFExtractor", "extract_structured_data_from_pdf")],
+    "text": [(None, "extract_text_from_pdf")],
+    "parse": [(None, "parse_txt_items"), (None, "parse_pdf_items")],
+    "compare": [(None, "compare_items")],
+}
+
+_CELL_TAG = re.compile(rb"<c[ >]")
+
+
+def count_cells(path) -> int:
+    """นับเซลล์ (<c>) ใน worksheet XML ทุกชีตแบบ streaming"""
+    total = 0
+    with zipfile.ZipFile(path) as zf:
+        for name in zf.namelist():
+            if not (name.startswith("xl/worksheets/") and name.endswith(".xml")):
+                continue
+            tail = b""
+            with zf.open(name) as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    data = tail + chunk
+                    total += len(_CELL_TAG.findall(data))
+                    # tag ยาว 3 bytes - เก็บ 2 bytes สุดท้ายไว้ต่อกับ chunk ถัดไป (tag ที่ถูกตัดกลาง)
+                    tail = data[-2:]
+    return total
+
+
+class PhaseTimer:
+    """จับเวลาแบบ exclusive: นับเฉพาะ phase นอกสุด (phase ที่เรียกซ้อนกันไม่นับซ้ำ)"""
+
+    def __init__(self):
+        self.totals = {}
+        self._depth = 0
+
+    def wrap(self, phase, func):
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            if self._depth:
+                return func(*args, **kwargs)
+            self._depth += 1
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.totals[phase] = self.totals.get(phase, 0.0) + time.perf_counter() - start
+                self._depth -= 1
+        return timed
+
+    def install(self, module, phases):
+        for phase, targets in phases.items():
+            for owner_name, attr in targets:
+                owner = functools.reduce(getattr, owner_name.split("."), module) if owner_name else module
+                func = getattr(owner, attr, None)
+                if func is not None:
+                    setattr(owner, attr, self.wrap(phase, func))
+
+
+def peak_rss_mb() -> float:
+    """peak RSS ของ process นี้และ worker processes
+
+    บน Linux ใช้ VmHWM เพราะ ru_maxrss ของ RUSAGE_SELF ติดค่าสูงสุดของ process แม่มาข้าม exec
+    """
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024  # ru_maxrss เป็น bytes บน macOS, KB บน Linux
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale
+    try:
+        with open("/proc/self/status", "r") as f:
+            own = next(int(line.split()[1]) for line in f if line.startswith("VmHWM:")) / 1024
+    except (OSError, StopIteration):
+        own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+    return round(max(own, children), 1)
+
+
+def companion_paths(input_file: str):
+    """ไฟล์คู่ของใบเสนอราคา PDF: (ใบสั่งกระจก PDF, ข้อความ TXT) ที่ measure สร้างไว้ข้างกัน"""
+    stem = os.path.splitext(input_file)[0]
+    return f"{stem}_order.pdf", f"{stem}_glass.txt"
+
+
+def run_case(engine: str, input_file: str, work_dir: str, workers: int, output_format: str) -> dict:
+    """รัน engine หนึ่งครั้งใน process ปัจจุบัน (เรียกจาก child process ของ benchmark)"""
+    sys.path.insert(0, str(BASE_DIR))
+    timer = PhaseTimer()
+    import_rss = peak_rss_mb()
+    items = None
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        if engine == "matrix":
+            import main
+            timer.install(main, MATRIX_PHASES)
+            start = time.perf_counter()
+            main.ColorExtractor("bench").process_file(input_file, work_dir, workers=workers,
+                                                      output_format=output_format)
+        elif engine == "pdf":
+            import main3
+            timer.install(main3, PDF_PHASES)
+            start = time.perf_counter()
+            result = main3.PDFExtractorWeb(table_template=PDF_TABLE_TEMPLATE).extract_data_from_file(
+                input_file, None, workers)
+            if "error" in result:
+                raise RuntimeError(result["error"])
+            items = result["total_glass"]
+        elif engine in ("compare-text", "compare-pdf"):
+            import main4
+            timer.install(main4, COMPARE_PHASES)
+            order_pdf, glass_txt = companion_paths(input_file)
+            start = time.perf_counter()
+            if engine == "compare-text":
+                with open(glass_txt, "r", encoding="utf-8") as f:
+                    result = main4.process_text_vs_pdf_comparison(f.read(), order_pdf, 1)
+            else:
+                result = main4.process_pdf_vs_pdf_comparison(input_file, order_pdf, 1,
+                                                             table_template=PDF_TABLE_TEMPLATE)
+            if not result.get("success"):
+                raise RuntimeError(result.get("error"))
+            info = result["parsing_info"]
+            items = info["source_items_detected"] + info["target_items_detected"]
+        else:
+            import logging
+            logging.disable(logging.INFO)
+            import main2
+            timer.install(main2, JOINT_PHASES)
+            start = time.perf_counter()
+            if not main2.ExcelProcessor(input_file).process("bench", output_format):
+                raise RuntimeError("ExcelProcessor.process failed")
+        elapsed = time.perf_counter() - start
+
+    phases = {name: round(value, 4) for name, value in timer.totals.items()}
+    phases["other"] = round(max(elapsed - sum(timer.totals.values()), 0.0), 4)
+    return {"seconds": round(elapsed, 4), "phases": phases, "items": items,
+            "import_rss_mb": import_rss, "peak_rss_mb": peak_rss_mb()}
+
+
+def build_pdf_inputs(input_file: str, engine: str, params: dict) -> int:
+    """สร้างใบเสนอราคา (และใบสั่งกระจก/TXT สำหรับ compare) - คืนจำนวนหน้า PDF ที่ engine อ่าน"""
+    from synthetic_pdf import build_glass_order_pdf, build_quotation_pdf, glass_items, glass_text, make_quotation
+
+    params = dict(params)
+    mismatch = params.pop("mismatch", 0.0)
+    order_pdf, glass_txt = companion_paths(input_file)
+    quotation_pages = build_quotation_pdf(input_file, **params)["pages"]
+    if engine == "pdf":
+        return quotation_pages
+    order_pages = build_glass_order_pdf(order_pdf, mismatch=mismatch, **params)["pages"]
+    if engine == "compare-text":
+        quotation = make_quotation(params["pages"], params["rows"], params.get("glass_sets", 2), params.get("seed", 1))
+        with open(glass_txt, "w", encoding="utf-8") as f:
+            f.write(glass_text(glass_items(quotation)))
+        return order_pages
+    return quotation_pages + order_pages
+
+
+def measure(name: str, engine: str, params: dict, tmp_dir: str, workers: int, output_format: str) -> dict:
+    """สร้าง workbook/PDF แล้ววัดผลใน process ใหม่"""
+    from synthetic_xlsx import build_joint_workbook, build_matrix_workbook
+
+    pages = None
+    if engine in PDF_ENGINES:
+        input_file = os.path.join(tmp_dir, f"{name}.pdf")
+        pages = build_pdf_inputs(input_file, engine, params)
+    else:
+        input_file = os.path.join(tmp_dir, f"{name}.xlsx")
+        build = build_matrix_workbook if engine == "matrix" else build_joint_workbook
+        build(input_file, **params)
+    work_dir = os.path.join(tmp_dir, name)
+    os.makedirs(work_dir, exist_ok=True)
+
+    cmd = [sys.executable, str(Path(__file__).resolve()), "--run-one", engine, input_file, work_dir,
+           "--workers", str(workers), "--output-format", output_format]
+    # cwd = work_dir เพราะ ExcelProcessor เขียน Price/Type ลง cwd
+    proc = subprocess.run(cmd, cwd=work_dir, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"{name} failed: {proc.stderr.strip()[-500:]}")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    seconds = result["seconds"]
+    result.update({"case": name, "engine": engine, "params": params, "input_bytes": os.path.getsize(input_file)})
+    if pages is not None:
+        items = result["items"]
+        result.update({
+            "pages": pages,
+            "pages_per_s": round(pages / seconds, 1) if seconds else None,
+            "items_per_s": round(items / seconds) if seconds and items else None,
+        })
+    else:
+        cells = count_cells(input_file)
+        result.update({
+            "cells": cells,
+            "cells_per_s": round(cells / seconds) if seconds else None,
+        })
+    return result
+
+
+def git_revision() -> str:
+    try:
+        proc = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                              capture_output=True, text=True)
+        return proc.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def load_history(path: Path) -> list:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f).get("runs", [])
+    except (OSError, ValueError):
+        return []
+
+
+def save_history(path: Path, runs: list) -> None:
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"runs": runs}, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def previous_result(runs: list, case: str):
+    """ผลล่าสุดของ case เดียวกันใน history (ใช้เทียบ regression)"""
+    for run in reversed(runs):
+        for result in run.get("results", []):
+            if result.get("case") == case:
+                return result
+    return None
+
+
+def print_report(results: list, history: list) -> None:
+    print(f"\n{'case':<22}{'seconds':>10}{'cells/s':>12}{'pages/s':>10}{'items/s':>10}{'peak MB':>10}"
+          f"{'vs prev':>10}  phases")
+    for r in results:
+        prev = previous_result(history, r["case"])
+        delta = ""
+        if prev and prev.get("seconds"):
+            delta = f"{(r['seconds'] / prev['seconds'] - 1) * 100:+.1f}%"
+        phases = ", ".join(f"{k}={v:.3f}" for k, v in r["phases"].items())
+        print(f"{r['case']:<22}{r['seconds']:>10.3f}{r.get('cells_per_s') or 0:>12,}"
+              f"{r.get('pages_per_s') or 0:>10,}{r.get('items_per_s') or 0:>10,}{r['peak_rss_mb']:>10.1f}"
+              f"{delta:>10}  {phases}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark matrix (main.py), joint (main2.py) and PDF (main3.py/main4.py) engines")
+    parser.add_argument("--cases", nargs="+", choices=list(SUITE), help="Cases to run (default: all)")
+    parser.add_argument("--quick", action="store_true", help=f"Run only {', '.join(QUICK_CASES)}")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes for matrix and pdf modes")
+    parser.add_argument("--output-format", default="xlsx", help="Output format for Price/Type")
+    parser.add_argument("--history", default=str(DEFAULT_HISTORY), help="JSON history file")
+    parser.add_argument("--label", default="", help="Note stored with this run")
+    parser.add_argument("--no-save", action="store_true", help="Do not append results to the history file")
+    parser.add_argument("--run-one", nargs=3, metavar=("ENGINE", "INPUT", "WORK_DIR"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one:
+        engine, input_file, work_dir = args.run_one
+        print(json.dumps(run_case(engine, input_file, work_dir, args.workers, args.output_format)))
+        return
+
+    cases = args.cases or (QUICK_CASES if args.quick else list(SUITE))
+    history_path = Path(args.history)
+    history = load_history(history_path)
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="bench_") as tmp_dir:
+        for name in cases:
+            engine, params = SUITE[name]
+            print(f"⏱️ {name} ...", flush=True)
+            results.append(measure(name, engine, params, tmp_dir, args.workers, args.output_format))
+
+    print_report(results, history)
+
+    if not args.no_save:
+        history.append({
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "label": args.label,
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+            "workers": args.workers,
+            "output_format": args.output_format,
+            "results": results,
+        })
+        save_history(history_path, history)
+        print(f"\n💾 บันทึกผลลงใน {history_path}")
+
+
+if __name__ == "__main__":
+    main()
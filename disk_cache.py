@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+disk_cache.py - Cache ผลลัพธ์ลงดิสก์แบบ key -> pickle file
+ใช้เก็บผลลัพธ์ที่คำนวณซ้ำได้ข้ามงาน (เช่นผลดึงข้อมูลรายชีตที่ key ด้วย hash ของเนื้อหา)
+จำกัดจำนวนไฟล์ด้วยการลบไฟล์ที่ถูกใช้ล่าสุดนานที่สุดก่อน (LRU ตาม mtime)
+นับจำนวนไฟล์ไว้ในหน่วยความจำ - สแกนโฟลเดอร์เฉพาะตอนเปิดและเมื่อเกิน max_entries
+(แล้วลบลงไปถึง PRUNE_TARGET ของ max_entries เพื่อไม่ต้องสแกนซ้ำทุกครั้งที่เขียน)
+"""
+
+import os
+import pickle
+import tempfile
+from pathlib import Path
+from typing import Any, Optional
+
+DEFAULT_MAX_ENTRIES = 2000
+# สัดส่วนของ max_entries ที่เหลือหลัง prune (low-water mark)
+PRUNE_TARGET = 0.9
+
+
+class DiskCache:
+    """Cache บนดิสก์ - key เป็น hex digest (ใช้เป็นชื่อไฟล์ได้โดยตรง)
+
+    Example:
+        cache = DiskCache("cache/matrix")
+        result = cache.get(key)
+        if result is None:
+            result = compute()
+            cache.put(key, result)
+    """
+
+    def __init__(self, directory, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.directory = Path(directory)
+        self.max_entries = max_entries
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # จำนวนไฟล์โดยประมาณ (process อื่นที่ใช้โฟลเดอร์เดียวกันเขียนเพิ่มได้ - prune นับใหม่ทุกครั้ง)
+        self._count = len(self._entries())
+
+    def _entries(self) -> list:
+        return [e for e in os.scandir(self.directory) if e.name.endswith(".pkl")]
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.pkl"
+
+    def get(self, key: str) -> Optional[Any]:
+        """คืนค่าที่ cache ไว้ หรือ None ถ้าไม่มี/อ่านไม่ได้"""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # ไฟล์เสีย (เช่นเขียนไม่จบ) - ลบทิ้งแล้วคำนวณใหม่
+            self.delete(key)
+            return None
+        try:
+            os.utime(path)  # อัปเดต mtime สำหรับ LRU
+        except OSError:
+            pass
+        return value
+
+    def put(self, key: str, value: Any) -> None:
+        """เขียนแบบ atomic (ไฟล์ชั่วคราวแล้ว rename) - ไม่ให้ process อื่นอ่านไฟล์ครึ่งๆ"""
+        path = self._path(key)
+        is_new = not path.exists()
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        self._count += is_new
+        if self._count > self.max_entries:
+            self.prune()
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+            self._count -= 1
+        except OSError:
+            pass
+
+    def prune(self) -> None:
+        """ลบไฟล์เก่าที่สุดเมื่อจำนวนเกิน max_entries ให้เหลือ PRUNE_TARGET ของ max_entries"""
+        entries = self._entries()
+        self._count = len(entries)
+        if len(entries) <= self.max_entries:
+            return
+        keep = int(self.max_entries * PRUNE_TARGET)
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        for entry in entries[:len(entries) - keep]:
+            try:
+                os.remove(entry.path)
+                self._count -= 1
+            except OSError:
+                pass
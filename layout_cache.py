@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+layout_cache.py - จำ offset ของ thickness matrices ตาม layout fingerprint
+ชีตในซีรีส์เดียวกัน (หรือซีรีส์ที่ใช้ template เดียวกัน) มักมี offset เดียวกัน
+จึงเก็บ offset ที่ probe ได้ไว้ในไฟล์ JSON และใช้ซ้ำข้ามงาน
+"""
+
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+MAX_LAYOUTS = 5000
+
+Offsets = Dict[int, Tuple[int, int]]
+
+
+class LayoutOffsetCache:
+    """fingerprint -> {thickness: (row_offset, col_offset)}
+
+    path=None จะจำเฉพาะในงานปัจจุบัน (ไม่เขียนไฟล์)
+    """
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path else None
+        self.layouts: Dict[str, Dict[str, list]] = {}
+        self.dirty = False
+        if self.path and self.path.exists():
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self.layouts = json.load(f).get("layouts", {})
+            except (OSError, ValueError):
+                self.layouts = {}
+
+    def get(self, fingerprint: str) -> Optional[Offsets]:
+        offsets = self.layouts.get(fingerprint)
+        if offsets is None:
+            return None
+        return {int(t): tuple(offset) for t, offset in offsets.items()}
+
+    def put(self, fingerprint: str, offsets: Offsets) -> None:
+        stored = {str(t): list(offset) for t, offset in offsets.items()}
+        if self.layouts.get(fingerprint) != stored:
+            # ใส่ท้ายสุดเสมอ - เวลาเกิน MAX_LAYOUTS จะลบอันที่ไม่ได้อัปเดตนานที่สุด
+            self.layouts.pop(fingerprint, None)
+            self.layouts[fingerprint] = stored
+            self.dirty = True
+
+    def save(self) -> None:
+        """เขียนไฟล์แบบ atomic - รวมกับของที่ process อื่นเขียนไว้ก่อน"""
+        if not self.path or not self.dirty:
+            return
+        merged = LayoutOffsetCache(self.path).layouts
+        for fingerprint, offsets in self.layouts.items():
+            merged.pop(fingerprint, None)
+            merged[fingerprint] = offsets
+        while len(merged) > MAX_LAYOUTS:
+            merged.pop(next(iter(merged)))
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"layouts": merged}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        self.layouts = merged
+        self.dirty = False
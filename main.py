@@ -4,6 +4,7 @@ Excel Color Extractor - Command Line Interface
 รับ arguments จาก server.py และคืนผลลัพธ์เป็น JSON
 """
 
+import io
 import os
 import re
 import math
@@ -11,16 +12,33 @@ import uuid
 import shutil
 import argparse
 import json
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from pathlib import Path
 from typing import Optional
+import hashlib
+import numpy as np
 import pandas as pd
-from openpyxl import load_workbook
+from disk_cache import DiskCache
+from layout_cache import LayoutOffsetCache
+from output_formats import OUTPUT_FORMATS, output_filename, validate_format, write_price_store, write_records
+from record_store import PriceRecordStore
+from xlsx_reader import StreamingXlsxReader
+from xlsx_writer import column_letter
 # Ensure pandas and openpyxl are installed
 
+# เวอร์ชันของขั้นตอนดึงข้อมูลรายชีต - เปลี่ยนทุกครั้งที่ผลของ extract_sheet เปลี่ยน (cache เดิมจะไม่ถูกใช้)
+ENGINE_VERSION = "matrix-1"
+
+# ลำดับที่ probe ลอง offset ของ thickness matrix (offset แรกที่ได้สีมากที่สุดชนะ)
+PROBE_OFFSETS = [(row_offset, col_offset) for row_offset in (1, 2, 3) for col_offset in (1, 2, 3)]
+
 class ColorExtractor:
-    def __init__(self, job_id: str):
+    def __init__(self, job_id: str, layout_cache: Optional[LayoutOffsetCache] = None):
         self.job_id = job_id
+        # offset ของ thickness matrices ที่เรียนรู้แล้ว ตาม layout fingerprint
+        self.layout_cache = layout_cache if layout_cache is not None else LayoutOffsetCache()
         
     def to_number(self, val):
         """Convert value to number, removing commas"""
@@ -43,6 +61,37 @@ class ColorExtractor:
         except:
             return None
 
+    def to_number_array(self, values):
+        """Vectorized to_number - คืน float array โดยเซลล์ที่แปลงไม่ได้เป็น NaN"""
+        arr = np.asarray(values)
+        if arr.dtype.kind in 'iuf':
+            result = arr.astype(float)
+        else:
+            # ลบ comma/space และอักขระพิเศษแบบเดียวกับ to_number ในครั้งเดียว
+            cleaned = (pd.Series(arr.ravel(), dtype=object).astype(str)
+                       .str.replace(r'[,\s]', '', regex=True)
+                       .str.replace(r'[^\d.-]', '', regex=True))
+            result = pd.to_numeric(cleaned, errors='coerce').to_numpy(dtype=float).reshape(arr.shape)
+        result[~np.isfinite(result)] = np.nan
+        return result
+
+    def leading_numbers(self, values):
+        """ตัดค่าตัวเลขที่ต่อเนื่องกันจากต้น array จนถึงเซลล์แรกที่ไม่ใช่ตัวเลข"""
+        nums = self.to_number_array(values)
+        invalid = np.flatnonzero(np.isnan(nums))
+        return nums[:invalid[0]] if invalid.size else nums
+
+    def as_output_column(self, nums):
+        """คืนค่าเป็น int เมื่อทุกค่าเป็นจำนวนเต็ม (เหมือน to_number)"""
+        if nums.size and np.all(nums == np.floor(nums)):
+            return nums.astype(np.int64)
+        return nums
+
+    def as_output_value(self, num):
+        """แปลงค่าเดี่ยวจาก array กลับเป็น int/float แบบเดียวกับ to_number"""
+        num = float(num)
+        return int(num) if num.is_integer() else num
+
     def normalize_rgb(self, fill):
         """Convert ARGB color to RGB hex format - แก้ไขให้อ่านสีที่ถูกต้อง"""
         if not fill:
@@ -139,145 +188,147 @@ class ColorExtractor:
         
         return None, None
 
-    def read_color_matrix_with_thickness_row(self, ws, raw, hr_main, hc_main, hr_thick, widths, heights, matrix_name=""):
-        """อ่านสีจาก thickness row โดยใช้ position ของ main matrix"""
+    def read_color_plane(self, ws, top_row, left_col, n_rows, n_cols):
+        """อ่านสีเป็น plane ขนาด n_rows x n_cols เริ่มที่ (top_row, left_col) แบบ 1-based
+        เซลล์ที่อยู่นอก sheet จะได้ FFFFFF"""
+        plane = np.full((n_rows, n_cols), "FFFFFF", dtype=object)
+        last_row = min(top_row + n_rows - 1, ws.max_row)
+        last_col = min(left_col + n_cols - 1, ws.max_column)
+        if last_row < top_row or last_col < left_col:
+            return plane
+        
+        # เซลล์ที่ใช้ fill เดียวกันจะมี fillId เดียวกัน - แปลงสีครั้งเดียวต่อ fillId
+        fill_ids = ws.fill_ids(top_row, left_col, last_row - top_row + 1, last_col - left_col + 1)
+        unique_ids, inverse = np.unique(fill_ids, return_inverse=True)
+        fill_colors = np.empty(len(unique_ids), dtype=object)
+        for k, fill_id in enumerate(unique_ids.tolist()):
+            try:
+                fill_colors[k] = self.normalize_rgb(ws.fill(fill_id))
+            except Exception:
+                fill_colors[k] = "FFFFFF"
+        plane[:fill_ids.shape[0], :fill_ids.shape[1]] = fill_colors[inverse.reshape(fill_ids.shape)]
+        return plane
+
+    def color_regions(self, hr, hc, thickness_rows, n_h, n_w, known_offsets=None):
+        """บริเวณ (1-based) ที่ต้องอ่านสีของชีต: main matrix + thickness matrices
+        ใช้โหลด fillId จากชีตในรอบเดียว"""
+        known_offsets = known_offsets or {}
+        regions = [(hr + 2, hc + 2, n_h, n_w)]
+        for thickness, hr_thick in thickness_rows.items():
+            offset = known_offsets.get(thickness)
+            if offset is None:
+                # probe และ offset +1..+3 อยู่ในกรอบนี้ทั้งหมด
+                regions.append((hr_thick + 1, hc + 1, n_h + 2, n_w + 2))
+            else:
+                # รู้ offset แล้ว: probe window สำหรับตรวจสอบ + plane ที่ offset นั้น
+                regions.append((hr_thick + 1, hc + 1, 2 + min(2, n_h), 2 + min(2, n_w)))
+                regions.append((hr_thick + offset[0], hc + offset[1], n_h, n_w))
+        return regions
+
+    def layout_fingerprint(self, hr, hc, thickness_rows, n_h, n_w):
+        """fingerprint ของ layout: ตำแหน่ง header ของ thickness matrices เทียบกับ main matrix,
+        คอลัมน์ของ main matrix และขนาด matrix"""
+        headers = ",".join(f"{t}@{hr_thick - hr}" for t, hr_thick in sorted(thickness_rows.items()))
+        return f"c{hc}|{n_h}x{n_w}|{headers}"
+
+    def probe_count(self, probe, offset, n_h, n_w):
+        """จำนวนเซลล์ที่มีสีใน probe window ที่ offset นี้"""
+        row_offset, col_offset = offset
+        test_colors = probe[row_offset - 1:row_offset - 1 + n_h, col_offset - 1:col_offset - 1 + n_w]
+        return int(np.count_nonzero(test_colors != "FFFFFF"))
+
+    def offset_is_valid(self, probe, offset, n_h, n_w):
+        """offset ที่จำไว้ใช้ได้เมื่อ probe window มีสีครบทุกเซลล์ และไม่มี offset ก่อนหน้า
+        (ตามลำดับ probe) ที่ครบ - กรณีนี้ probe จะเลือก offset เดียวกันนี้แน่นอน"""
+        if offset not in PROBE_OFFSETS:
+            return False
+        full = n_h * n_w
+        if self.probe_count(probe, offset, n_h, n_w) != full:
+            return False
+        return all(
+            self.probe_count(probe, earlier, n_h, n_w) < full
+            for earlier in PROBE_OFFSETS[:PROBE_OFFSETS.index(offset)]
+        )
+
+    def read_color_matrix_with_thickness_row(self, ws, raw, hr_main, hc_main, hr_thick, widths, heights,
+                                             matrix_name="", known_offset=None):
+        """อ่านสีจาก thickness row โดยใช้ position ของ main matrix
+        known_offset: offset จาก layout เดียวกัน - ถ้าผ่านการตรวจสอบจะไม่ต้อง probe
+        คืนค่าเป็น (plane ขนาด len(heights) x len(widths), offset ที่ใช้)"""
         print(f"     🔍 {matrix_name}: อ่านสีจาก thickness row {hr_thick+1}")
         print(f"     📍 Main matrix: row={hr_main+1}, col={hc_main+1}")
         print(f"     📍 Thickness header: row={hr_thick+1}, col=A")
         
-        colors = {}
-        
         # ลอง offset หลายแบบเหมือนฟังก์ชัน auto-offset เดิม
-        best_colors = {}
         max_valid_colors = 0
         best_offset = (1, 1)
         
-        # ลอง offset ต่างๆ โดยเริ่มจาก thickness row
-        for row_offset in [1, 2, 3]:
-            for col_offset in [1, 2, 3]:
-                test_colors = {}
-                valid_count = 0
-                
-                # ทดสอบเฉพาะ 4 เซลล์แรก
-                for i_h in range(min(2, len(heights))):
-                    for i_w in range(min(2, len(widths))):
-                        h, w = heights[i_h], widths[i_w]
-                        try:
-                            # เริ่มจาก thickness row + offset
-                            excel_row = hr_thick + row_offset + i_h
-                            excel_col = hc_main + col_offset + i_w  # ใช้ col ของ main matrix
-                            
-                            if excel_row <= ws.max_row and excel_col <= ws.max_column:
-                                cell = ws.cell(row=excel_row, column=excel_col)
-                                color = self.normalize_rgb(cell.fill)
-                                test_colors[(h, w)] = color
-                                if color != "FFFFFF":
-                                    valid_count += 1
-                            else:
-                                test_colors[(h, w)] = "FFFFFF"
-                        except Exception as e:
-                            test_colors[(h, w)] = "FFFFFF"
+        # ทดสอบเฉพาะ 4 เซลล์แรก - อ่าน probe plane ครั้งเดียวแล้วตัดตาม offset
+        n_h, n_w = min(2, len(heights)), min(2, len(widths))
+        probe = self.read_color_plane(ws, hr_thick + 1, hc_main + 1, 2 + n_h, 2 + n_w)
+        
+        if known_offset is not None and self.offset_is_valid(probe, known_offset, n_h, n_w):
+            best_offset = known_offset
+            print(f"       ♻️ offset +{best_offset[0]},+{best_offset[1]} จาก layout เดิม")
+        else:
+            for offset in PROBE_OFFSETS:
+                valid_count = self.probe_count(probe, offset, n_h, n_w)
                 
                 # ถ้า offset นี้ให้ผลดีกว่า
                 if valid_count > max_valid_colors:
                     max_valid_colors = valid_count
-                    best_offset = (row_offset, col_offset)
-                    print(f"       🎯 offset +{row_offset},+{col_offset}: {valid_count} สี")
+                    best_offset = offset
+                    print(f"       🎯 offset +{offset[0]},+{offset[1]}: {valid_count} สี")
         
         # ใช้ offset ที่ดีที่สุดเพื่ออ่านทั้ง matrix
         row_offset, col_offset = best_offset
         print(f"     ✅ ใช้ offset สำหรับ {matrix_name}: +{row_offset},+{col_offset}")
         
-        for i_h, h in enumerate(heights):
-            for i_w, w in enumerate(widths):
-                try:
-                    excel_row = hr_thick + row_offset + i_h
-                    excel_col = hc_main + col_offset + i_w
-                    
-                    if excel_row <= ws.max_row and excel_col <= ws.max_column:
-                        cell = ws.cell(row=excel_row, column=excel_col)
-                        color = self.normalize_rgb(cell.fill)
-                        best_colors[(h, w)] = color
-                    else:
-                        best_colors[(h, w)] = "FFFFFF"
-                except:
-                    best_colors[(h, w)] = "FFFFFF"
+        best_colors = self.read_color_plane(
+            ws, hr_thick + row_offset, hc_main + col_offset, len(heights), len(widths)
+        )
         
         # แสดงผลสรุป
-        colored_count = sum(1 for color in best_colors.values() if color != "FFFFFF")
-        print(f"     📊 {matrix_name}: อ่านได้ {colored_count}/{len(best_colors)} เซลล์ที่มีสี")
+        colored_count = int(np.count_nonzero(best_colors != "FFFFFF"))
+        print(f"     📊 {matrix_name}: อ่านได้ {colored_count}/{best_colors.size} เซลล์ที่มีสี")
         
-        return best_colors
+        return best_colors, best_offset
 
     def read_color_matrix(self, ws, raw, hr, hc, widths, heights):
-        """Read colors from matrix - ใช้ offset มาตรฐาน"""
-        color_map = {}
-        
-        for i_h, h in enumerate(heights):
-            for i_w, w in enumerate(widths):
-                try:
-                    excel_row = hr + 2 + i_h
-                    excel_col = hc + 2 + i_w
-                    
-                    cell = ws.cell(row=excel_row, column=excel_col)
-                    color = self.normalize_rgb(cell.fill)
-                    color_map[(h, w)] = color
-                except Exception:
-                    color_map[(h, w)] = "FFFFFF"
-                    continue
+        """Read colors from matrix - ใช้ offset มาตรฐาน คืนค่าเป็น plane ขนาด len(heights) x len(widths)"""
+        return self.read_color_plane(ws, hr + 2, hc + 2, len(heights), len(widths))
+
+    def scan_sheet_matrices(self, ws, raw, sheet_name=""):
+        """หา matrices ทั้งหมดในชีต (1 = main matrix, 2..19 = thickness matrices)"""
+        # หา main matrix
+        hr, hc = self.find_main_matrix(ws, raw)
+        if hr is None:
+            print(f"      ❌ ไม่พบ main matrix ใน {sheet_name}")
+            return []
         
-        return color_map
+        # หา matrices ทั้งหมดในชีตนี้
+        found_matrices = [1]  # 1 เป็น main matrix เสมอ
+        
+        for thickness in range(2, 20):  # ตรวจหาสูงสุด 20 matrices
+            hr_thick = self.find_thickness_matrix_in_column_a(ws, raw, thickness)
+            if hr_thick is not None:
+                found_matrices.append(thickness)
+                print(f"      ✅ พบ matrix {thickness}")
+            else:
+                # ถ้าไม่เจอ matrix ลำดับถัดไป ให้หยุดค้นหา
+                break
+        
+        print(f"      📊 รวม {len(found_matrices)} matrices: {found_matrices}")
+        return found_matrices
 
-    def scan_all_matrices_in_file(self, xls, wb):
-        """สแกนทุกชีตเพื่อหาจำนวน matrix สูงสุด"""
+    def print_scan_summary(self, all_sheet_matrices):
+        """สรุปผลการสแกนและคืนจำนวน matrix สูงสุด"""
         max_matrices = 1  # อย่างน้อยต้องมี matrix 1
         max_sheet = ""
-        all_sheet_matrices = {}
-        
-        print("\n🔍 สแกนทุกชีตเพื่อหาจำนวน matrix...")
-        
-        for sheet_name in xls.sheet_names:
-            if sheet_name.strip().lower() == "สารบัญ":
-                continue
-                
-            print(f"   📋 สแกน Sheet: {sheet_name}")
-            
-            try:
-                raw = pd.read_excel(xls, sheet_name=sheet_name, header=None, engine="openpyxl")
-                ws = wb[sheet_name]
-                
-                # หา main matrix
-                hr, hc = self.find_main_matrix(ws, raw)
-                if hr is None:
-                    print(f"      ❌ ไม่พบ main matrix ใน {sheet_name}")
-                    all_sheet_matrices[sheet_name] = []
-                    continue
-                
-                # หา matrices ทั้งหมดในชีตนี้
-                found_matrices = [1]  # 1 เป็น main matrix เสมอ
-                
-                for thickness in range(2, 20):  # ตรวจหาสูงสุด 20 matrices
-                    hr_thick = self.find_thickness_matrix_in_column_a(ws, raw, thickness)
-                    if hr_thick is not None:
-                        found_matrices.append(thickness)
-                        print(f"      ✅ พบ matrix {thickness}")
-                    else:
-                        # ถ้าไม่เจอ matrix ลำดับถัดไป ให้หยุดค้นหา
-                        break
-                
-                all_sheet_matrices[sheet_name] = found_matrices
-                matrix_count = len(found_matrices)
-                print(f"      📊 รวม {matrix_count} matrices: {found_matrices}")
-                
-                # อัพเดทจำนวน matrix สูงสุด
-                if matrix_count > max_matrices:
-                    max_matrices = matrix_count
-                    max_sheet = sheet_name
-                    print(f"      🏆 ชีต {sheet_name} มี matrix เยอะที่สุด: {matrix_count} matrices")
-                    
-            except Exception as e:
-                print(f"      ❌ Error สแกน {sheet_name}: {e}")
-                all_sheet_matrices[sheet_name] = []
+        for sheet, matrices in all_sheet_matrices.items():
+            if len(matrices) > max_matrices:
+                max_matrices = len(matrices)
+                max_sheet = sheet
         
         print(f"\n🎯 ผลการสแกน:")
         print(f"   🏆 ชีตที่มี matrix เยอะที่สุด: {max_sheet} ({max_matrices} matrices)")
@@ -288,215 +339,435 @@ class ColorExtractor:
             else:
                 print(f"      - {sheet}: ไม่พบ matrix")
         
-        return max_matrices, all_sheet_matrices
+        return max_matrices
 
-    def process_file(self, input_file: str, output_dir: str, original_filename: str = None):
-        """Process the Excel file"""
+    def extract_sheet(self, reader, sheet, base_name):
+        """สแกนและดึงข้อมูลจากชีตเดียว คืน fragment ที่ยังไม่มี ID
+        
+        Returns:
+            dict: sheet, matrices, skip_reason, type_row และ price_block
+            (price_block เป็น arrays แบบคอลัมน์ มีเฉพาะสีของ matrices ที่พบในชีตนี้)
+        """
+        result = {"sheet": sheet, "matrices": [], "skip_reason": None, "type_row": None, "price_block": None}
+        
+        # ตรวจสอบ Sheet สารบัญ
+        if sheet.strip().lower() == "สารบัญ":
+            result["skip_reason"] = "ข้าม Sheet สารบัญ"
+            print(f"   ⚠️ ข้าม Sheet: {sheet} (สารบัญ)")
+            return result
+        
+        print(f"\n🔍 ประมวลผล Sheet: {sheet}")
+        
+        raw = None
         try:
-            if original_filename:
-                base_name = os.path.splitext(original_filename)[0]
+            ws = reader.read_sheet(sheet)
+            raw = ws.values
+            result["matrices"] = self.scan_sheet_matrices(ws, raw, sheet)
+        except Exception as e:
+            print(f"      ❌ Error สแกน {sheet}: {e}")
+        
+        available_matrices = result["matrices"]
+        if not available_matrices:
+            error_msg = "ไม่พบ matrix ใดๆ"
+            print(f"   ❌ {error_msg} ใน {sheet}")
+            result["skip_reason"] = error_msg
+            return result
+        
+        # Find Glass_QTY and Description - หา label ทั้ง sheet ในครั้งเดียว
+        sheet_glass_qty = 1
+        sheet_description = ""
+        
+        labels = raw.iloc[:, :-1].apply(lambda col: col.astype(str).str.strip().str.lower()).to_numpy()
+        for r, c in np.argwhere(np.isin(labels, ["glass_qty", "glass qty", "description"])):
+            if labels[r, c] == "description":
+                desc = raw.iat[r, c + 1]
+                if desc is not None:
+                    sheet_description = str(desc).strip()
             else:
-                base_name = os.path.splitext(os.path.basename(input_file))[0]
-                # ลบ UUID ออกจากชื่อไฟล์ (UUID format: 8-4-4-4-12 characters)
-                uuid_pattern = r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}_'
-                base_name = re.sub(uuid_pattern, '', base_name)
-            
-            xls = pd.ExcelFile(input_file, engine="openpyxl")
-            wb = load_workbook(input_file, data_only=True)
-            
-            # สแกนทุกชีตเพื่อหาจำนวน matrix สูงสุด
-            max_matrices_count, all_sheet_matrices = self.scan_all_matrices_in_file(xls, wb)
-            
-            # สร้าง template คอลัมน์ตามจำนวน matrix สูงสุด
-            matrix_columns = []
-            for i in range(1, max_matrices_count + 1):
-                matrix_columns.append(f"{i}_Color")
-            
-            print(f"\n📝 จะสร้างคอลัมน์: {matrix_columns}")
-            
-            price_rows = []
-            type_rows = []
-            price_id = 1
-            type_id = 1
-            
-            # Track processing results
-            processed_sheets = 0
-            skipped_sheets = []
-            warnings = []
+                qty = self.to_number(raw.iat[r, c + 1])
+                if qty is not None:
+                    sheet_glass_qty = qty
+        
+        # Find main matrix (1 or h/w header)
+        hr, hc = self.find_main_matrix(ws, raw)
+        
+        if hr is None or hc is None:
+            error_msg = "ไม่พบ main matrix"
+            print(f"   ❌ {error_msg} ใน {sheet}")
+            result["skip_reason"] = error_msg
+            return result
+        
+        # Read widths and heights from main matrix
+        widths = self.leading_numbers(raw.iloc[hr, hc + 1:].to_numpy())
+        heights = self.leading_numbers(raw.iloc[hr + 1:, hc].to_numpy())
+        
+        if not widths.size or not heights.size:
+            error_msg = "ไม่พบ dimensions (ความกว้าง/ความสูง)"
+            print(f"   ❌ {error_msg} ใน {sheet}")
+            result["skip_reason"] = error_msg
+            return result
+        
+        print(f"   📊 Dimensions: {len(heights)} heights x {len(widths)} widths")
+        print(f"   🎯 Matrices ในชีตนี้: {available_matrices}")
+        
+        # หา header ของ thickness matrices ก่อน แล้วโหลด fillId เฉพาะบริเวณที่ต้องอ่านสีในรอบเดียว
+        thickness_rows = {}
+        for thickness in available_matrices:
+            if thickness == 1:
+                continue
+            hr_thick = self.find_thickness_matrix_in_column_a(ws, raw, thickness)
+            if hr_thick is not None:
+                thickness_rows[thickness] = hr_thick
+        fingerprint = self.layout_fingerprint(hr, hc, thickness_rows, len(heights), len(widths))
+        known_offsets = self.layout_cache.get(fingerprint) or {}
+        reader.load_fills(ws, self.color_regions(hr, hc, thickness_rows, len(heights), len(widths), known_offsets))
+        
+        # อ่านสีจาก matrices ที่มี
+        matrix_colors = {}
+        
+        # อ่าน matrix 1 (main matrix)
+        if 1 in available_matrices:
+            matrix_colors[1] = self.read_color_matrix(ws, raw, hr, hc, widths, heights)
+            print(f"   🎨 1 (main matrix): {matrix_colors[1].size} colors")
+        
+        # อ่าน matrices อื่นๆ
+        learned_offsets = {}
+        for thickness, hr_thick in thickness_rows.items():
+            colors, learned_offsets[thickness] = self.read_color_matrix_with_thickness_row(
+                ws, raw, hr, hc, hr_thick, widths, heights, f"{thickness}",
+                known_offset=known_offsets.get(thickness)
+            )
+            matrix_colors[thickness] = colors
+            print(f"   🎨 {thickness}: {colors.size} colors อ่านได้")
+        if learned_offsets:
+            self.layout_cache.put(fingerprint, learned_offsets)
+            result["layout"] = (fingerprint, learned_offsets)
+        
+        # Create Type record
+        result["type_row"] = {
+            "Serie": base_name,
+            "Type": sheet.strip(),
+            "Description": sheet_description,
+            "width_min": self.as_output_value(widths.min()),
+            "width_max": self.as_output_value(widths.max()),
+            "height_min": self.as_output_value(heights.min()),
+            "height_max": self.as_output_value(heights.max()),
+        }
+        
+        # Create Price records
+        # อ่านราคาจาก main matrix (1) ทั้ง block แล้วแปลงเป็นตัวเลขในครั้งเดียว
+        n_h, n_w = len(heights), len(widths)
+        prices = self.to_number_array(raw.iloc[hr + 1:hr + 1 + n_h, hc + 1:hc + 1 + n_w].to_numpy())
+        valid = ~np.isnan(prices)
+        
+        # คอลัมน์สีของ matrices ในชีตนี้ (คอลัมน์ที่ไม่มีจะเป็น FFFFFF ใน record store)
+        result["price_block"] = {
+            "serie": base_name,
+            "type_name": sheet.strip(),
+            "widths": self.as_output_column(np.broadcast_to(widths, (n_h, n_w))[valid]),
+            "heights": self.as_output_column(np.broadcast_to(heights[:, None], (n_h, n_w))[valid]),
+            "prices": self.as_output_column(prices[valid]),
+            "glass_qty": sheet_glass_qty,
+            "colors": {f"{i}_Color": plane[valid] for i, plane in matrix_colors.items()},
+        }
+        print(f"   ✅ สร้าง {int(valid.sum())} price records สำหรับ {sheet}")
+        return result
+
+    def preview_sheet(self, reader, sheet):
+        """ตรวจ layout ของชีตเดียวแบบเดียวกับ extract_sheet แต่ไม่อ่านสีและไม่สร้าง records
+        
+        Returns:
+            dict: sheet, skip_reason, matrices, main_matrix, thickness_matrices,
+            widths/heights (count, min, max)
+        """
+        preview = {
+            "sheet": sheet, "skip_reason": None, "matrices": [], "main_matrix": None,
+            "thickness_matrices": [], "widths": None, "heights": None,
+        }
+        
+        if sheet.strip().lower() == "สารบัญ":
+            preview["skip_reason"] = "ข้าม Sheet สารบัญ"
+            return preview
+        
+        try:
+            ws = reader.read_sheet(sheet)
+            raw = ws.values
+            preview["matrices"] = self.scan_sheet_matrices(ws, raw, sheet)
+        except Exception as e:
+            print(f"      ❌ Error สแกน {sheet}: {e}")
+        
+        if not preview["matrices"]:
+            preview["skip_reason"] = "ไม่พบ matrix ใดๆ"
+            return preview
+        
+        hr, hc = self.find_main_matrix(ws, raw)
+        if hr is None or hc is None:
+            preview["skip_reason"] = "ไม่พบ main matrix"
+            return preview
+        preview["main_matrix"] = {"row": hr + 1, "col": hc + 1, "cell": f"{column_letter(hc)}{hr + 1}"}
+        
+        widths = self.leading_numbers(raw.iloc[hr, hc + 1:].to_numpy())
+        heights = self.leading_numbers(raw.iloc[hr + 1:, hc].to_numpy())
+        for key, values in (("widths", widths), ("heights", heights)):
+            if values.size:
+                preview[key] = {
+                    "count": int(values.size),
+                    "min": self.as_output_value(values.min()),
+                    "max": self.as_output_value(values.max()),
+                }
+        if not widths.size or not heights.size:
+            preview["skip_reason"] = "ไม่พบ dimensions (ความกว้าง/ความสูง)"
+            return preview
+        
+        for thickness in preview["matrices"]:
+            if thickness == 1:
+                continue
+            hr_thick = self.find_thickness_matrix_in_column_a(ws, raw, thickness)
+            if hr_thick is not None:
+                preview["thickness_matrices"].append({"thickness": thickness, "row": hr_thick + 1})
+        return preview
+
+    def preview_file(self, input_file):
+        """Dry-run: ตรวจการ detect ทุกชีต (ตำแหน่ง main matrix, thickness matrices, ช่วง width/height
+        และเหตุผลที่ข้ามชีต) โดยไม่อ่านสีและไม่เขียนไฟล์ผลลัพธ์ - input_file เป็น path, bytes หรือ file-like"""
+        start_time = time.time()
+        with StreamingXlsxReader(input_file) as reader:
+            sheets = [self.preview_sheet(reader, sheet) for sheet in reader.sheet_names]
+        
+        max_matrices = self.print_scan_summary({
+            p["sheet"]: p["matrices"] for p in sheets if p["skip_reason"] != "ข้าม Sheet สารบัญ"
+        })
+        skipped_sheets = [{"sheet": p["sheet"], "reason": p["skip_reason"]} for p in sheets if p["skip_reason"]]
+        return {
+            "preview": True,
+            "total_sheets": len(sheets),
+            "detected_sheets": len(sheets) - len(skipped_sheets),
+            "max_matrices": max_matrices,
+            "color_columns": [f"{i}_Color" for i in range(1, max_matrices + 1)],
+            "sheets": sheets,
+            "skipped_sheets": skipped_sheets,
+            "processing_time": round(time.time() - start_time, 3),
+        }
+
+    def sheet_cache_key(self, reader, sheet):
+        """key ของผลดึงข้อมูลชีต = hash เนื้อหาชีต + ENGINE_VERSION (ไม่รวมชื่อชีต/ชื่อไฟล์)
+        ชีตสารบัญไม่ต้องอ่านอยู่แล้ว จึงไม่มี key"""
+        if sheet.strip().lower() == "สารบัญ":
+            return None
+        content = reader.sheet_fingerprint(sheet)
+        return hashlib.sha256(f"{ENGINE_VERSION}:{content}".encode("ascii")).hexdigest()
+
+    def rebind_sheet_result(self, result, sheet, base_name):
+        """ใช้ผลลัพธ์ที่ได้จากชีตเนื้อหาเดียวกัน (หรือจาก cache) กับชื่อชีตและชื่อ serie ปัจจุบัน"""
+        result = dict(result, sheet=sheet)
+        if result["type_row"] is not None:
+            result["type_row"] = dict(result["type_row"], Serie=base_name, Type=sheet.strip())
+        if result["price_block"] is not None:
+            result["price_block"] = dict(result["price_block"], serie=base_name, type_name=sheet.strip())
+        return result
+
+    def merge_sheet_results(self, sheet_results):
+        """รวม fragment ของทุกชีตตามลำดับชีต แล้วกำหนด ID ต่อเนื่องเหมือนการประมวลผลทีละชีต"""
+        all_sheet_matrices = {
+            r["sheet"]: r["matrices"] for r in sheet_results if r["skip_reason"] != "ข้าม Sheet สารบัญ"
+        }
+        max_matrices_count = self.print_scan_summary(all_sheet_matrices)
+        
+        # สร้าง template คอลัมน์ตามจำนวน matrix สูงสุด
+        matrix_columns = [f"{i}_Color" for i in range(1, max_matrices_count + 1)]
+        print(f"\n📝 จะสร้างคอลัมน์: {matrix_columns}")
+        
+        price_store = PriceRecordStore(matrix_columns)
+        type_rows = []
+        skipped_sheets = []
+        
+        for r in sheet_results:
+            if r["skip_reason"]:
+                skipped_sheets.append({"sheet": r["sheet"], "reason": r["skip_reason"]})
+                continue
             
-            for sheet in xls.sheet_names:
-                # ตรวจสอบ Sheet สารบัญ
-                if sheet.strip().lower() == "สารบัญ":
-                    skipped_sheets.append({"sheet": sheet, "reason": "ข้าม Sheet สารบัญ"})
-                    print(f"   ⚠️ ข้าม Sheet: {sheet} (สารบัญ)")
-                    continue
-                
-                print(f"\n🔍 ประมวลผล Sheet: {sheet}")
-                
-                # ใช้ข้อมูลจากการสแกน
-                available_matrices = all_sheet_matrices.get(sheet, [])
-                if not available_matrices:
-                    error_msg = "ไม่พบ matrix ใดๆ"
-                    print(f"   ❌ {error_msg} ใน {sheet}")
-                    skipped_sheets.append({"sheet": sheet, "reason": error_msg})
-                    continue
-                
-                raw = pd.read_excel(xls, sheet_name=sheet, header=None, engine="openpyxl")
-                ws = wb[sheet]
-                
-                # Find Glass_QTY and Description
-                sheet_glass_qty = 1
-                sheet_description = ""
-                
-                for r in range(raw.shape[0]):
-                    for c in range(raw.shape[1] - 1):
-                        if raw.iat[r, c] is None:
-                            continue
-                        cell = str(raw.iat[r, c]).strip()
-                        low = cell.lower()
-                        
-                        if low in ("glass_qty", "glass qty"):
-                            next_cell = raw.iat[r, c + 1]
-                            qty = self.to_number(next_cell)
-                            if qty is not None:
-                                sheet_glass_qty = qty
-                            
-                        elif low == "description":
-                            desc = raw.iat[r, c + 1]
-                            if desc is not None:
-                                sheet_description = str(desc).strip()
-                
-                # Find main matrix (1 or h/w header)
-                hr, hc = self.find_main_matrix(ws, raw)
-                
-                if hr is None or hc is None:
-                    error_msg = "ไม่พบ main matrix"
-                    print(f"   ❌ {error_msg} ใน {sheet}")
-                    skipped_sheets.append({"sheet": sheet, "reason": error_msg})
-                    continue
-                
-                # Read widths and heights from main matrix
-                widths = []
-                for c in range(hc + 1, raw.shape[1]):
-                    v = self.to_number(raw.iat[hr, c])
-                    if v is None:
-                        break
-                    widths.append(v)
-                
-                heights = []
-                for r in range(hr + 1, raw.shape[0]):
-                    h_val = self.to_number(raw.iat[r, hc])
-                    if h_val is None:
-                        break
-                    heights.append(h_val)
-                
-                if not widths or not heights:
-                    error_msg = "ไม่พบ dimensions (ความกว้าง/ความสูง)"
-                    print(f"   ❌ {error_msg} ใน {sheet}")
-                    skipped_sheets.append({"sheet": sheet, "reason": error_msg})
-                    continue
-                
-                print(f"   📊 Dimensions: {len(heights)} heights x {len(widths)} widths")
-                print(f"   🎯 Matrices ในชีตนี้: {available_matrices}")
-                
-                # อ่านสีจาก matrices ที่มี
-                matrix_colors = {}
-                
-                # อ่าน matrix 1 (main matrix)
-                if 1 in available_matrices:
-                    matrix_colors[1] = self.read_color_matrix(ws, raw, hr, hc, widths, heights)
-                    print(f"   🎨 1 (main matrix): {len(matrix_colors[1])} colors")
-                
-                # อ่าน matrices อื่นๆ
-                for thickness in available_matrices:
-                    if thickness == 1:
-                        continue  # ข้าม matrix 1 เพราะอ่านไปแล้ว
-                    
-                    hr_thick = self.find_thickness_matrix_in_column_a(ws, raw, thickness)
-                    if hr_thick is not None:
-                        colors = self.read_color_matrix_with_thickness_row(
-                            ws, raw, hr, hc, hr_thick, widths, heights, f"{thickness}"
-                        )
-                        matrix_colors[thickness] = colors
-                        print(f"   🎨 {thickness}: {len(colors)} colors อ่านได้")
-                
-                # Create Type record
-                type_rows.append({
-                    "ID": type_id,
-                    "Serie": base_name,
-                    "Type": sheet.strip(),
-                    "Description": sheet_description,
-                    "width_min": min(widths),
-                    "width_max": max(widths),
-                    "height_min": min(heights),
-                    "height_max": max(heights),
-                })
-                type_id += 1
-                
-                # Create Price records with consistent columns
-                sheet_price_count = 0
-                for i_h, h in enumerate(heights):
-                    for i_w, w in enumerate(widths):
-                        # อ่านราคาจาก main matrix (1)
-                        raw_price = raw.iat[hr + 1 + i_h, hc + 1 + i_w]
-                        p = self.to_number(raw_price)
-                        if p is None:
-                            continue
-                        
-                        # สร้าง price record พร้อมคอลัมน์ตามมาตรฐาน
-                        price_record = {
-                            "ID": price_id,
-                            "Serie": base_name,
-                            "Type": sheet.strip(),
-                            "Width": w,
-                            "Height": h,
-                            "Price": p,
-                            "Glass_QTY": sheet_glass_qty,
-                        }
-                        
-                        # เพิ่มคอลัมน์สีทุกคอลัมน์ตามมาตรฐาน (เติม FFFFFF ถ้าไม่มี)
-                        for i in range(1, max_matrices_count + 1):
-                            color_key = f"{i}_Color"
-                            if i in matrix_colors:
-                                color_value = matrix_colors[i].get((h, w), "FFFFFF")
-                            else:
-                                color_value = "FFFFFF"  # ไม่มี matrix นี้ในชีตนี้
-                            price_record[color_key] = color_value
-                        
-                        price_rows.append(price_record)
-                        price_id += 1
-                        sheet_price_count += 1
-                
-                processed_sheets += 1
-                print(f"   ✅ สร้าง {sheet_price_count} price records สำหรับ {sheet}")
+            type_rows.append({"ID": len(type_rows) + 1, **r["type_row"]})
+            # Price ID ต่อเนื่องตามลำดับชีต (record store สร้าง ID ตอนเขียนไฟล์)
+            price_store.extend(**r["price_block"])
+        
+        return price_store, type_rows, skipped_sheets, matrix_columns
+
+    def extract_file(self, source, original_filename: str = None, workers: Optional[int] = None,
+                     cache_dir: Optional[str] = None):
+        """ดึงข้อมูลทุกชีตแล้วรวมเป็น (price_store, type_rows, skipped_sheets, matrix_columns, cached_sheets)
+        
+        source เป็น path, bytes หรือ file-like object ก็ได้ (ไม่ต้องเขียนไฟล์ชั่วคราว)
+        ชีตแต่ละชีตเป็นอิสระต่อกัน จึงแบ่งชีตให้ worker processes ประมวลผลพร้อมกัน
+        (workers=1 จะประมวลผลทีละชีตใน process เดียว) ผลลัพธ์เหมือนกันทุกกรณี
+        cache_dir: เก็บผลดึงข้อมูลรายชีตตาม hash ของเนื้อหา - อัปโหลดซ้ำจะประมวลผลเฉพาะชีตที่แก้ไข
+        """
+        if hasattr(source, "read"):
+            # worker processes ต้องได้ข้อมูลที่ pickle ได้ - อ่าน file-like object เป็น bytes ครั้งเดียว
+            source = source.read()
+        
+        if original_filename:
+            base_name = os.path.splitext(original_filename)[0]
+        elif isinstance(source, (str, os.PathLike)):
+            base_name = os.path.splitext(os.path.basename(source))[0]
+            # ลบ UUID ออกจากชื่อไฟล์ (UUID format: 8-4-4-4-12 characters)
+            uuid_pattern = r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}_'
+            base_name = re.sub(uuid_pattern, '', base_name)
+        else:
+            base_name = self.job_id
+        
+        # hash เนื้อหาแต่ละชีต (stream XML ไม่ต้อง parse) - แต่ละชีตจะถูกอ่านแบบ streaming ตอนดึงข้อมูล
+        with StreamingXlsxReader(source) as reader:
+            sheet_names = reader.sheet_names
+            sheet_keys = {sheet: self.sheet_cache_key(reader, sheet) for sheet in sheet_names}
+        
+        # ผลลัพธ์ตาม key: จาก cache ก่อน แล้วดึงข้อมูลเฉพาะชีตแรกของแต่ละ key ที่ยังไม่มี
+        cache = DiskCache(cache_dir) if cache_dir else None
+        layout_path = os.path.join(cache_dir, "layout_offsets.json") if cache_dir else None
+        if layout_path:
+            self.layout_cache = LayoutOffsetCache(layout_path)
+        extracted = {}
+        if cache:
+            for key in set(sheet_keys.values()) - {None}:
+                cached = cache.get(key)
+                if cached is not None:
+                    extracted[key] = cached
+        pending = []
+        pending_keys = set()
+        for sheet in sheet_names:
+            key = sheet_keys[sheet]
+            if key is None or (key not in extracted and key not in pending_keys):
+                pending.append(sheet)
+                pending_keys.add(key)
+        
+        workers = min(workers or os.cpu_count() or 1, len(pending))
+        if workers > 1:
+            print(f"\n⚙️ ประมวลผล {len(pending)} ชีตด้วย {workers} processes")
+            # แบ่งชีตเป็นกลุ่มต่อเนื่อง - แต่ละ worker เปิด workbook ครั้งเดียวต่อกลุ่ม
+            chunk = math.ceil(len(pending) / workers)
+            groups = [pending[i:i + chunk] for i in range(0, len(pending), chunk)]
+            with ProcessPoolExecutor(max_workers=len(groups)) as pool:
+                futures = [
+                    pool.submit(_extract_sheet_group, self.job_id, source, base_name, group, layout_path)
+                    for group in groups
+                ]
+                pending_results = [r for future in futures for r in future.result()]
+        elif pending:
+            with StreamingXlsxReader(source) as reader:
+                pending_results = [self.extract_sheet(reader, sheet, base_name) for sheet in pending]
+        else:
+            pending_results = []
+        
+        fresh_results = dict(zip(pending, pending_results))
+        for sheet, result in fresh_results.items():
+            # offset ที่ worker เรียนรู้ได้ -> layout cache ของงานนี้
+            if result.get("layout"):
+                self.layout_cache.put(*result["layout"])
+            key = sheet_keys[sheet]
+            if key is not None:
+                extracted[key] = result
+                if cache:
+                    cache.put(key, result)
+        
+        # ประกอบผลลัพธ์ตามลำดับชีต (ID กำหนดใหม่ตอน merge)
+        sheet_results = []
+        cached_sheets = 0
+        for sheet in sheet_names:
+            result = fresh_results.get(sheet)
+            if result is None:
+                result = extracted[sheet_keys[sheet]]
+                cached_sheets += 1
+                print(f"   ♻️ {sheet}: เนื้อหาเหมือนเดิม ใช้ผลลัพธ์ที่มีอยู่แล้ว")
+            sheet_results.append(self.rebind_sheet_result(result, sheet, base_name))
+        
+        self.layout_cache.save()
+        
+        price_store, type_rows, skipped_sheets, matrix_columns = self.merge_sheet_results(sheet_results)
+        return price_store, type_rows, skipped_sheets, matrix_columns, cached_sheets
+
+    def result_summary(self, price_store, type_rows, skipped_sheets, cached_sheets, output_format):
+        """สรุปผลลัพธ์ (JSON ได้) ที่ส่งกลับให้ server.py"""
+        return {
+            "output_format": output_format,
+            "total_records": len(price_store),
+            "price_records": len(price_store),
+            "type_records": len(type_rows),
+            "processed_sheets": len(type_rows),
+            "cached_sheets": cached_sheets,
+            "skipped_sheets": skipped_sheets,
+            "warnings": []
+        }
+
+    def process_file(self, input_file: str, output_dir: str, original_filename: str = None,
+                     workers: Optional[int] = None, output_format: str = "xlsx",
+                     cache_dir: Optional[str] = None):
+        """Process the Excel file แล้วเขียน Price/Type ลง output_dir
+        
+        output_format: xlsx, csv, jsonl หรือ parquet (ดู extract_file สำหรับ workers/cache_dir)
+        """
+        try:
+            output_format = validate_format(output_format)
+            price_store, type_rows, skipped_sheets, matrix_columns, cached_sheets = self.extract_file(
+                input_file, original_filename, workers, cache_dir
+            )
             
             # Ensure output directory exists
             output_path = Path(output_dir)
             output_path.mkdir(exist_ok=True)
             
             # Save output files
-            price_file = output_path / f"Price_{self.job_id}.xlsx"
-            type_file = output_path / f"Type_{self.job_id}.xlsx"
+            price_file = output_path / output_filename("Price", self.job_id, output_format)
+            type_file = output_path / output_filename("Type", self.job_id, output_format)
             
-            pd.DataFrame(price_rows).to_excel(price_file, index=False)
-            pd.DataFrame(type_rows).to_excel(type_file, index=False)
+            write_price_store(price_file, price_store, output_format)
+            write_records(type_file, type_rows, output_format)
             
-            print(f"\n✅ เสร็จสิ้น: {len(price_rows)} price records, {len(type_rows)} type records")
+            print(f"\n✅ เสร็จสิ้น: {len(price_store)} price records, {len(type_rows)} type records")
             print(f"📋 คอลัมน์ที่สร้าง: {matrix_columns}")
             
             return {
                 "price_file": str(price_file),
                 "type_file": str(type_file),
-                "total_records": len(price_rows),
-                "processed_sheets": processed_sheets,
-                "skipped_sheets": skipped_sheets,
-                "warnings": warnings
+                **self.result_summary(price_store, type_rows, skipped_sheets, cached_sheets, output_format)
             }
             
         except Exception as e:
             print(f"❌ Error: {str(e)}")
             raise Exception(f"Processing failed: {str(e)}")
 
+    def process_buffer(self, source, original_filename: str = None, workers: Optional[int] = None,
+                       output_format: str = "xlsx", cache_dir: Optional[str] = None):
+        """เหมือน process_file แต่รับ bytes/file-like object และสร้างไฟล์ผลลัพธ์ในหน่วยความจำ
+        
+        คืน (result, artifacts) - artifacts = {"price": bytes, "type": bytes} ตาม output_format
+        """
+        try:
+            output_format = validate_format(output_format)
+            price_store, type_rows, skipped_sheets, matrix_columns, cached_sheets = self.extract_file(
+                source, original_filename, workers, cache_dir
+            )
+            
+            price_buffer = io.BytesIO()
+            type_buffer = io.BytesIO()
+            write_price_store(price_buffer, price_store, output_format)
+            write_records(type_buffer, type_rows, output_format)
+            
+            print(f"\n✅ เสร็จสิ้น: {len(price_store)} price records, {len(type_rows)} type records")
+            print(f"📋 คอลัมน์ที่สร้าง: {matrix_columns}")
+            
+            result = self.result_summary(price_store, type_rows, skipped_sheets, cached_sheets, output_format)
+            return result, {"price": price_buffer.getvalue(), "type": type_buffer.getvalue()}
+            
+        except Exception as e:
+            print(f"❌ Error: {str(e)}")
+            raise Exception(f"Processing failed: {str(e)}")
+
+def _extract_sheet_group(job_id: str, source, base_name: str, sheet_names: list,
+                         layout_path: Optional[str] = None):
+    """Worker process: เปิด workbook (path หรือ bytes) ครั้งเดียวแล้วดึงข้อมูลจากกลุ่มชีตตามลำดับ"""
+    extractor = ColorExtractor(job_id, LayoutOffsetCache(layout_path))
+    with StreamingXlsxReader(source) as reader:
+        return [extractor.extract_sheet(reader, sheet, base_name) for sheet in sheet_names]
+
 def main():
     """Main function to handle command line arguments"""
     parser = argparse.ArgumentParser(description='Excel Color Extractor - Matrix Mode')
@@ -504,6 +775,14 @@ def main():
     parser.add_argument('--job-id', required=True, help='Job ID for output files')
     parser.add_argument('--output-dir', default='outputs', help='Output directory')
     parser.add_argument('--original-filename', help='Original filename for base name extraction')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Number of worker processes for sheets (default: CPU count, 1 = serial)')
+    parser.add_argument('--output-format', choices=list(OUTPUT_FORMATS), default='xlsx',
+                        help='Output format for Price/Type files')
+    parser.add_argument('--cache-dir', default=None,
+                        help='Directory for per-sheet result cache (unchanged sheets are not re-extracted)')
+    parser.add_argument('--preview', action='store_true',
+                        help='Dry-run: report detected matrices per sheet without reading colors or writing files')
     
     args = parser.parse_args()
     
@@ -522,12 +801,20 @@ def main():
         if args.original_filename:
             print(f"📝 Original filename: {args.original_filename}")
         
-        # Process the file
         extractor = ColorExtractor(args.job_id)
+        
+        if args.preview:
+            print(json.dumps(extractor.preview_file(args.input)))
+            return
+        
+        # Process the file
         result = extractor.process_file(
             input_file=args.input,
             output_dir=args.output_dir,
-            original_filename=args.original_filename
+            original_filename=args.original_filename,
+            workers=args.workers,
+            output_format=args.output_format,
+            cache_dir=args.cache_dir
         )
         
         # Output result as JSON for server.py to parse
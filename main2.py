@@ -1,14 +1,19 @@
 import pandas as pd
+import numpy as np
+import io
 import os
 import re
 from typing import List, Dict, Tuple, Optional
 import logging
-from openpyxl import load_workbook
+from concurrent.futures import ProcessPoolExecutor
+import math
 from flask import Flask, request, jsonify, send_file, render_template_string
 import uuid
 import time
-import shutil
 from werkzeug.utils import secure_filename
+from output_formats import OUTPUT_FORMATS, output_filename, validate_format, write_price_store, write_records
+from record_store import PriceRecordStore
+from xlsx_reader import StreamingXlsxReader
 # Ensure pandas and openpyxl are installed
 
 # Set up logging
@@ -16,28 +21,38 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 logger = logging.getLogger(__name__)
 
 class ExcelProcessor:
-    def __init__(self, input_file: str, original_filename: str = None):
+    def __init__(self, input_file, original_filename: str = None):
+        # input_file เป็น path, bytes หรือ file-like object (เช่นไฟล์ที่อัปโหลดมา) ก็ได้
+        if hasattr(input_file, 'read'):
+            input_file = input_file.read()
         self.input_file = input_file
         self.original_filename = original_filename
-        self.price_records: List[Dict] = []
+        self.price_records = PriceRecordStore(['Color'])
         self.type_records: List[Dict] = []
-        self.price_id = 1
         self.type_id = 1
         self.description_map: Dict[str, str] = {}
+        self.output_files: Dict[str, str] = {}
+        self.artifacts: Dict[str, bytes] = {}
+        self.table_sheets: List[str] = []
         
         # Extract series name from filename
         self.series_name = self.extract_series_from_filename()
         print(f"📱 ชื่อ Serie: {self.series_name}")
         
-        # Cache for optimized reading
-        self._wb = None
+        # Cache for optimized reading - แต่ละชีตถูก stream เพียงครั้งเดียว (ค่า + สีในรอบเดียวกัน)
+        self._reader = None
         self._sheets_cache = {}
+        self._worksheets = {}
+        self._color_cache: Dict[int, str] = {}
     
     def extract_series_from_filename(self) -> str:
         """ดึงชื่อ series จากชื่อไฟล์ โดยจัดการกับ UUID และ timestamp"""
         if self.original_filename:
             # ใช้ชื่อไฟล์ต้นฉบับ
             base_name = os.path.splitext(self.original_filename)[0]
+        elif self.is_buffer:
+            # ไม่มีชื่อไฟล์ให้ใช้
+            return ''
         else:
             # ใช้ชื่อไฟล์ปัจจุบัน
             base_name = os.path.splitext(os.path.basename(self.input_file))[0]
@@ -75,47 +90,88 @@ class ExcelProcessor:
         
         return base_name
     
+    @property
+    def is_buffer(self) -> bool:
+        """True ถ้า input เป็นข้อมูลในหน่วยความจำ (bytes) ไม่ใช่ path"""
+        return isinstance(self.input_file, (bytes, bytearray))
+    
+    def open_source(self):
+        """path หรือ BytesIO ใหม่ทุกครั้ง (pandas/openpyxl แต่ละตัวอ่านจากต้นไฟล์เอง)"""
+        return io.BytesIO(self.input_file) if self.is_buffer else self.input_file
+    
+    def describe_source(self) -> str:
+        return f"<{len(self.input_file)} bytes>" if self.is_buffer else str(self.input_file)
+    
     def validate_file(self) -> bool:
         """Validate that the input file exists and is accessible"""
+        if self.is_buffer:
+            if not self.input_file:
+                logger.error("ไฟล์ว่างเปล่า")
+                return False
+            return True
         if not os.path.exists(self.input_file):
             logger.error(f"ไม่เจอไฟล์ {self.input_file}")
             return False
         return True
     
-    def get_optimized_workbook(self):
-        """Get cached workbook with optimized settings"""
-        if self._wb is None:
-            logger.info("Loading workbook with optimized settings...")
-            self._wb = load_workbook(
-                self.input_file, 
-                read_only=True,  # Much faster
-                data_only=True,  # Get calculated values
-                keep_links=False  # Don't load external links
-            )
-        return self._wb
+    def get_optimized_workbook(self) -> StreamingXlsxReader:
+        """Get cached streaming reader (cached values เหมือน data_only=True)"""
+        if self._reader is None:
+            logger.info("Loading workbook with streaming reader...")
+            self._reader = StreamingXlsxReader(self.open_source())
+        return self._reader
     
-    def read_sheet_optimized(self, sheet_name_or_index, **kwargs):
-        """Read sheet with optimized pandas settings"""
-        cache_key = f"{sheet_name_or_index}_{str(kwargs)}"
+    def read_worksheet(self, sheet_name_or_index, header=0, dtype=None, with_fills=True):
+        """Stream ชีตครั้งเดียว: ค่า (เหมือน pd.read_excel) + fillId ของแถวที่มีค่า
+        คืน StreamingWorksheet (ค่าอยู่ใน .values, สีอ่านด้วย .cell_fill)
+        with_fills=False อ่านเฉพาะค่า (ชีตที่ไม่ต้องใช้สี เช่น descriptions)"""
+        reader = self.get_optimized_workbook()
+        if isinstance(sheet_name_or_index, int):
+            sheet_name = reader.sheet_names[sheet_name_or_index]
+        else:
+            sheet_name = sheet_name_or_index
+        cache_key = f"{sheet_name}_{header}_{dtype}_{with_fills}"
         if cache_key not in self._sheets_cache:
             logger.info(f"Loading sheet: {sheet_name_or_index}")
-            
-            # Use pandas default engine (openpyxl) without conflicting parameters
-            self._sheets_cache[cache_key] = pd.read_excel(
-                self.input_file,
-                sheet_name=sheet_name_or_index,
-                engine='openpyxl',
-                **kwargs
-            )
+            self._sheets_cache[cache_key] = reader.read_sheet(sheet_name, header=header, dtype=dtype,
+                                                              with_fills=with_fills)
+            if with_fills:
+                self._worksheets[sheet_name] = self._sheets_cache[cache_key]
         return self._sheets_cache[cache_key]
     
-    def load_descriptions_from_sheet2(self) -> bool:
+    def read_sheet_optimized(self, sheet_name_or_index, **kwargs):
+        """Read sheet with optimized settings (header/dtype แบบ pd.read_excel)"""
+        return self.read_worksheet(sheet_name_or_index, **kwargs).values
+    
+    def is_table_sheet(self, sheet_name: str) -> bool:
+        """ชีตตาราง: header แถวที่ 2 มีคอลัมน์ Price และ W หรือ H (อ่านแค่ 2 แถวแรก)"""
+        _, sub_header = self.get_optimized_workbook().header_rows(sheet_name, 2)
+        sub_header = {str(value).strip() for value in sub_header}
+        return 'Price' in sub_header and ('W' in sub_header or 'H' in sub_header)
+    
+    def find_table_sheets(self) -> Tuple[List[str], Optional[str]]:
+        """แยกชีตตารางกับชีต descriptions
+        
+        ชีตแรกเป็นชีตตารางเสมอ (เหมือนเดิม) ชีตอื่นที่มี header แบบตารางจะถูกประมวลผลด้วย
+        ชีต descriptions = ชีตแรกที่ไม่ใช่ชีตตาราง (workbook แบบเดิมคือ sheet2)
+        """
+        reader = self.get_optimized_workbook()
+        table_sheets = reader.sheet_names[:1]
+        description_sheet = None
+        for sheet_name in reader.sheet_names[1:]:
+            if self.is_table_sheet(sheet_name):
+                table_sheets.append(sheet_name)
+            elif description_sheet is None:
+                description_sheet = sheet_name
+        return table_sheets, description_sheet
+    
+    def load_descriptions_from_sheet2(self, sheet_name_or_index=1) -> bool:
         """Load descriptions from sheet2 mapping Type to Description - OPTIMIZED"""
         try:
             print("📖 กำลังอ่าน sheet2 สำหรับ descriptions...")
             logger.info("Loading descriptions from sheet2...")
             # Use optimized reading
-            df_sheet2 = self.read_sheet_optimized(1, dtype=str)
+            df_sheet2 = self.read_sheet_optimized(sheet_name_or_index, dtype=str, with_fills=False)
             
             # Strip whitespace from column names
             df_sheet2.columns = df_sheet2.columns.str.strip()
@@ -138,15 +194,14 @@ class ExcelProcessor:
             
             print(f"✅ พบคอลัมน์: Type='{type_col}', Description='{desc_col}'")
             
-            # Create mapping efficiently using vectorized operations
+            # Create mapping with whole-column operations (แถวหลังทับแถวก่อนถ้า Type ซ้ำ)
             valid_mask = (df_sheet2[type_col].notna()) & (df_sheet2[type_col] != 'nan')
             valid_data = df_sheet2[valid_mask]
             
-            for _, row in valid_data.iterrows():
-                type_name = str(row[type_col]).strip()
-                desc_text = str(row[desc_col]).strip() if pd.notna(row[desc_col]) else ''
-                if type_name:
-                    self.description_map[type_name] = desc_text
+            type_names = valid_data[type_col].astype(str).str.strip()
+            desc_texts = valid_data[desc_col].where(valid_data[desc_col].notna(), '').astype(str).str.strip()
+            keep = type_names != ''
+            self.description_map.update(zip(type_names[keep].tolist(), desc_texts[keep].tolist()))
             
             print(f"✅ โหลด descriptions สำเร็จ: {len(self.description_map)} รายการ")
             logger.info(f"Loaded {len(self.description_map)} descriptions from sheet2")
@@ -158,11 +213,13 @@ class ExcelProcessor:
             return False
     
     def update_type_descriptions(self):
-        """Update type records with descriptions from sheet2"""
-        for record in self.type_records:
-            type_name = record['Type']
-            description = self.description_map.get(type_name, '')
-            record['Description'] = description
+        """Update type records with descriptions from sheet2 (join Type -> Description ทีเดียวทั้งคอลัมน์)"""
+        if not self.type_records:
+            return
+        # dtype=object เก็บค่าเดิมของทุกคอลัมน์ไว้ (ไม่แปลง int/float ตอนแปลงกลับเป็น records)
+        types = pd.DataFrame(self.type_records, dtype=object)
+        types['Description'] = types['Type'].map(pd.Series(self.description_map, dtype=object)).fillna('')
+        self.type_records = types.to_dict('records')
             
         logger.info("Updated Type descriptions")
     
@@ -176,27 +233,37 @@ class ExcelProcessor:
         df.columns = pd.MultiIndex.from_tuples(clean_cols)
         return df
     
+    def fill_to_color(self, fill) -> str:
+        """แปลง Fill ของเซลล์เป็นสี hex (ไม่มีสี = FFFFFF)"""
+        if fill and fill.start_color and fill.start_color.rgb:
+            color = str(fill.start_color.rgb)
+            # Remove 'FF' prefix if present (alpha channel)
+            if len(color) == 8 and color.startswith('FF'):
+                color = color[2:]
+            
+            # Check for empty colors
+            if color == '00000000' or color == '000000' or not color:
+                return 'FFFFFF'
+            
+            return color
+        return 'FFFFFF'
+    
     def read_cell_background_color_optimized(self, sheet_name: str, row: int, col: int) -> str:
-        """Read background color from Excel cell - OPTIMIZED"""
+        """Read background color from Excel cell - OPTIMIZED
+        
+        ดูจาก fillId ที่เก็บไว้ตอน stream ชีต (ไม่อ่านชีตซ้ำ) และแปลงสีครั้งเดียวต่อ fill
+        """
         try:
-            wb = self.get_optimized_workbook()
-            ws = wb[sheet_name] if sheet_name in wb.sheetnames else wb.active
+            reader = self.get_optimized_workbook()
+            if sheet_name not in reader.sheet_names:
+                sheet_name = reader.sheet_names[0]
+            ws = self._worksheets.get(sheet_name) or self.read_worksheet(sheet_name)
             
-            # Use 1-based indexing for openpyxl
-            cell = ws.cell(row=row + 1, column=col + 1)
-            
-            if cell.fill and cell.fill.start_color and cell.fill.start_color.rgb:
-                color = str(cell.fill.start_color.rgb)
-                # Remove 'FF' prefix if present (alpha channel)
-                if len(color) == 8 and color.startswith('FF'):
-                    color = color[2:]
-                
-                # Check for empty colors
-                if color == '00000000' or color == '000000' or not color:
-                    return 'FFFFFF'
-                
-                return color
-            return 'FFFFFF'
+            # Use 1-based indexing (same cell as openpyxl ws.cell)
+            fill_id = ws.cell_fill_id(row + 1, col + 1)
+            if fill_id not in self._color_cache:
+                self._color_cache[fill_id] = self.fill_to_color(ws.cell_fill(row + 1, col + 1))
+            return self._color_cache[fill_id]
             
         except Exception as e:
             logger.warning(f"Cannot read cell color: {e}")
@@ -210,75 +277,64 @@ class ExcelProcessor:
             return 'H'
         return None
     
-    def process_width_data(self, table_name: str, vals: pd.DataFrame, 
-                          sheet_name: str = None) -> Tuple[float, float]:
-        """Process width-based pricing data - OPTIMIZED"""
-        w_vals = vals['W'].astype(float)
-        p_vals = vals['Price'].astype(float)
-        wmin, wmax = w_vals.min(), w_vals.max()
+    def read_column_colors(self, sheet_name: str, rows: np.ndarray, col: int) -> np.ndarray:
+        """สีของหลายเซลล์ในคอลัมน์เดียว (rows/col เป็น 0-based แบบเดียวกับ read_cell_background_color_optimized)
+        ดู fillId ทั้งคอลัมน์ในครั้งเดียว แล้วแปลงเป็นสีครั้งเดียวต่อ fill"""
+        colors = np.full(len(rows), 'FFFFFF', dtype=object)
+        if not sheet_name or not len(rows):
+            return colors
+        try:
+            reader = self.get_optimized_workbook()
+            if sheet_name not in reader.sheet_names:
+                sheet_name = reader.sheet_names[0]
+            ws = self._worksheets.get(sheet_name) or self.read_worksheet(sheet_name)
+            
+            fill_ids = ws.cell_fill_ids(np.asarray(rows) + 1, col + 1)
+        except Exception as e:
+            logger.warning(f"Cannot read cell color: {e}")
+            return colors
+        
+        uniques, inverse = np.unique(fill_ids, return_inverse=True)
+        lookup = np.full(len(uniques), 'FFFFFF', dtype=object)
+        for i, fill_id in enumerate(uniques.tolist()):
+            try:
+                if fill_id not in self._color_cache:
+                    self._color_cache[fill_id] = self.fill_to_color(ws.reader.fills[fill_id] if fill_id >= 0 else None)
+                lookup[i] = self._color_cache[fill_id]
+            except Exception as e:
+                logger.warning(f"Cannot read cell color: {e}")
+        return lookup[inverse]
+    
+    def process_dimension_data(self, table_name: str, vals: pd.DataFrame, mode: str,
+                               sheet_name: str = None) -> Tuple[float, float]:
+        """เพิ่ม Price records ของทั้งตารางในครั้งเดียว (W หรือ H + Price + สีของ Price cell)"""
+        dims = vals[mode].astype(float)
+        prices = vals['Price'].astype(float)
+        dmin, dmax = dims.min(), dims.max()
         
         # Pre-calculate color column index
         price_col_idx = list(vals.columns).index('Price')
         
-        # Process in batch for better performance
-        for idx, (w, p) in enumerate(zip(w_vals, p_vals)):
-            original_idx = vals.index[idx]
-            
-            # Read color optimized
-            color = 'FFFFFF'
-            if sheet_name:
-                color = self.read_cell_background_color_optimized(
-                    sheet_name, original_idx + 2, price_col_idx
-                )
-            
-            self.price_records.append({
-                'ID': self.price_id,
-                'Serie': self.series_name,  # เปลี่ยนจาก 'Series': 0
-                'Type': table_name,
-                'Width': w,
-                'Height': 0,
-                'Price': p,
-                'Glass_QTY': 0,
-                'Color': color
-            })
-            self.price_id += 1
-        
-        return wmin, wmax
+        # แถวใน DataFrame (header 2 แถว) -> แถวใน Excel
+        colors = self.read_column_colors(sheet_name, vals.index.to_numpy() + 2, price_col_idx)
+        
+        # ID จะถูกสร้างต่อเนื่องตอนเขียนไฟล์
+        zeros = np.zeros(len(vals), dtype=np.int64)
+        widths, heights = (dims.to_numpy(), zeros) if mode == 'W' else (zeros, dims.to_numpy())
+        self.price_records.extend(self.series_name, table_name, widths, heights, prices.to_numpy(), 0,
+                                  {'Color': colors})
+        
+        return dmin, dmax
+    
+    def process_width_data(self, table_name: str, vals: pd.DataFrame, 
+                          sheet_name: str = None) -> Tuple[float, float]:
+        """Process width-based pricing data - OPTIMIZED"""
+        return self.process_dimension_data(table_name, vals, 'W', sheet_name)
     
     def process_height_data(self, table_name: str, vals: pd.DataFrame,
                            sheet_name: str = None) -> Tuple[float, float]:
         """Process height-based pricing data - OPTIMIZED"""
-        h_vals = vals['H'].astype(float)
-        p_vals = vals['Price'].astype(float)
-        hmin, hmax = h_vals.min(), h_vals.max()
-        
-        # Pre-calculate color column index
-        price_col_idx = list(vals.columns).index('Price')
-        
-        # Process in batch for better performance
-        for idx, (h, p) in enumerate(zip(h_vals, p_vals)):
-            original_idx = vals.index[idx]
-            
-            # Read color optimized
-            color = 'FFFFFF'
-            if sheet_name:
-                color = self.read_cell_background_color_optimized(
-                    sheet_name, original_idx + 2, price_col_idx
-                )
-            
-            self.price_records.append({
-                'ID': self.price_id,
-                'Serie': self.series_name,  # เปลี่ยนจาก 'Series': 0
-                'Type': table_name,
-                'Width': 0,
-                'Height': h,
-                'Price': p,
-                'Glass_QTY': 0,
-                'Color': color
-            })
-            self.price_id += 1
-        
-        return hmin, hmax
+        return self.process_dimension_data(table_name, vals, 'H', sheet_name)
     
     def add_type_record(self, table_name: str, wmin: float, wmax: float, 
                        hmin: float, hmax: float):
@@ -353,62 +409,124 @@ class ExcelProcessor:
             logger.error(f"Error processing {table_name}: {e}")
             return False
     
-    def save_results(self, job_id: str) -> None:
-        """Save processed data to Excel files with simple names"""
-        if self.price_records:
-            price_filename = 'Price.xlsx'
-            pd.DataFrame(self.price_records).to_excel(price_filename, index=False)
-            logger.info(f"Saved {len(self.price_records)} price records to {price_filename}")
-        
-        if self.type_records:
-            type_filename = 'Type.xlsx'
-            pd.DataFrame(self.type_records).to_excel(type_filename, index=False)
-            logger.info(f"Saved {len(self.type_records)} type records to {type_filename}")
+    def save_results(self, job_id: str, output_format: str = 'xlsx', in_memory: bool = False) -> None:
+        """Save processed data with simple names (Price.<ext>, Type.<ext>)
+        
+        in_memory=True จะเก็บไฟล์เป็น bytes ใน self.artifacts แทนการเขียนลงดิสก์
+        """
+        outputs = (
+            ('price', 'Price', write_price_store, self.price_records),
+            ('type', 'Type', write_records, self.type_records),
+        )
+        for key, prefix, write, records in outputs:
+            if not records:
+                continue
+            filename = output_filename(prefix, output_format=output_format)
+            if in_memory:
+                buffer = io.BytesIO()
+                write(buffer, records, output_format)
+                self.artifacts[key] = buffer.getvalue()
+            else:
+                write(filename, records, output_format)
+                self.output_files[key] = filename
+            logger.info(f"Saved {len(records)} {key} records to {'memory' if in_memory else filename}")
+    
+    def process_sheet(self, sheet_name: str) -> Tuple[int, int]:
+        """ประมวลผลทุกตารางในชีตตาราง 1 ชีต คืน (จำนวนตารางที่สำเร็จ, จำนวนตารางทั้งหมด)"""
+        # Read table sheet with optimized settings
+        print(f"📋 กำลังอ่านชีต {sheet_name}...")
+        logger.info(f"Loading table sheet {sheet_name}...")
+        df = self.read_sheet_optimized(sheet_name, header=[0, 1], dtype=str)
+        print(f"✅ อ่านชีต {sheet_name} สำเร็จ")
+        
+        # Clean headers
+        print("🔧 กำลังทำความสะอาด headers...")
+        df = self.clean_headers(df)
+        
+        # Filter out empty top-level columns
+        df = df.loc[:, df.columns.get_level_values(0) != '']
+        
+        # Process each table in order
+        print("🔄 เริ่มประมวลผลตารางต่างๆ...")
+        processed_count = 0
+        table_names = df.columns.get_level_values(0).unique()
+        
+        print(f"📊 พบ {len(table_names)} ตาราง: {list(table_names)}")
+        
+        for table_name in table_names:
+            if self.process_table(table_name, df[table_name].copy(), sheet_name):
+                processed_count += 1
+        
+        return processed_count, len(table_names)
+    
+    def merge_sheet_results(self, price_records: PriceRecordStore, type_records: List[Dict]) -> None:
+        """ต่อผลของชีตอื่น (จาก worker process) ท้ายผลปัจจุบัน - Type ID ต่อเนื่องตามลำดับชีต"""
+        self.price_records.extend_store(price_records)
+        for record in type_records:
+            record['ID'] = self.type_id
+            self.type_records.append(record)
+            self.type_id += 1
     
-    def process(self, job_id: str) -> bool:
-        """Main processing function - OPTIMIZED"""
+    def process_sheets_parallel(self, sheet_names: List[str], workers: int) -> Tuple[int, int]:
+        """แบ่งชีตตารางเป็นกลุ่มต่อเนื่องให้ worker processes แล้วรวมผลตามลำดับชีต"""
+        print(f"⚙️ ประมวลผล {len(sheet_names)} ชีตตารางด้วย {workers} processes")
+        chunk = math.ceil(len(sheet_names) / workers)
+        groups = [sheet_names[i:i + chunk] for i in range(0, len(sheet_names), chunk)]
+        processed_count = table_count = 0
+        with ProcessPoolExecutor(max_workers=len(groups)) as pool:
+            futures = [
+                pool.submit(_process_sheet_group, self.input_file, self.original_filename, group)
+                for group in groups
+            ]
+            for future in futures:
+                price_records, type_records, processed, tables = future.result()
+                self.merge_sheet_results(price_records, type_records)
+                processed_count += processed
+                table_count += tables
+        return processed_count, table_count
+    
+    def process(self, job_id: str, output_format: str = 'xlsx', in_memory: bool = False,
+                workers: Optional[int] = None) -> bool:
+        """Main processing function - OPTIMIZED
+        
+        output_format: xlsx, csv, jsonl หรือ parquet
+        in_memory: ไม่เขียนไฟล์ - ผลลัพธ์อยู่ใน self.artifacts ({'price': bytes, 'type': bytes})
+        workers: จำนวน processes สำหรับ workbook ที่มีหลายชีตตาราง (None = จำนวน CPU, 1 = ทีละชีต)
+        """
         if not self.validate_file():
             return False
+        output_format = validate_format(output_format)
         
         try:
-            print(f"🚀 เริ่มประมวลผล: {self.input_file}")
-            logger.info(f"Starting optimized processing of {self.input_file}")
+            print(f"🚀 เริ่มประมวลผล: {self.describe_source()}")
+            logger.info(f"Starting optimized processing of {self.describe_source()}")
             
-            # Get optimized workbook for color reading
+            # Get streaming reader (values and colors come from the same pass)
             print("📂 กำลังเปิดไฟล์...")
-            wb = self.get_optimized_workbook()
-            sheet_name = wb.sheetnames[0]  # First sheet name
-            print(f"✅ เปิดไฟล์สำเร็จ - Sheet หลัก: {sheet_name}")
-            
-            # Read main sheet with optimized settings
-            print("📋 กำลังอ่าน main sheet...")
-            logger.info("Loading main sheet...")
-            df = self.read_sheet_optimized(0, header=[0, 1], dtype=str)
-            print(f"✅ อ่าน main sheet สำเร็จ")
-            
-            # Clean headers
-            print("🔧 กำลังทำความสะอาด headers...")
-            df = self.clean_headers(df)
-            
-            # Filter out empty top-level columns
-            df = df.loc[:, df.columns.get_level_values(0) != '']
-            
-            # Process each table in order
-            print("🔄 เริ่มประมวลผลตารางต่างๆ...")
-            processed_count = 0
-            table_names = df.columns.get_level_values(0).unique()
-            
-            print(f"📊 พบ {len(table_names)} ตาราง: {list(table_names)}")
-            
-            for table_name in table_names:
-                if self.process_table(table_name, df[table_name].copy(), sheet_name):
-                    processed_count += 1
-            
-            print(f"✅ ประมวลผลตารางเสร็จสิ้น: {processed_count}/{len(table_names)}")
+            self.get_optimized_workbook()
+            self.table_sheets, description_sheet = self.find_table_sheets()
+            print(f"✅ เปิดไฟล์สำเร็จ - ชีตตาราง: {self.table_sheets}")
+            
+            # ชีตตารางเป็นอิสระต่อกัน - หลายชีตประมวลผลพร้อมกันได้ (ผลลัพธ์เหมือนทำทีละชีต)
+            workers = min(workers or os.cpu_count() or 1, len(self.table_sheets))
+            if workers > 1:
+                processed_count, table_count = self.process_sheets_parallel(self.table_sheets, workers)
+            else:
+                processed_count = table_count = 0
+                for sheet_name in self.table_sheets:
+                    processed, tables = self.process_sheet(sheet_name)
+                    processed_count += processed
+                    table_count += tables
+            
+            print(f"✅ ประมวลผลตารางเสร็จสิ้น: {processed_count}/{table_count}")
             
             # Load descriptions from sheet2
             print("📖 กำลังอ่าน descriptions จาก sheet2...")
-            self.load_descriptions_from_sheet2()
+            if description_sheet is None:
+                print("⚠️ ไม่พบชีต descriptions")
+                logger.warning("No description sheet found")
+            else:
+                self.load_descriptions_from_sheet2(description_sheet)
             
             # Update type records with descriptions
             print("🔄 กำลังอัพเดท descriptions...")
@@ -416,7 +534,7 @@ class ExcelProcessor:
             
             # Save results with job_id
             print("💾 กำลังบันทึกผลลัพธ์...")
-            self.save_results(job_id)
+            self.save_results(job_id, output_format, in_memory)
             
             print(f"🎉 ประมวลผลเสร็จสิ้น: {processed_count} ตาราง")
             print(f"📊 Price records: {len(self.price_records)}")
@@ -431,24 +549,41 @@ class ExcelProcessor:
             return False
         finally:
             # Clean up resources
-            if self._wb:
-                self._wb.close()
+            if self._reader:
+                self._reader.close()
                 print("🔒 ปิดไฟล์แล้ว")
 
-def process_multi_table_excel(input_file: str, job_id: str, original_filename: str = None) -> bool:
+def _process_sheet_group(input_file, original_filename: str, sheet_names: List[str]):
+    """Worker process: เปิด workbook (path หรือ bytes) ครั้งเดียวแล้วประมวลผลกลุ่มชีตตารางตามลำดับ"""
+    processor = ExcelProcessor(input_file, original_filename)
+    processed_count = table_count = 0
+    try:
+        for sheet_name in sheet_names:
+            processed, tables = processor.process_sheet(sheet_name)
+            processed_count += processed
+            table_count += tables
+    finally:
+        if processor._reader:
+            processor._reader.close()
+    return processor.price_records, processor.type_records, processed_count, table_count
+
+def process_multi_table_excel(input_file: str, job_id: str, original_filename: str = None,
+                              output_format: str = 'xlsx', workers: Optional[int] = None) -> bool:
     """
-    Process multi-table Excel file and generate Price.xlsx and Type.xlsx
+    Process multi-table Excel file and generate Price and Type files
     
     Args:
         input_file: Path to the input Excel file
         job_id: Unique job identifier for output files
         original_filename: Original filename before processing
+        output_format: xlsx, csv, jsonl or parquet
+        workers: processes for workbooks with several table sheets (None = CPU count)
         
     Returns:
         bool: True if processing was successful, False otherwise
     """
     processor = ExcelProcessor(input_file, original_filename)
-    return processor.process(job_id)
+    return processor.process(job_id, output_format, workers=workers)
 
 # Flask Web Application
 app = Flask(__name__)
@@ -458,6 +593,8 @@ UPLOAD_FOLDER = 'uploads'
 OUTPUT_FOLDER = 'outputs'
 MAX_FILE_SIZE = 25 * 1024 * 1024  # 25MB
 ALLOWED_EXTENSIONS = {'xlsx'}
+# Flask server มีหลาย thread - ประมวลผลชีตตารางใน process เดียวเป็นค่าเริ่มต้น (ตั้ง JOINT_WORKERS เพื่อใช้ process pool)
+JOINT_WORKERS = int(os.environ.get('JOINT_WORKERS', '1'))
 
 # Create directories if they don't exist
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
@@ -520,7 +657,12 @@ def process_file():
         file_content = file.read()
         if len(file_content) > MAX_FILE_SIZE:
             return jsonify({'message': 'ไฟล์ใหญ่เกินไป (สูงสุด 25MB)'}), 400
-        file.seek(0)  # Reset file pointer
+        
+        # Validate output format (xlsx, csv, jsonl, parquet)
+        try:
+            output_format = validate_format(request.form.get('output_format', 'xlsx'))
+        except (ValueError, RuntimeError) as e:
+            return jsonify({'message': str(e)}), 400
         
         # Generate job ID with timestamp for better naming
         from datetime import datetime
@@ -528,54 +670,40 @@ def process_file():
         random_suffix = str(uuid.uuid4())[:8]  # Short UUID for uniqueness
         job_id = f"{timestamp}_{random_suffix}"
         
-        # Save uploaded file
         original_filename = file.filename  # เก็บชื่อไฟล์ต้นฉบับ
         filename = secure_filename(file.filename)
-        input_path = os.path.join(UPLOAD_FOLDER, f'{job_id}_{filename}')
-        file.save(input_path)
         
         logger.info(f"Processing file: {filename} with job_id: {job_id}")
         
         # Record start time
         start_time = time.time()
         
-        # Process the file with original filename
-        success = process_multi_table_excel(input_path, job_id, original_filename)
+        # Process the uploaded bytes in memory (no temporary input/output files)
+        processor = ExcelProcessor(file_content, original_filename)
+        success = processor.process(job_id, output_format, in_memory=True, workers=JOINT_WORKERS)
         
         # Calculate processing time
         processing_time = time.time() - start_time
         
-        # Clean up input file
-        try:
-            os.remove(input_path)
-        except:
-            pass
-        
         if not success:
             return jsonify({
                 'message': 'เกิดข้อผิดพลาดในการประมวลผล'
             }), 500
         
-        # Count records in generated files
-        price_count = 0
-        type_count = 0
+        # Record counts come straight from the processor (no re-reading output files)
+        price_count = len(processor.price_records)
+        type_count = len(processor.type_records)
         
         try:
-            price_file = 'Price.xlsx'
-            type_file = 'Type.xlsx'
-            
-            if os.path.exists(price_file):
-                price_count = len(pd.read_excel(price_file))
-                # Copy to output folder with job_id for download tracking
-                shutil.copy2(price_file, os.path.join(OUTPUT_FOLDER, f'Price_{job_id}.xlsx'))
-                
-            if os.path.exists(type_file):
-                type_count = len(pd.read_excel(type_file))
-                # Copy to output folder with job_id for download tracking
-                shutil.copy2(type_file, os.path.join(OUTPUT_FOLDER, f'Type_{job_id}.xlsx'))
+            # Write final artifacts to output folder with job_id for download tracking
+            for prefix, key in (('Price', 'price'), ('Type', 'type')):
+                data = processor.artifacts.get(key)
+                if data is not None:
+                    with open(os.path.join(OUTPUT_FOLDER, output_filename(prefix, job_id, output_format)), 'wb') as f:
+                        f.write(data)
                 
         except Exception as e:
-            logger.error(f"Error moving files: {e}")
+            logger.error(f"Error writing files: {e}")
             return jsonify({'message': f'เกิดข้อผิดพลาดในการจัดการไฟล์: {str(e)}'}), 500
         
         logger.info(f"Processing completed successfully for job_id: {job_id}")
@@ -585,7 +713,8 @@ def process_file():
             'total_records': price_count + type_count,
             'price_records': price_count,
             'type_records': type_count,
-            'processed_sheets': 1,  # From main sheet
+            'processed_sheets': len(processor.table_sheets),
+            'output_format': output_format,
             'processing_time': processing_time,
             'message': 'ประมวลผลสำเร็จ'
         })
@@ -596,25 +725,31 @@ def process_file():
 
 @app.route('/api/download/<job_id>/<file_type>')
 def download_file(job_id, file_type):
-    """Download processed files"""
+    """Download processed files (?format=xlsx|csv|jsonl|parquet, default: any existing)"""
     try:
         if file_type == 'price':
-            filename = f'Price_{job_id}.xlsx'
+            prefix = 'Price'
         elif file_type == 'type':
-            filename = f'Type_{job_id}.xlsx'
+            prefix = 'Type'
         else:
             return jsonify({'message': 'ประเภทไฟล์ไม่ถูกต้อง'}), 400
         
-        file_path = os.path.join(OUTPUT_FOLDER, filename)
+        requested_format = request.args.get('format')
+        if requested_format and requested_format not in OUTPUT_FORMATS:
+            return jsonify({'message': 'รูปแบบไฟล์ไม่ถูกต้อง'}), 400
         
-        if not os.path.exists(file_path):
+        for output_format in ([requested_format] if requested_format else OUTPUT_FORMATS):
+            file_path = os.path.join(OUTPUT_FOLDER, output_filename(prefix, job_id, output_format))
+            if os.path.exists(file_path):
+                break
+        else:
             return jsonify({'message': 'ไม่พบไฟล์'}), 404
         
         return send_file(
             file_path,
             as_attachment=True,
-            download_name='Price.xlsx' if file_type == 'price' else 'Type.xlsx',
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            download_name=output_filename(prefix, output_format=output_format),
+            mimetype=OUTPUT_FORMATS[output_format]
         )
         
     except Exception as e:
@@ -629,14 +764,41 @@ def too_large(e):
 if __name__ == "__main__":
     import sys
     
-    if len(sys.argv) == 3:
+    # Optional: --output-format xlsx|csv|jsonl|parquet
+    cli_args = sys.argv[1:]
+    output_format = 'xlsx'
+    if '--output-format' in cli_args:
+        opt_idx = cli_args.index('--output-format')
+        output_format = cli_args[opt_idx + 1] if opt_idx + 1 < len(cli_args) else ''
+        del cli_args[opt_idx:opt_idx + 2]
+    
+    # Optional: --workers N (processes สำหรับ workbook ที่มีหลายชีตตาราง)
+    workers = None
+    if '--workers' in cli_args:
+        opt_idx = cli_args.index('--workers')
+        try:
+            workers = int(cli_args[opt_idx + 1])
+        except (IndexError, ValueError):
+            print("❌ ERROR: --workers ต้องเป็นตัวเลข")
+            sys.exit(1)
+        del cli_args[opt_idx:opt_idx + 2]
+    
+    if len(cli_args) == 2:
         # Command line mode
         print("🚀 เริ่มต้นโปรแกรม main2.py (Command Line Mode)")
-        input_filename, job_id = sys.argv[1], sys.argv[2]
+        input_filename, job_id = cli_args
         print(f"📁 ไฟล์ Input: {input_filename}")
         print(f"🆔 Job ID: {job_id}")
+        print(f"📄 Output format: {output_format}")
+        
+        try:
+            output_format = validate_format(output_format)
+        except (ValueError, RuntimeError) as e:
+            print(f"❌ ERROR: {e}")
+            sys.exit(1)
         
-        success = process_multi_table_excel(input_filename, job_id)
+        processor = ExcelProcessor(input_filename)
+        success = processor.process(job_id, output_format, workers=workers)
         
         if not success:
             print("❌ ERROR: processing failed")
@@ -644,21 +806,15 @@ if __name__ == "__main__":
 
         print("🎯 กำลังรวมผลลัพธ์...")
         # Print output in format expected by api.py
-        print(f"MOVED_PRICE:Price.xlsx")
-        print(f"MOVED_TYPE:Type.xlsx")
-        
-        # Count records in generated files
-        try:
-            price_count2 = len(pd.read_excel('Price.xlsx'))
-            type_count2 = len(pd.read_excel('Type.xlsx'))
-            print(f"PRICE_COUNT:{price_count2}")
-            print(f"TYPE_COUNT:{type_count2}")
-            print(f"📊 สรุปผลลัพธ์: Price={price_count2}, Type={type_count2}")
-        except Exception as e:
-            print(f"❌ Error นับ records: {e}")
-            logger.error(f"Error counting records: {e}")
-            print("PRICE_COUNT:0")
-            print("TYPE_COUNT:0")
+        print(f"MOVED_PRICE:{output_filename('Price', output_format=output_format)}")
+        print(f"MOVED_TYPE:{output_filename('Type', output_format=output_format)}")
+        
+        # Record counts come straight from the processor
+        price_count2 = len(processor.price_records)
+        type_count2 = len(processor.type_records)
+        print(f"PRICE_COUNT:{price_count2}")
+        print(f"TYPE_COUNT:{type_count2}")
+        print(f"📊 สรุปผลลัพธ์: Price={price_count2}, Type={type_count2}")
         
         print("SUCCESS:")
         print("🎉 ประมวลผลเสร็จสิ้นสมบูรณ์!")
@@ -3,50 +3,181 @@
 
 import pdfplumber
 import pandas as pd
+import io
 import os
 import json
 import sys
+import math
 import tempfile
-from typing import Dict, List
+import textwrap
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional
+
+from pdf_cache import PDFPageCache, peak_memory_mb, release_page
+from pdf_tables import TableTemplate
+
+NO_GLASS_TEXT = "ไม่พบข้อมูล GLASS ที่สมบูรณ์\n"
+
+# จำนวนเส้นตารางขั้นต่ำ (page.extract_tables ใช้ strategy "lines" - ตารางเกิดจากเส้นเท่านั้น)
+# แถวข้อมูลต้องมี >= 17 คอลัมน์ในตาราง >= 6 แถว, แถว Product name ต้องมี > 10 คอลัมน์
+DATA_MIN_VERTICALS, DATA_MIN_HORIZONTALS = 18, 7
+PRODUCT_MIN_VERTICALS, PRODUCT_MIN_HORIZONTALS = 12, 2
+PROBE_SETTINGS = {
+    'data': [DATA_MIN_VERTICALS, DATA_MIN_HORIZONTALS],
+    'product': [PRODUCT_MIN_VERTICALS, PRODUCT_MIN_HORIZONTALS]
+}
+
+def page_may_have_items(page) -> bool:
+    """ตรวจแบบถูกๆ ก่อน extract_tables ว่าหน้านี้ให้ Reference/GLASS/Product ได้หรือไม่
+    
+    ใช้แค่ตำแหน่งเส้น (page.edges) และตัวอักษร (page.chars) ซึ่ง extract_tables ต้องอ่านอยู่แล้ว
+    เป็นเงื่อนไขจำเป็นเท่านั้น (ไม่ตัดหน้าที่มีข้อมูลทิ้ง): หน้าปก/เงื่อนไขที่ไม่มีตารางใหญ่พอจะถูกข้าม
+    """
+    verticals = set()
+    horizontals = set()
+    for edge in page.edges:
+        if edge['orientation'] == 'v':
+            verticals.add(round(edge['x0']))
+        else:
+            horizontals.add(round(edge['top']))
+    if len(verticals) < PRODUCT_MIN_VERTICALS or len(horizontals) < PRODUCT_MIN_HORIZONTALS:
+        return False
+    
+    text = ''.join(char['text'] for char in page.chars)
+    if len(verticals) >= DATA_MIN_VERTICALS and len(horizontals) >= DATA_MIN_HORIZONTALS:
+        # แถวข้อมูลขึ้นต้นด้วยเลขลำดับ
+        if any(ch.isdigit() for ch in text):
+            return True
+    return 'Product' in text
+
+class PageRangeError(ValueError):
+    """start_page เกินจำนวนหน้าของ PDF"""
 
 class PDFExtractorWeb:
-    def __init__(self):
+    def __init__(self, cache_dir: Optional[str] = None, table_template: bool = False):
+        # cache_dir: cache ผลรายหน้า (ตาราง/ผลตรวจหน้า) ตาม hash ของ PDF - ใช้ร่วมกับ main4.py
+        # table_template: เรียนรู้คอลัมน์จากหน้าข้อมูลหน้าแรกแล้วใช้กับหน้าถัดไป (pdf_tables.TableTemplate)
+        self.cache_dir = cache_dir
+        self.table_template = table_template
         self.reference_code_data = []
         self.glass_data = []
         self.product_info = []
         
-    def extract_data_from_file(self, file_path: str, start_page: int = 3) -> Dict:
-        """Extract data from PDF file using the original logic"""
+    def extract_data_from_file(self, file_path, start_page: Optional[int] = None,
+                               workers: Optional[int] = None) -> Dict:
+        """Extract data from PDF file using the original logic
+        
+        file_path เป็น path, bytes หรือ file-like object ก็ได้
+        start_page: None = ตรวจทุกหน้าเอง (หน้าที่ไม่มีตารางรายการจะไม่ถูก extract_tables)
+        workers: แบ่งหน้าเป็นช่วงต่อเนื่องให้ worker processes (None = จำนวน CPU, 1 = ทีละหน้า)
+        ผลลัพธ์รวมตามลำดับหน้า จึงเหมือนการประมวลผลทีละหน้าทุกกรณี
+        """
         self.reference_code_data = []
         self.glass_data = []
         self.product_info = []
         
         try:
-            with pdfplumber.open(file_path) as pdf:
-                start_idx = start_page - 1
-                
-                if start_idx >= len(pdf.pages):
-                    return {"error": f"หน้าที่ {start_page} ไม่มีในไฟล์ PDF (มีทั้งหมด {len(pdf.pages)} หน้า)"}
-                
-                # Process each page from start_page
-                for i in range(start_idx, len(pdf.pages)):
-                    page = pdf.pages[i]
-                    tables = page.extract_tables()
-                    
-                    if tables:
-                        for j, table in enumerate(tables):
-                            # Extract product information
-                            product_info = self._extract_product_info(table, i+1)
-                            self.product_info.extend(product_info)
-                            
-                            # Extract reference and glass data
-                            self._process_structured_table(table, i+1, j+1)
-                
-                return self._format_output()
-                
+            for page_result in self.iter_pages(file_path, start_page, workers):
+                self.reference_code_data.extend(page_result['reference_code'])
+                self.glass_data.extend(page_result['glass_data'])
+                self.product_info.extend(page_result['product_info'])
+            return self._format_output()
+        
+        except PageRangeError as e:
+            return {"error": str(e)}
         except Exception as e:
             return {"error": f"เกิดข้อผิดพลาดในการอ่าน PDF: {str(e)}"}
     
+    def iter_pages(self, file_path, start_page: Optional[int] = None, workers: Optional[int] = None,
+                   tasks_per_worker: int = 1) -> Iterator[Dict]:
+        """ผลลัพธ์ทีละหน้าตามลำดับหน้า: {'page', 'reference_code', 'glass_data', 'product_info'}
+        
+        workers > 1: page.extract_tables() เป็นส่วนที่ช้าที่สุด - แบ่งหน้าเป็นช่วงต่อเนื่อง
+        (tasks_per_worker งานต่อ worker - มากกว่า 1 ให้ผลของช่วงแรกออกมาเร็วขึ้นในโหมด streaming)
+        แต่ละ worker ได้ไฟล์ครั้งเดียวตอนเริ่ม (_init_page_worker) แล้วเปิด PDF และใช้ template ชุดเดียวทุกงาน
+        งานแต่ละงานส่งแค่เลขหน้า - ไม่ส่ง bytes ของทั้งไฟล์ซ้ำต่องาน
+        """
+        if hasattr(file_path, 'read'):
+            # worker processes ต้องได้ข้อมูลที่ pickle ได้ - อ่าน file-like object เป็น bytes ครั้งเดียว
+            file_path = file_path.read()
+        page_cache = PDFPageCache(self.cache_dir, file_path) if self.cache_dir else None
+        
+        with pdfplumber.open(self._open_source(file_path)) as pdf:
+            start_idx = start_page - 1 if start_page is not None else 0
+            
+            if start_page is not None and start_idx >= len(pdf.pages):
+                raise PageRangeError(f"หน้าที่ {start_page} ไม่มีในไฟล์ PDF (มีทั้งหมด {len(pdf.pages)} หน้า)")
+            
+            page_indexes = list(range(start_idx, len(pdf.pages)))
+            workers = min(workers or os.cpu_count() or 1, len(page_indexes))
+            if workers <= 1:
+                template = TableTemplate() if self.table_template else None
+                # Process each page from start_page
+                for i in page_indexes:
+                    page_result = self.extract_page(pdf.pages[i], i + 1, page_cache, template)
+                    release_page(pdf.pages[i])
+                    yield page_result
+                return
+        
+        chunk = math.ceil(len(page_indexes) / (workers * tasks_per_worker))
+        ranges = [page_indexes[i:i + chunk] for i in range(0, len(page_indexes), chunk)]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_page_worker,
+                                 initargs=(file_path, page_cache, self.table_template)) as pool:
+            pending = deque()
+            for pages in ranges:
+                pending.append(pool.submit(_extract_page_range, pages))
+                # จำกัดงานที่ค้างอยู่ - ผลลัพธ์ที่ยังไม่ถูกส่งต่อไม่สะสมในหน่วยความจำ
+                if len(pending) > workers * 2:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+    
+    @staticmethod
+    def extract_page(page, page_num: int, page_cache: Optional[PDFPageCache] = None,
+                     template: Optional[TableTemplate] = None) -> Dict:
+        """ผลลัพธ์ของหน้าเดียว (ไม่แตะ list ของ instance ที่กำลังรวมผลอยู่)
+        หน้าที่ไม่ผ่าน page_may_have_items ได้ผลว่างโดยไม่ต้อง extract_tables"""
+        extractor = PDFExtractorWeb()
+        if page_cache is None:
+            has_items = page_may_have_items(page)
+        else:
+            has_items = page_cache.get_or_compute(page_num, 'main3.items_probe',
+                                                  lambda: page_may_have_items(page), PROBE_SETTINGS)
+        if has_items:
+            extractor._process_page(page, page_num, page_cache, template)
+        return {
+            'page': page_num,
+            'reference_code': extractor.reference_code_data,
+            'glass_data': extractor.glass_data,
+            'product_info': extractor.product_info
+        }
+    
+    @staticmethod
+    def _open_source(file_path):
+        """pdfplumber.open รับ path หรือ file-like object - bytes ต้องห่อเป็น BytesIO ใหม่ทุกครั้งที่เปิด"""
+        if isinstance(file_path, (bytes, bytearray)):
+            return io.BytesIO(file_path)
+        return file_path
+    
+    def _process_page(self, page, page_num: int, page_cache: Optional[PDFPageCache] = None,
+                      template: Optional[TableTemplate] = None):
+        """ดึง product info, Reference Code และ GLASS จากทุกตารางในหน้าเดียว (ต่อท้าย list ของ instance)"""
+        extract = template.extract_tables if template else None
+        if page_cache:
+            tables = page_cache.tables(page, extract=extract)
+        else:
+            tables = extract(page) if extract else page.extract_tables()
+        
+        if tables:
+            for j, table in enumerate(tables):
+                # Extract product information
+                product_info = self._extract_product_info(table, page_num)
+                self.product_info.extend(product_info)
+                
+                # Extract reference and glass data
+                self._process_structured_table(table, page_num, j+1)
+    
     def _process_structured_table(self, table: List, page_num: int, table_num: int):
         """Process table based on known structure from debug output"""
         if not table or len(table) < 6:
@@ -102,58 +233,75 @@ class PDFExtractorWeb:
         self._extract_glass_smart(row, row_idx, page_num)
 
     def _extract_product_info(self, table: List, page_num: int):
-        """Extract Product name and Order Qty (sets) information"""
-        product_info = []
+        """Extract Product name and Order Qty (sets) information
+        
+        อ่านตารางรอบเดียว: จดตำแหน่งของ label (Product name / Order Qty) และเซลล์ตัวเลข
+        แล้วจับคู่ด้วยการ lookup ตามตำแหน่ง - Order Qty เป็นค่าเดียวกันทั้งตาราง จึงคำนวณครั้งเดียว
+        """
+        product_cells = []      # (row_idx, col) ของ 'Product name' เซลล์แรกในแถวที่ยาวกว่า 10 คอลัมน์
+        order_qty_cells = []    # (row_idx, col) ของเซลล์แรกที่มี 'Order Qty' ในแต่ละแถว
+        digits = {}             # (row_idx, col) -> ตัวเลข (strip แล้ว)
         
         for row_idx, row in enumerate(table):
-            if row and len(row) > 10:
-                # Look for Product name pattern
-                for i, cell in enumerate(row):
-                    if cell and str(cell).strip() == 'Product name':
-                        # Look for product code in the same row or next row
-                        product_name = ''
-                        order_qty = ''
-                        
-                        # Check same row for product code (usually a few columns after)
-                        for j in range(i + 1, min(len(row), i + 10)):
-                                cell_val = str(row[j]).strip() if row[j] else ''
-                                if cell_val:
-                                # This could be product code
-                                    product_name = str(row[j]).strip()
-                                    break
-                        
-                        # Look for Order Qty (sets) in the same table
-                        for order_row_idx, order_row in enumerate(table):
-                            if order_row:
-                                for k, order_cell in enumerate(order_row):
-                                    if order_cell and 'Order Qty' in str(order_cell):
-                                        # Look for quantity value in nearby cells or next row
-                                        # Check same row first
-                                        for qty_idx in range(k - 2, min(len(order_row), k + 3)):
-                                            if (qty_idx >= 0 and order_row[qty_idx] and 
-                                                str(order_row[qty_idx]).strip().isdigit()):
-                                                order_qty = str(order_row[qty_idx]).strip()
-                                                break
-                                        
-                                        # If not found in same row, check next row
-                                        if not order_qty and order_row_idx + 1 < len(table):
-                                            next_row = table[order_row_idx + 1]
-                                            if next_row and len(next_row) > k:
-                                                for qty_idx in range(max(0, k - 2), min(len(next_row), k + 3)):
-                                                    if (next_row[qty_idx] and 
-                                                        str(next_row[qty_idx]).strip().isdigit()):
-                                                        order_qty = str(next_row[qty_idx]).strip()
-                                                        break
-                                        break
-                        
-                        if product_name:
-                            product_info.append({
-                                'page': page_num,
-                                'product_name': product_name,
-                                'order_qty_sets': order_qty,
-                                'message': f"Product name {product_name} มี Order Qty (sets) {order_qty if order_qty else 'ไม่พบข้อมูล'}"
-                            })
-                        break
+            if not row:
+                continue
+            product_col = order_col = None
+            for col, cell in enumerate(row):
+                if not cell:
+                    continue
+                text = str(cell)
+                value = text.strip()
+                if value.isdigit():
+                    digits[(row_idx, col)] = value
+                if product_col is None and value == 'Product name':
+                    product_col = col
+                if order_col is None and 'Order Qty' in text:
+                    order_col = col
+            if product_col is not None and len(row) > 10:
+                product_cells.append((row_idx, product_col))
+            if order_col is not None:
+                order_qty_cells.append((row_idx, order_col))
+        
+        if not product_cells:
+            return []
+        
+        def first_digit(row_idx: int, cols: range) -> str:
+            for col in cols:
+                value = digits.get((row_idx, col))
+                if value:
+                    return value
+            return ''
+        
+        # Order Qty: ดูเซลล์ใกล้ label ในแถวเดียวกันก่อน (label หลังทับค่าก่อนหน้า)
+        # ถ้าไม่พบและยังไม่มีค่า ดูแถวถัดไป
+        order_qty = ''
+        for row_idx, k in order_qty_cells:
+            found = first_digit(row_idx, range(max(0, k - 2), min(len(table[row_idx]), k + 3)))
+            if found:
+                order_qty = found
+            elif not order_qty and row_idx + 1 < len(table):
+                next_row = table[row_idx + 1]
+                if next_row and len(next_row) > k:
+                    order_qty = first_digit(row_idx + 1, range(max(0, k - 2), min(len(next_row), k + 3)))
+        
+        product_info = []
+        for row_idx, i in product_cells:
+            row = table[row_idx]
+            # Check same row for product code (usually a few columns after)
+            product_name = ''
+            for j in range(i + 1, min(len(row), i + 10)):
+                cell_val = str(row[j]).strip() if row[j] else ''
+                if cell_val:
+                    product_name = cell_val
+                    break
+            
+            if product_name:
+                product_info.append({
+                    'page': page_num,
+                    'product_name': product_name,
+                    'order_qty_sets': order_qty,
+                    'message': f"Product name {product_name} มี Order Qty (sets) {order_qty if order_qty else 'ไม่พบข้อมูล'}"
+                })
         
         return product_info
     
@@ -281,11 +429,39 @@ class PDFExtractorWeb:
             'total_glass': len(self.glass_data)
         }
 
+# สถานะของ worker process: PDF ที่เปิดค้างไว้, page cache และ template (ตั้งใน _init_page_worker)
+_worker_state: Dict = {}
+
+def _init_page_worker(file_path, page_cache: Optional[PDFPageCache] = None, table_template: bool = False):
+    """Pool initializer: รับ PDF (path หรือ bytes) ครั้งเดียวต่อ worker แล้วเปิดค้างไว้ใช้กับทุกงาน"""
+    _worker_state['pdf'] = pdfplumber.open(PDFExtractorWeb._open_source(file_path))
+    _worker_state['page_cache'] = page_cache
+    _worker_state['template'] = TableTemplate() if table_template else None
+
+def _extract_page_range(page_indexes: List[int]) -> List[Dict]:
+    """Worker process: ดึงข้อมูลจากช่วงหน้าตามลำดับ (PDF และ template ของ worker ใช้ร่วมกันทุกงาน)"""
+    pdf = _worker_state['pdf']
+    results = []
+    for i in page_indexes:
+        results.append(PDFExtractorWeb.extract_page(pdf.pages[i], i + 1, _worker_state['page_cache'],
+                                                    _worker_state['template']))
+        release_page(pdf.pages[i])
+    return results
+
 def generate_text_output(glass_data):
     """Generate text format output in the new simplified format: RefCode GW * GH = Qty
     Only include entries with complete GLASS data (RefCode, GW, GH, and Qty)
     Remove leading zeros from GW and GH values"""
-    content = ""
+    content = "".join(text_output_lines(glass_data))
+    
+    # If no complete glass data found, show appropriate message
+    if not content:
+        content = NO_GLASS_TEXT
+    
+    return content
+
+def text_output_lines(glass_data) -> Iterator[str]:
+    """บรรทัด "RefCode GW * GH = Qty" ของ glass entries ที่ข้อมูลครบ (ใช้ต่อท้ายไฟล์ TXT ทีละหน้าได้)"""
     
     def remove_leading_zeros(value):
         """Remove leading zeros from numeric strings"""
@@ -315,44 +491,182 @@ def generate_text_output(glass_data):
                 gw_clean = remove_leading_zeros(gw)
                 gh_clean = remove_leading_zeros(gh)
                 
-                content += f"{ref_code} {gw_clean} * {gh_clean} = {qty}\n"
-    
-    # If no complete glass data found, show appropriate message
-    if not content:
-        content = "ไม่พบข้อมูล GLASS ที่สมบูรณ์\n"
-    
-    return content
+                yield f"{ref_code} {gw_clean} * {gh_clean} = {qty}\n"
+
+def render_artifacts(result_data) -> Dict[str, bytes]:
+    """สร้างไฟล์ผลลัพธ์ในหน่วยความจำ: {'txt': bytes, 'json': bytes}"""
+    txt_content = generate_text_output(result_data.get('glass_data', []))
+    json_content = json.dumps(result_data, ensure_ascii=False, indent=2)
+    return {'txt': txt_content.encode('utf-8'), 'json': json_content.encode('utf-8')}
+
+def pdf_result_filename(ext: str, job_id: Optional[str] = None) -> str:
+    """ชื่อไฟล์ผลลัพธ์ เช่น pdf_results_<job_id>.txt หรือ pdf_results.txt ถ้าไม่มี job_id"""
+    stem = f"pdf_results_{job_id}" if job_id else "pdf_results"
+    return f"{stem}.{ext}"
 
 def save_results_to_files(result_data, output_folder='outputs'):
     """Save results to TXT and JSON files"""
     try:
         os.makedirs(output_folder, exist_ok=True)
         
-        # Save TXT file
-        txt_content = generate_text_output(result_data.get('glass_data', []))
-        txt_file = os.path.join(output_folder, 'pdf_results.txt')
-        with open(txt_file, 'w', encoding='utf-8') as f:
-            f.write(txt_content)
-        
-        # Save JSON file
-        json_file = os.path.join(output_folder, 'pdf_results.json')
-        with open(json_file, 'w', encoding='utf-8') as f:
-            json.dump(result_data, f, ensure_ascii=False, indent=2)
+        # Save TXT and JSON files
+        for ext, content in render_artifacts(result_data).items():
+            with open(os.path.join(output_folder, f'pdf_results.{ext}'), 'wb') as f:
+                f.write(content)
         
         return True
     except Exception as e:
         print(f"Error saving results: {e}", file=sys.stderr)
         return False
 
+class StreamingResultWriter:
+    """เขียน TXT/JSON ของงานหนึ่ง (pdf_result_filename ตาม job_id) ทีละหน้า
+    
+    TXT ต่อท้ายลงไฟล์ .tmp ทันทีที่ได้ผลของแต่ละหน้า ส่วน JSON จัดกลุ่มตาม key (reference ทั้งหมดก่อน glass)
+    จึงพัก record แต่ละกลุ่มไว้ในไฟล์ชั่วคราวแล้วประกอบตอน close() - ได้ไฟล์เดียวกับ render_artifacts
+    โดยไม่ต้องเก็บผลทั้งเอกสารไว้ในหน่วยความจำ
+    ไฟล์จริงทั้งสองถูกแทนที่ด้วย os.replace พร้อมกันตอน close() เท่านั้น - abort() ลบไฟล์ .tmp ทิ้ง
+    งานที่ล้มเหลวจึงไม่ทิ้ง TXT ครึ่งเดียวไว้คู่กับ JSON ของงานก่อน
+    """
+    SECTIONS = ('reference_code', 'glass_data', 'product_info', 'product_messages')
+    
+    def __init__(self, output_folder: str = 'outputs', job_id: Optional[str] = None):
+        os.makedirs(output_folder, exist_ok=True)
+        self.txt_path = os.path.join(output_folder, pdf_result_filename('txt', job_id))
+        self.json_path = os.path.join(output_folder, pdf_result_filename('json', job_id))
+        self._txt_tmp_path = f"{self.txt_path}.tmp"
+        self._json_tmp_path = f"{self.json_path}.tmp"
+        self._txt = open(self._txt_tmp_path, 'w', encoding='utf-8')
+        self._txt_empty = True
+        self._spools = {name: tempfile.TemporaryFile('w+', encoding='utf-8') for name in self.SECTIONS}
+        self._counts = dict.fromkeys(self.SECTIONS, 0)
+    
+    def write_page(self, page_result: Dict) -> None:
+        for line in text_output_lines(page_result['glass_data']):
+            self._txt.write(line)
+            self._txt_empty = False
+        self._txt.flush()
+        
+        items = dict(page_result, product_messages=[info['message'] for info in page_result['product_info']])
+        for name in self.SECTIONS:
+            spool = self._spools[name]
+            for item in items[name]:
+                spool.write(",\n" if self._counts[name] else "\n")
+                spool.write(textwrap.indent(json.dumps(item, ensure_ascii=False, indent=2), '    '))
+                self._counts[name] += 1
+    
+    def close(self) -> Dict:
+        """ปิด TXT ประกอบ JSON แล้วแทนที่ไฟล์จริงทั้งสอง คืนจำนวน record ทั้งหมด"""
+        totals = {
+            'total_references': self._counts['reference_code'],
+            'total_glass': self._counts['glass_data']
+        }
+        if self._txt_empty:
+            self._txt.write(NO_GLASS_TEXT)
+        self._txt.close()
+        
+        with open(self._json_tmp_path, 'w', encoding='utf-8') as f:
+            f.write('{')
+            for name in self.SECTIONS:
+                f.write(f'\n  "{name}": ')
+                spool = self._spools[name]
+                if self._counts[name]:
+                    spool.seek(0)
+                    f.write('[')
+                    for block in iter(lambda: spool.read(1 << 16), ''):
+                        f.write(block)
+                    f.write('\n  ]')
+                else:
+                    f.write('[]')
+                f.write(',')
+                spool.close()
+            f.write(f'\n  "total_references": {totals["total_references"]},')
+            f.write(f'\n  "total_glass": {totals["total_glass"]}\n}}')
+        os.replace(self._json_tmp_path, self.json_path)
+        os.replace(self._txt_tmp_path, self.txt_path)
+        return totals
+    
+    def abort(self) -> None:
+        self._txt.close()
+        for spool in self._spools.values():
+            spool.close()
+        for path in (self._txt_tmp_path, self._json_tmp_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+# streaming: ช่วงหน้าเล็กๆ หลายช่วงต่อ worker - ผลหน้าแรกๆ ออกมาเร็วโดยไม่ต้องส่งงานทีละหน้า
+STREAM_TASKS_PER_WORKER = 4
+
+def stream_results(file_path, start_page: Optional[int] = None, workers: Optional[int] = None,
+                   output_folder: str = 'outputs', cache_dir: Optional[str] = None,
+                   table_template: bool = False, job_id: Optional[str] = None) -> Iterator[Dict]:
+    """โหมด streaming: yield {'type': 'page', ...} ทันทีที่แต่ละหน้าเสร็จ (ตามลำดับหน้า)
+    ปิดท้ายด้วย {'type': 'done', 'total_references', 'total_glass'} หรือ {'type': 'error', 'error'}
+    ระหว่างนั้นต่อท้ายผลลงใน TXT/JSON ของ job_id ใน output_folder (StreamingResultWriter)
+    """
+    writer = None
+    try:
+        extractor = PDFExtractorWeb(cache_dir, table_template)
+        for page_result in extractor.iter_pages(file_path, start_page, workers,
+                                                tasks_per_worker=STREAM_TASKS_PER_WORKER):
+            if writer is None:
+                writer = StreamingResultWriter(output_folder, job_id)
+            writer.write_page(page_result)
+            yield {'type': 'page', **page_result}
+        
+        if writer is None:
+            writer = StreamingResultWriter(output_folder, job_id)
+        totals = writer.close()
+        writer = None
+        yield {'type': 'done', **totals}
+    
+    except PageRangeError as e:
+        yield {'type': 'error', 'error': str(e)}
+    except Exception as e:
+        yield {'type': 'error', 'error': f"เกิดข้อผิดพลาดในการอ่าน PDF: {str(e)}"}
+    finally:
+        if writer is not None:
+            writer.abort()
+
 def main():
     """Main function for command line usage"""
-    if len(sys.argv) < 4:
-        print("Usage: python main3.py <pdf_file_path> <start_page> <job_id>", file=sys.stderr)
+    args = sys.argv[1:]
+    
+    # Optional: --stream (NDJSON ทีละหน้า), --workers N (processes สำหรับแบ่งหน้า),
+    # --cache-dir DIR (cache ผลรายหน้า), --table-template (ใช้คอลัมน์จากหน้าข้อมูลหน้าแรก)
+    stream = '--stream' in args
+    if stream:
+        args.remove('--stream')
+    table_template = '--table-template' in args
+    if table_template:
+        args.remove('--table-template')
+    workers = None
+    if '--workers' in args:
+        opt_idx = args.index('--workers')
+        try:
+            workers = int(args[opt_idx + 1])
+        except (IndexError, ValueError):
+            print("Usage: --workers ต้องเป็นตัวเลข", file=sys.stderr)
+            sys.exit(1)
+        del args[opt_idx:opt_idx + 2]
+    cache_dir = None
+    if '--cache-dir' in args:
+        opt_idx = args.index('--cache-dir')
+        if opt_idx + 1 >= len(args):
+            print("Usage: --cache-dir ต้องระบุโฟลเดอร์", file=sys.stderr)
+            sys.exit(1)
+        cache_dir = args[opt_idx + 1]
+        del args[opt_idx:opt_idx + 2]
+    
+    if len(args) < 3:
+        print("Usage: python main3.py <pdf_file_path> <start_page|auto> <job_id> "
+              "[--workers N] [--stream] [--cache-dir DIR] [--table-template]", file=sys.stderr)
         sys.exit(1)
     
-    pdf_file_path = sys.argv[1]
-    start_page = int(sys.argv[2])
-    job_id = sys.argv[3]
+    pdf_file_path = args[0]
+    # auto = หาหน้าที่มีตารางรายการเอง
+    start_page = None if args[1].lower() == 'auto' else int(args[1])
+    job_id = args[2]
     
     # Check if PDF file exists
     if not os.path.exists(pdf_file_path):
@@ -360,11 +674,21 @@ def main():
         print(json.dumps(result, ensure_ascii=False))
         sys.exit(1)
     
+    if stream:
+        # หนึ่ง JSON ต่อบรรทัด - server ส่งต่อให้ client ได้ทันทีที่แต่ละหน้าเสร็จ
+        failed = False
+        for record in stream_results(pdf_file_path, start_page, workers, cache_dir=cache_dir,
+                                     table_template=table_template):
+            failed = record['type'] == 'error'
+            print(json.dumps(record, ensure_ascii=False), flush=True)
+        print(f"🧠 Peak memory: {peak_memory_mb()} MB", file=sys.stderr)
+        sys.exit(1 if failed else 0)
+    
     # Initialize extractor and process PDF
-    extractor = PDFExtractorWeb()
+    extractor = PDFExtractorWeb(cache_dir, table_template)
     
     try:
-        result = extractor.extract_data_from_file(pdf_file_path, start_page)
+        result = extractor.extract_data_from_file(pdf_file_path, start_page, workers)
         
         # Save results to files if processing was successful
         if 'error' not in result:
@@ -372,6 +696,7 @@ def main():
         
         # Output JSON result to stdout for server.py to parse
         print(json.dumps(result, ensure_ascii=False))
+        print(f"🧠 Peak memory: {peak_memory_mb()} MB", file=sys.stderr)
         
     except Exception as e:
         error_result = {"error": f"เกิดข้อผิดพลาดที่ไม่คาดคิด: {str(e)}"}
@@ -7,15 +7,21 @@ Dependencies:
     pip install pdfplumber PyPDF2 argparse
 """
 import argparse
+import difflib
 import json
 import re
 import sys
+import time
+from collections import deque
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional
+
+from pdf_cache import PDFPageCache, peak_memory_mb, release_page
 
 # PDF libraries
 try:
     import pdfplumber
+    from pdf_tables import TableTemplate
     _HAS_PDFPLUMBER = True
 except ImportError:
     _HAS_PDFPLUMBER = False
@@ -29,26 +35,94 @@ except ImportError:
 
 # ================== PDF Text Extraction Functions ==================
 
-def extract_text_from_pdf(pdf_path: str, start_page: int = 1) -> str:
-    """Extract text from PDF for comparison purposes"""
-    if _HAS_PDFPLUMBER:
-        texts = []
-        with pdfplumber.open(pdf_path) as pdf:
-            for page in pdf.pages[start_page - 1:]:
-                texts.append(page.extract_text() or "")
-        return "\n".join(texts)
-    elif _HAS_PYPDF2:
-        texts = []
-        with open(pdf_path, "rb") as f:
-            reader = PyPDF2.PdfReader(f)
-            for page in reader.pages[start_page - 1:]:
+def _pdfplumber_page_texts(pdf_path: str, start_page: int, page_cache: Optional[PDFPageCache]) -> List[str]:
+    """ข้อความรายหน้าจาก pdfplumber (จัดบรรทัดจากตำแหน่งตัวอักษร - แม่นแต่ช้า)"""
+    texts = []
+    with pdfplumber.open(pdf_path) as pdf:
+        for page in pdf.pages[start_page - 1:]:
+            texts.append(page_cache.text(page) if page_cache else page.extract_text() or "")
+            release_page(page)
+    return texts
+
+
+def _pypdf2_page_texts(pdf_path: str, start_page: int, page_cache: Optional[PDFPageCache]) -> List[str]:
+    """ข้อความรายหน้าจาก PyPDF2 (อ่านตาม content stream โดยไม่วิเคราะห์ layout - เร็วกว่ามาก)"""
+    texts = []
+    with open(pdf_path, "rb") as f:
+        reader = PyPDF2.PdfReader(f)
+        first = len(reader.pages[:start_page - 1]) + 1
+        for page_number, page in enumerate(reader.pages[start_page - 1:], first):
+            if page_cache:
+                texts.append(page_cache.get_or_compute(page_number, "PyPDF2.text",
+                                                       lambda: page.extract_text() or ""))
+            else:
                 texts.append(page.extract_text() or "")
-        return "\n".join(texts)
-    else:
-        raise RuntimeError("ติดตั้ง pdfplumber หรือ PyPDF2 ก่อนใช้งาน")
+    return texts
+
+
+# text backend -> ฟังก์ชันดึงข้อความรายหน้า (parse_pdf_items ใช้แค่ข้อความรายบรรทัด)
+# ลำดับ = ลำดับที่เลือกใช้เมื่อไม่ระบุ backend
+TEXT_BACKENDS = {
+    "pdfplumber": _pdfplumber_page_texts,
+    "pypdf2": _pypdf2_page_texts,
+}
+_TEXT_BACKEND_INSTALLED = {"pdfplumber": _HAS_PDFPLUMBER, "pypdf2": _HAS_PYPDF2}
+
+
+def resolve_text_backend(backend: Optional[str] = None) -> str:
+    """ชื่อ backend ที่ใช้ได้จริง (None = pdfplumber ถ้าติดตั้ง ไม่งั้น PyPDF2)"""
+    if backend is None:
+        backend = next((name for name in TEXT_BACKENDS if _TEXT_BACKEND_INSTALLED[name]), None)
+        if backend is None:
+            raise RuntimeError("ติดตั้ง pdfplumber หรือ PyPDF2 ก่อนใช้งาน")
+    if backend not in TEXT_BACKENDS:
+        raise ValueError(f"ไม่รู้จัก text backend: {backend} (ใช้ได้: {', '.join(TEXT_BACKENDS)})")
+    if not _TEXT_BACKEND_INSTALLED[backend]:
+        raise RuntimeError(f"ติดตั้ง {backend} ก่อนใช้งาน text backend นี้")
+    return backend
+
+
+def extract_text_from_pdf(pdf_path: str, start_page: int = 1, cache_dir: Optional[str] = None,
+                          backend: Optional[str] = None) -> str:
+    """Extract text from PDF for comparison purposes
+    
+    cache_dir: cache ข้อความรายหน้าตาม hash ของ PDF (ใช้ร่วมกับ main3.py)
+    backend: ชื่อใน TEXT_BACKENDS (None = pdfplumber ถ้าติดตั้ง ไม่งั้น PyPDF2)
+    """
+    page_cache = PDFPageCache(cache_dir, pdf_path) if cache_dir else None
+    return "\n".join(TEXT_BACKENDS[resolve_text_backend(backend)](pdf_path, start_page, page_cache))
+
+
+def document_template(pdf_path: str) -> str:
+    """ชื่อ template ของเอกสาร = Creator / Producer ใน metadata (ใบเสนอราคาจากระบบเดียวกันได้ค่าเดียวกัน)"""
+    metadata = {}
+    try:
+        if _HAS_PYPDF2:
+            with open(pdf_path, "rb") as f:
+                metadata = dict(PyPDF2.PdfReader(f).metadata or {})
+        elif _HAS_PDFPLUMBER:
+            with pdfplumber.open(pdf_path) as pdf:
+                metadata = {f"/{k}": v for k, v in pdf.metadata.items()}
+    except Exception as e:
+        print(f"Warning: Could not read PDF metadata: {str(e)}", file=sys.stderr)
+    parts = [str(metadata.get(key, "")).strip() for key in ("/Creator", "/Producer")]
+    return " / ".join(parts) if any(parts) else "unknown"
 
 
-def extract_project_info_from_pdf(pdf_path: str) -> Dict:
+def load_text_backend_map(path: Optional[str]) -> Dict[str, str]:
+    """{template: backend} ที่ verify_text_backends เขียนไว้ (ไม่มีไฟล์ = {})"""
+    if not path or not Path(path).exists():
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def text_backend_for(pdf_path: str, backend_map: Dict[str, str]) -> Optional[str]:
+    """backend ของ template ของเอกสารนี้ตาม backend_map (ไม่อยู่ใน map = None/ค่าเริ่มต้น)"""
+    return backend_map.get(document_template(pdf_path)) if backend_map else None
+
+
+def extract_project_info_from_pdf(pdf_path: str, cache_dir: Optional[str] = None) -> Dict:
     """Extract project information from PDF header"""
     project_info = {
         "project_name": "",
@@ -61,7 +135,10 @@ def extract_project_info_from_pdf(pdf_path: str) -> Dict:
             with pdfplumber.open(pdf_path) as pdf:
                 # อ่านหน้าแรกเพื่อหาข้อมูลโครงการ
                 if len(pdf.pages) > 0:
-                    first_page_text = pdf.pages[0].extract_text() or ""
+                    if cache_dir:
+                        first_page_text = PDFPageCache(cache_dir, pdf_path).text(pdf.pages[0])
+                    else:
+                        first_page_text = pdf.pages[0].extract_text() or ""
                     
                     # ค้นหาข้อมูลจากรูปแบบต่างๆ
                     project_info.update(_parse_project_info(first_page_text))
@@ -135,7 +212,11 @@ def _parse_project_info(text: str) -> Dict:
 # ================== PDF Data Extraction for Structured Data ==================
 
 class PDFExtractor:
-    def __init__(self):
+    def __init__(self, cache_dir: Optional[str] = None, table_template: bool = False):
+        # cache_dir: cache ตารางรายหน้าตาม hash ของ PDF (ใช้ร่วมกับ main3.py)
+        # table_template: เรียนรู้คอลัมน์จากหน้าข้อมูลหน้าแรกแล้วใช้กับหน้าถัดไป (pdf_tables.TableTemplate)
+        self.cache_dir = cache_dir
+        self.table_template = table_template
         self.glass_data = []
         
     def extract_structured_data_from_pdf(self, file_path: str, start_page: int = 3) -> Dict:
@@ -143,6 +224,8 @@ class PDFExtractor:
         self.glass_data = []
         
         try:
+            page_cache = PDFPageCache(self.cache_dir, file_path) if self.cache_dir else None
+            extract = TableTemplate().extract_tables if self.table_template else None
             with pdfplumber.open(file_path) as pdf:
                 start_idx = start_page - 1
                 
@@ -152,7 +235,11 @@ class PDFExtractor:
                 # Process each page from start_page
                 for i in range(start_idx, len(pdf.pages)):
                     page = pdf.pages[i]
-                    tables = page.extract_tables()
+                    if page_cache:
+                        tables = page_cache.tables(page, extract=extract)
+                    else:
+                        tables = extract(page) if extract else page.extract_tables()
+                    release_page(page)
                     
                     if tables:
                         for j, table in enumerate(tables):
@@ -468,57 +555,38 @@ def parse_pdf_items(text: str):
 
 # ================== Improved Comparison Functions ==================
 
+# คะแนนขั้นต่ำที่ถือว่า "แก้ไข" แทน "เพิ่ม" (code = 2, width/height/quantity = 1)
+SIMILAR_MIN_SCORE = 3
+# ตำแหน่งใน key ที่ใช้ block: คู่ที่ได้ >= 3 คะแนนต้องมี code ตรง + อีกช่องหนึ่งตรง
+# หรือ width/height/quantity ตรงทั้งหมด - จึงอยู่ใน block เดียวกันอย่างน้อยหนึ่ง block เสมอ
+SIMILAR_BLOCKS = ((0, 1), (0, 2), (0, 3), (1, 2, 3))
+
+
+def _match_key(item: Dict) -> tuple:
+    """(code, width, height, quantity) ที่ normalize แล้ว - รายการตรงกันเมื่อ key เท่ากัน"""
+    return (str(item["code"]).strip(), int(item["width"]), int(item["height"]), int(item["quantity"]))
+
+
+def _similarity(txt_key: tuple, pdf_key: tuple) -> int:
+    """คะแนนความคล้าย: code ตรง 2 คะแนน (code สำคัญมาก), width/height/quantity ตรงช่องละ 1 คะแนน"""
+    return ((2 if txt_key[0] == pdf_key[0] else 0) + (txt_key[1] == pdf_key[1]) +
+            (txt_key[2] == pdf_key[2]) + (txt_key[3] == pdf_key[3]))
+
+
 def compare_items(txt_items, pdf_items, provided_total=None):
     """Compare lists of items and build differences and matched items - ใช้การค้นหาแบบ step-by-step"""
     diffs = []
     matched_count = 0
     
-    # Debug: พิมพ์ข้อมูลที่ parse ได้
-    print(f"DEBUG: txt_items = {len(txt_items)} items", file=sys.stderr)
-    for i, item in enumerate(txt_items):
-        print(f"  TXT[{i}]: {item}", file=sys.stderr)
+    # normalize ครั้งเดียว แล้วเทียบด้วย key แทนการแปลง str/int ทุกครั้งที่เช็ค
+    txt_keys = [_match_key(i) for i in txt_items]
+    pdf_keys = [_match_key(i) for i in pdf_items]
     
-    print(f"DEBUG: pdf_items = {len(pdf_items)} items", file=sys.stderr)
-    for i, item in enumerate(pdf_items):
-        print(f"  PDF[{i}]: {item}", file=sys.stderr)
-
     # สร้าง mapping ของ PDF items
-    pdf_by_seq = {i["seq"]: i for i in pdf_items}
+    pdf_by_seq = {i["seq"]: (i, key) for i, key in zip(pdf_items, pdf_keys)}
     used_pdf_sequences = set()  # เก็บ PDF sequences ที่ใช้แล้ว
     matched_txt_indices = set()  # เก็บ TXT indices ที่ match แล้ว
     
-    # Helper function สำหรับเช็คว่า items ตรงกันไหม
-    def items_match(txt_item, pdf_item):
-        return (str(pdf_item["code"]).strip() == str(txt_item["code"]).strip() and
-                int(pdf_item["width"]) == int(txt_item["width"]) and
-                int(pdf_item["height"]) == int(txt_item["height"]) and
-                int(pdf_item["quantity"]) == int(txt_item["quantity"]))
-    
-    # Helper function สำหรับเช็คว่า items มีความคล้ายคลึงไหม (เหมาะสมสำหรับแก้ไข)
-    def items_similar(txt_item, pdf_item):
-        """เช็คว่ารายการคล้ายกันพอที่จะเป็น 'แก้ไข' แทน 'เพิ่ม'"""
-        similarities = 0
-        total_checks = 4
-        
-        # เช็ค code
-        if str(pdf_item["code"]).strip() == str(txt_item["code"]).strip():
-            similarities += 2  # code สำคัญมาก
-        
-        # เช็ค width
-        if int(pdf_item["width"]) == int(txt_item["width"]):
-            similarities += 1
-            
-        # เช็ค height  
-        if int(pdf_item["height"]) == int(txt_item["height"]):
-            similarities += 1
-            
-        # เช็ค quantity
-        if int(pdf_item["quantity"]) == int(txt_item["quantity"]):
-            similarities += 1
-        
-        # ถ้าตรงกัน 3 จาก 5 หรือมากกว่า ถือว่าคล้ายกัน
-        return similarities >= 3
-    
     # Helper function สำหรับสร้าง notes การแก้ไข
     def generate_edit_notes(txt_item, pdf_item):
         notes = []
@@ -532,11 +600,7 @@ def compare_items(txt_items, pdf_items, provided_total=None):
             notes.append(f"แก้จำนวนจาก {pdf_item['quantity']} เป็น {txt_item['quantity']}")
         return "; ".join(notes)
     
-    print(f"DEBUG: Starting Step-by-Step Matching Process", file=sys.stderr)
-    
     # ============ ขั้นตอนที่ 1: Sequence Matching (ทำทุกบรรทัด) ============
-    print(f"DEBUG: === STEP 1: Sequence Matching ===", file=sys.stderr)
-    
     for idx, txt_it in enumerate(txt_items, start=1):
         if idx in matched_txt_indices:
             continue
@@ -547,16 +611,11 @@ def compare_items(txt_items, pdf_items, provided_total=None):
         src_q    = txt_it["quantity"]
         source_content = f"{src_code} {src_w} * {src_h} = {src_q}"
         
-        print(f"DEBUG: Step1 - Processing TXT line {idx}: {source_content}", file=sys.stderr)
-        
         # ลองหา PDF item ในตำแหน่งเดียวกัน (sequence matching)
-        pdf_it = pdf_by_seq.get(idx)
+        pdf_it, pdf_key = pdf_by_seq.get(idx, (None, None))
         if pdf_it and pdf_it["seq"] not in used_pdf_sequences:
-            print(f"DEBUG: Step1 - Trying sequence match {idx}: PDF seq {pdf_it['seq']}", file=sys.stderr)
-            
-            if items_match(txt_it, pdf_it):
+            if pdf_key == txt_keys[idx - 1]:
                 # ตรงกันทั้งหมด
-                print(f"DEBUG: Step1 - Perfect sequence match found at {idx}", file=sys.stderr)
                 matched_count += 1
                 used_pdf_sequences.add(pdf_it["seq"])
                 matched_txt_indices.add(idx)
@@ -569,15 +628,13 @@ def compare_items(txt_items, pdf_items, provided_total=None):
                     "note":           "ข้อมูลถูกต้อง (Step 1: Sequence Match)",
                     "sort_priority":  1  # เพิ่ม sort priority
                 })
-            else:
-                print(f"DEBUG: Step1 - Sequence position {idx} exists in PDF but doesn't match", file=sys.stderr)
-        else:
-            print(f"DEBUG: Step1 - No PDF item at sequence {idx} or already used", file=sys.stderr)
-    
-    print(f"DEBUG: Step1 completed - Matched: {len(matched_txt_indices)} items", file=sys.stderr)
     
     # ============ ขั้นตอนที่ 2: Flexible Search - Perfect Match (ทำทุกบรรทัดที่เหลือ) ============
-    print(f"DEBUG: === STEP 2: Flexible Search (Perfect Match) ===", file=sys.stderr)
+    # key -> คิวของ PDF items ตามลำดับใน pdf_items (บรรทัดซ้ำอยู่คิวเดียวกัน)
+    # หัวคิวที่ถูกใช้ไปแล้วถูกตัดทิ้งตอนค้นหา - ได้รายการแรกที่ยังไม่ถูกใช้เหมือนการไล่ทั้ง list
+    exact_index = {}
+    for pdf_item, key in zip(pdf_items, pdf_keys):
+        exact_index.setdefault(key, deque()).append(pdf_item)
     
     for idx, txt_it in enumerate(txt_items, start=1):
         if idx in matched_txt_indices:
@@ -589,18 +646,14 @@ def compare_items(txt_items, pdf_items, provided_total=None):
         src_q    = txt_it["quantity"]
         source_content = f"{src_code} {src_w} * {src_h} = {src_q}"
         
-        print(f"DEBUG: Step2 - Processing TXT line {idx}: {source_content}", file=sys.stderr)
-        
         # ค้นหาใน PDF sequences อื่นๆ (flexible matching)
-        matching_pdf_item = None
-        for pdf_item in pdf_items:
-            if pdf_item["seq"] not in used_pdf_sequences and items_match(txt_it, pdf_item):
-                matching_pdf_item = pdf_item
-                break
+        candidates = exact_index.get(txt_keys[idx - 1])
+        while candidates and candidates[0]["seq"] in used_pdf_sequences:
+            candidates.popleft()
+        matching_pdf_item = candidates.popleft() if candidates else None
         
         if matching_pdf_item:
             # พบรายการที่ตรงกันใน sequence อื่น
-            print(f"DEBUG: Step2 - Flexible perfect match found: TXT {idx} matches PDF {matching_pdf_item['seq']}", file=sys.stderr)
             matched_count += 1
             used_pdf_sequences.add(matching_pdf_item["seq"])
             matched_txt_indices.add(idx)
@@ -613,13 +666,14 @@ def compare_items(txt_items, pdf_items, provided_total=None):
                 "note":           "ข้อมูลถูกต้อง",
                 "sort_priority":  1  # เพิ่ม sort priority
             })
-        else:
-            print(f"DEBUG: Step2 - No perfect match found for TXT line {idx}", file=sys.stderr)
-    
-    print(f"DEBUG: Step2 completed - Total matched so far: {len(matched_txt_indices)} items", file=sys.stderr)
     
     # ============ ขั้นตอนที่ 3: Fallback Similar Search (ทำทุกบรรทัดที่เหลือ) ============
-    print(f"DEBUG: === STEP 3: Fallback Similar Search ===", file=sys.stderr)
+    # block -> ตำแหน่งใน pdf_items ของรายการที่ยังไม่ถูกใช้ (ให้คะแนนเฉพาะรายการที่อาจได้ถึง SIMILAR_MIN_SCORE)
+    similar_blocks = {}
+    for pos, (pdf_item, key) in enumerate(zip(pdf_items, pdf_keys)):
+        if pdf_item["seq"] not in used_pdf_sequences:
+            for fields in SIMILAR_BLOCKS:
+                similar_blocks.setdefault((fields, tuple(key[f] for f in fields)), []).append(pos)
     
     for idx, txt_it in enumerate(txt_items, start=1):
         if idx in matched_txt_indices:
@@ -631,65 +685,48 @@ def compare_items(txt_items, pdf_items, provided_total=None):
         src_q    = txt_it["quantity"]
         source_content = f"{src_code} {src_w} * {src_h} = {src_q}"
         
-        print(f"DEBUG: Step3 - Processing TXT line {idx}: {source_content}", file=sys.stderr)
+        # หาดรายการที่คล้ายกัน - เฉพาะ PDF items ที่อยู่ใน block เดียวกัน
+        txt_key = txt_keys[idx - 1]
+        candidates = set()
+        for fields in SIMILAR_BLOCKS:
+            block = similar_blocks.get((fields, tuple(txt_key[f] for f in fields)))
+            if block:
+                # ตัดรายการที่ถูกใช้แล้วออกจาก block ไปเลย (ไม่ต้องข้ามซ้ำในรอบถัดไป)
+                block[:] = [pos for pos in block if pdf_items[pos]["seq"] not in used_pdf_sequences]
+                candidates.update(block)
         
-        # หาดรายการที่คล้ายกัน project_name
         best_similar_pdf_item = None
         best_similarity = 0
         
-        try:
-            for pdf_item in pdf_items:
-                if pdf_item["seq"] not in used_pdf_sequences:
-                    similarities = 0
-                    
-                    # นับความคล้ายคลึง
-                    if str(pdf_item["code"]).strip() == str(txt_it["code"]).strip():
-                        similarities += 2  # code สำคัญมาก
-                    if int(pdf_item["width"]) == int(txt_it["width"]):
-                        similarities += 1
-                    if int(pdf_item["height"]) == int(txt_it["height"]):
-                        similarities += 1
-                    if int(pdf_item["quantity"]) == int(txt_it["quantity"]):
-                        similarities += 1
-                    
-                    print(f"DEBUG: Step3 - Comparing with PDF {pdf_item['seq']}: {pdf_item['code']} {pdf_item['width']}*{pdf_item['height']}={pdf_item['quantity']} (similarity: {similarities})", file=sys.stderr)
-                    
-                    # ถ้าคล้ายกันมากกว่า และมีอย่างน้อย 3 คะแนน
-                    if similarities > best_similarity and similarities >= 3:
-                        best_similarity = similarities
-                        best_similar_pdf_item = pdf_item
+        # ไล่ตามลำดับใน pdf_items - คะแนนเท่ากันได้รายการแรกเหมือนเดิม
+        for pos in sorted(candidates):
+            pdf_item = pdf_items[pos]
+            similarities = _similarity(txt_key, pdf_keys[pos])
             
-            if best_similar_pdf_item:
-                # พบรายการที่คล้ายกัน - แสดงเป็น "แก้ไข"
-                print(f"DEBUG: Step3 - Similar match found: TXT {idx} similar to PDF {best_similar_pdf_item['seq']} (similarity: {best_similarity})", file=sys.stderr)
-                used_pdf_sequences.add(best_similar_pdf_item["seq"])
-                matched_txt_indices.add(idx)
-                
-                edit_notes = generate_edit_notes(txt_it, best_similar_pdf_item)
-                
-                diffs.append({
-                    "line_number":    best_similar_pdf_item["seq"],
-                    "type":           "modified",
-                    "source_content": source_content,
-                    "target_content": "\n".join(best_similar_pdf_item["raw_lines"]),
-                    "note":           f"{edit_notes}",
-                    "sort_priority":  2  # เพิ่ม sort priority
-                })
-            else:
-                print(f"DEBUG: Step3 - No similar match found for TXT line {idx}", file=sys.stderr)
-                
-        except Exception as e:
-            print(f"DEBUG: Step3 - Error processing TXT line {idx}: {str(e)}", file=sys.stderr)
-    
-    print(f"DEBUG: Step3 completed - Total processed: {len(matched_txt_indices)} items", file=sys.stderr)
+            # ถ้าคล้ายกันมากกว่า และมีอย่างน้อย 3 คะแนน
+            if similarities > best_similarity and similarities >= SIMILAR_MIN_SCORE:
+                best_similarity = similarities
+                best_similar_pdf_item = pdf_item
+        
+        if best_similar_pdf_item:
+            # พบรายการที่คล้ายกัน - แสดงเป็น "แก้ไข"
+            used_pdf_sequences.add(best_similar_pdf_item["seq"])
+            matched_txt_indices.add(idx)
+            
+            edit_notes = generate_edit_notes(txt_it, best_similar_pdf_item)
+            
+            diffs.append({
+                "line_number":    best_similar_pdf_item["seq"],
+                "type":           "modified",
+                "source_content": source_content,
+                "target_content": "\n".join(best_similar_pdf_item["raw_lines"]),
+                "note":           f"{edit_notes}",
+                "sort_priority":  2  # เพิ่ม sort priority
+            })
     
     # ============ ขั้นตอนที่ 4: ตรวจสอบ PDF items ที่เหลือ (รายการเกิน) ============
-    print(f"DEBUG: === STEP 4: Check for Extra PDF Items ===", file=sys.stderr)
-    
     for pdf_it in pdf_items:
         if pdf_it["seq"] not in used_pdf_sequences:
-            print(f"DEBUG: Step4 - Unused PDF item at seq {pdf_it['seq']} - extra item", file=sys.stderr)
-            
             diffs.append({
                 "line_number":    pdf_it["seq"],
                 "type":           "removed",
@@ -700,8 +737,6 @@ def compare_items(txt_items, pdf_items, provided_total=None):
             })
 
     # ============ ขั้นตอนที่ 5: เพิ่มรายการที่หายไปในลำดับที่เหมาะสม ============
-    print(f"DEBUG: === STEP 5: Add Missing TXT Items ===", file=sys.stderr)
-    
     max_pdf_seq = max([p["seq"] for p in pdf_items], default=0)
     missing_counter = 1
     
@@ -713,8 +748,6 @@ def compare_items(txt_items, pdf_items, provided_total=None):
             src_q    = txt_it["quantity"]
             source_content = f"{src_code} {src_w} * {src_h} = {src_q}"
             
-            print(f"DEBUG: Step5 - Adding missing TXT item {idx}: {source_content}", file=sys.stderr)
-            
             diffs.append({
                 "line_number":    max_pdf_seq + missing_counter,
                 "type":           "added",
@@ -758,16 +791,97 @@ def compare_items(txt_items, pdf_items, provided_total=None):
     }
 
 
+# ================== Text Backend Verification ==================
+
+def _item_key(item: Dict) -> tuple:
+    return (item["seq"], item["code"], item["quantity"], item["width"], item["height"])
+
+
+def _item_view(item_keys) -> List[Dict]:
+    return [dict(zip(("seq", "code", "quantity", "width", "height"), key)) for key in item_keys]
+
+
+def expand_corpus(paths: List[str]) -> List[str]:
+    """ไฟล์ PDF จาก path ที่ระบุ (โฟลเดอร์ = ทุกไฟล์ .pdf ข้างใน แบบ recursive)"""
+    files = []
+    for path in paths:
+        p = Path(path)
+        if p.is_dir():
+            files.extend(sorted(str(f) for f in p.rglob("*") if f.suffix.lower() == ".pdf"))
+        else:
+            files.append(str(p))
+    return files
+
+
+def verify_text_backends(pdf_paths: List[str], start_page: int = 1,
+                         backends: Optional[List[str]] = None) -> Dict:
+    """รัน parse_pdf_items กับข้อความจากทุก backend แล้วรายงานรายการที่ต่างกัน (เทียบ seq/code/qty/w/h)
+    backend แรกเป็นตัวอ้างอิง - template ที่ทุกเอกสารได้รายการเท่ากันแนะนำ backend ที่เร็วที่สุด
+    """
+    backends = [resolve_text_backend(b) for b in (backends or list(TEXT_BACKENDS))]
+    reference = backends[0]
+    documents = []
+    templates = {}
+
+    for pdf_path in pdf_paths:
+        doc = {"file": pdf_path, "template": document_template(pdf_path),
+               "items": {}, "seconds": {}, "differences": {}}
+        keys = {}
+        try:
+            for backend in backends:
+                start = time.perf_counter()
+                text = extract_text_from_pdf(pdf_path, start_page, backend=backend)
+                doc["seconds"][backend] = round(time.perf_counter() - start, 4)
+                keys[backend] = [_item_key(item) for item in parse_pdf_items(text)]
+                doc["items"][backend] = len(keys[backend])
+        except Exception as e:
+            doc["error"] = str(e)
+
+        for backend in backends[1:]:
+            if backend not in keys or reference not in keys:
+                continue
+            matcher = difflib.SequenceMatcher(None, keys[reference], keys[backend], autojunk=False)
+            diffs = [{"op": op, reference: _item_view(keys[reference][i1:i2]), backend: _item_view(keys[backend][j1:j2])}
+                     for op, i1, i2, j1, j2 in matcher.get_opcodes() if op != "equal"]
+            if diffs:
+                doc["differences"][backend] = diffs
+        doc["equivalent"] = "error" not in doc and not doc["differences"]
+        documents.append(doc)
+
+        summary = templates.setdefault(doc["template"], {"documents": 0, "equivalent": 0,
+                                                          "seconds": dict.fromkeys(backends, 0.0)})
+        summary["documents"] += 1
+        summary["equivalent"] += doc["equivalent"]
+        for backend, seconds in doc["seconds"].items():
+            summary["seconds"][backend] = round(summary["seconds"][backend] + seconds, 4)
+
+    for summary in templates.values():
+        if summary["equivalent"] == summary["documents"]:
+            summary["backend"] = min(backends, key=lambda b: summary["seconds"][b])
+        else:
+            summary["backend"] = reference
+
+    return {
+        "success": True,
+        "reference_backend": reference,
+        "documents": documents,
+        "templates": templates,
+        "all_equivalent": all(doc["equivalent"] for doc in documents)
+    }
+
+
 # ================== Main Processing Functions ==================
 
-def process_pdf_vs_pdf_comparison(source_pdf_path: str, target_pdf_path: str, start_page: int = 3):
+def process_pdf_vs_pdf_comparison(source_pdf_path: str, target_pdf_path: str, start_page: int = 3,
+                                  cache_dir: Optional[str] = None, table_template: bool = False,
+                                  text_backend: Optional[str] = None):
     """Process PDF vs PDF comparison"""
     try:
         # Extract project info from target PDF
-        project_info = extract_project_info_from_pdf(target_pdf_path)
+        project_info = extract_project_info_from_pdf(target_pdf_path, cache_dir)
         
         # Extract structured data from source PDF
-        extractor = PDFExtractor()
+        extractor = PDFExtractor(cache_dir, table_template)
         source_result = extractor.extract_structured_data_from_pdf(source_pdf_path, start_page)
         
         if 'error' in source_result:
@@ -781,7 +895,7 @@ def process_pdf_vs_pdf_comparison(source_pdf_path: str, target_pdf_path: str, st
             return {"success": False, "error": "ไม่พบข้อมูลที่สามารถใช้เปรียบเทียบได้ในไฟล์ PDF ต้นฉบับ"}
         
         # Process comparison with target PDF
-        result = process_text_vs_pdf_comparison(source_text, target_pdf_path, 1)
+        result = process_text_vs_pdf_comparison(source_text, target_pdf_path, 1, cache_dir, text_backend)
         
         # Add project info to result
         if result.get("success"):
@@ -793,13 +907,14 @@ def process_pdf_vs_pdf_comparison(source_pdf_path: str, target_pdf_path: str, st
         return {"success": False, "error": f"เกิดข้อผิดพลาดในการประมวลผล PDF vs PDF: {str(e)}"}
 
 
-def process_text_vs_pdf_comparison(text_block: str, pdf_path: str, start_page: int = 1):
+def process_text_vs_pdf_comparison(text_block: str, pdf_path: str, start_page: int = 1,
+                                   cache_dir: Optional[str] = None, text_backend: Optional[str] = None):
     """Process Text vs PDF comparison"""
     try:
         # Extract project info from PDF
-        project_info = extract_project_info_from_pdf(pdf_path)
+        project_info = extract_project_info_from_pdf(pdf_path, cache_dir)
         
-        pdf_text = extract_text_from_pdf(pdf_path, start_page)
+        pdf_text = extract_text_from_pdf(pdf_path, start_page, cache_dir, text_backend)
         txt_items, provided_total = parse_txt_items(text_block)
         pdf_items = parse_pdf_items(pdf_text)
         cmp_res = compare_items(txt_items, pdf_items, provided_total)
@@ -829,8 +944,8 @@ def process_text_vs_pdf_comparison(text_block: str, pdf_path: str, start_page: i
 
 def main():
     parser = argparse.ArgumentParser()
-    parser.add_argument("--mode", choices=['text_vs_pdf', 'pdf_vs_pdf'], required=True, 
-                       help="โหมดการเปรียบเทียบ")
+    parser.add_argument("--mode", choices=['text_vs_pdf', 'pdf_vs_pdf', 'verify_text_backends'], required=True, 
+                       help="โหมดการเปรียบเทียบ (verify_text_backends = เทียบผลของ text backend กับ --corpus)")
     
     # For text vs pdf mode
     parser.add_argument("--text", help="ข้อความ TXT ที่จะเปรียบเทียบ")
@@ -841,12 +956,42 @@ def main():
                        help="หน้าเริ่มต้นอ่าน PDF ต้นฉบับ")
     
     # Common arguments
-    parser.add_argument("--target-pdf", required=True, help="ไฟล์ PDF เปรียบเทียบ")
+    parser.add_argument("--target-pdf", help="ไฟล์ PDF เปรียบเทียบ")
     parser.add_argument("--target-start-page", type=int, default=1, 
                        help="หน้าเริ่มต้นอ่าน PDF เปรียบเทียบ")
+    parser.add_argument("--cache-dir", default=None,
+                       help="โฟลเดอร์ cache ผลดึงข้อมูล PDF รายหน้า (ใช้ร่วมกับ main3.py)")
+    parser.add_argument("--table-template", action="store_true",
+                       help="ใช้ตำแหน่งคอลัมน์จากหน้าข้อมูลหน้าแรกกับหน้าถัดไป (pdf_vs_pdf)")
+    parser.add_argument("--text-backend", choices=list(TEXT_BACKENDS),
+                       help="backend สำหรับดึงข้อความ PDF (ค่าเริ่มต้น: pdfplumber ถ้าติดตั้ง)")
+    parser.add_argument("--text-backend-map",
+                       help="JSON {template: backend} จาก verify_text_backends - เลือก backend ตาม template ของ PDF")
+    
+    # For verify_text_backends mode
+    parser.add_argument("--corpus", nargs="+", help="ไฟล์หรือโฟลเดอร์ PDF สำหรับ verify_text_backends")
+    parser.add_argument("--write-backend-map", help="เขียน {template: backend} ที่แนะนำลงไฟล์ JSON นี้")
     
     args = parser.parse_args()
 
+    if args.mode == 'verify_text_backends':
+        if not args.corpus:
+            print(json.dumps({"error": "ต้องระบุ --corpus สำหรับโหมด verify_text_backends"}), flush=True)
+            sys.exit(1)
+        result = verify_text_backends(expand_corpus(args.corpus), args.target_start_page)
+        if args.write_backend_map:
+            # PDF ที่ไม่มี metadata แยก template ไม่ได้ - ไม่ใส่ใน map (ใช้ backend ค่าเริ่มต้นเสมอ)
+            backend_map = {name: summary["backend"] for name, summary in result["templates"].items()
+                           if name != "unknown"}
+            with open(args.write_backend_map, "w", encoding="utf-8") as f:
+                json.dump(backend_map, f, ensure_ascii=False, indent=2)
+        print(json.dumps(result, ensure_ascii=False, indent=2), flush=True)
+        sys.exit(0 if result["all_equivalent"] else 1)
+
+    if not args.target_pdf:
+        print(json.dumps({"error": "ต้องระบุ --target-pdf"}), flush=True)
+        sys.exit(1)
+
     # Validate arguments based on mode
     if args.mode == 'text_vs_pdf' and not args.text:
         print(json.dumps({"error": "ต้องระบุ --text สำหรับโหมด text_vs_pdf"}), flush=True)
@@ -866,13 +1011,19 @@ def main():
         print(json.dumps({"error": f"ไม่พบไฟล์ PDF ต้นฉบับ: {args.source_pdf}"}), flush=True)
         sys.exit(1)
 
+    # --text-backend มาก่อน map ตาม template ของ PDF ที่ถูกดึงข้อความ (target)
+    text_backend = args.text_backend or text_backend_for(args.target_pdf, load_text_backend_map(args.text_backend_map))
+
     # Process based on mode
     if args.mode == 'text_vs_pdf':
-        result = process_text_vs_pdf_comparison(args.text, args.target_pdf, args.target_start_page)
+        result = process_text_vs_pdf_comparison(args.text, args.target_pdf, args.target_start_page, args.cache_dir,
+                                                text_backend)
     else:  # pdf_vs_pdf
-        result = process_pdf_vs_pdf_comparison(args.source_pdf, args.target_pdf, args.source_start_page)
+        result = process_pdf_vs_pdf_comparison(args.source_pdf, args.target_pdf, args.source_start_page,
+                                               args.cache_dir, args.table_template, text_backend)
     
     print(json.dumps(result, ensure_ascii=False, indent=2), flush=True)
+    print(f"🧠 Peak memory: {peak_memory_mb()} MB", file=sys.stderr)
     sys.exit(0 if result.get("success") else 1)
 
 
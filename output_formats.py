@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+output_formats.py - เขียนผลลัพธ์ Price/Type เป็น XLSX, CSV, JSON Lines หรือ Parquet
+เขียนตรงจาก records (PriceRecordStore หรือ list ของ dict) โดยไม่ต้องผ่าน XLSX
+ปลายทางเป็นได้ทั้ง path และ binary file-like object (เช่น io.BytesIO สำหรับสร้างไฟล์ในหน่วยความจำ)
+"""
+
+import csv
+import io
+import json
+from contextlib import contextmanager
+from itertools import islice
+from typing import Iterable, Sequence
+
+from xlsx_writer import StreamingXlsxWriter
+
+# Parquet ต้องใช้ pyarrow (optional)
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    _HAS_PYARROW = True
+except ImportError:
+    _HAS_PYARROW = False
+
+DEFAULT_FORMAT = "xlsx"
+
+# จำนวนแถวต่อ row group ของ parquet ที่เขียนจาก iterator (ไม่ต้องเก็บทุกแถวไว้ในหน่วยความจำ)
+PARQUET_BATCH_ROWS = 50_000
+
+OUTPUT_FORMATS = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv",
+    "jsonl": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def validate_format(output_format: str) -> str:
+    """ตรวจสอบรูปแบบไฟล์ผลลัพธ์ คืนค่าเป็นตัวพิมพ์เล็ก"""
+    fmt = (output_format or DEFAULT_FORMAT).strip().lower()
+    if fmt not in OUTPUT_FORMATS:
+        raise ValueError(f"ไม่รองรับรูปแบบไฟล์ {output_format} (รองรับ: {', '.join(OUTPUT_FORMATS)})")
+    if fmt == "parquet" and not _HAS_PYARROW:
+        raise RuntimeError("ติดตั้ง pyarrow ก่อนใช้งานรูปแบบ parquet")
+    return fmt
+
+
+def output_filename(prefix: str, job_id: str = None, output_format: str = DEFAULT_FORMAT) -> str:
+    """ชื่อไฟล์ผลลัพธ์ เช่น Price_<job_id>.csv หรือ Price.csv ถ้าไม่มี job_id"""
+    stem = f"{prefix}_{job_id}" if job_id else prefix
+    return f"{stem}.{output_format}"
+
+
+@contextmanager
+def _open_text(path_or_file, newline=None):
+    """เปิดปลายทางเป็น text (utf-8) - file-like object จะไม่ถูกปิดหลังเขียนเสร็จ"""
+    if hasattr(path_or_file, "write"):
+        wrapper = io.TextIOWrapper(path_or_file, encoding="utf-8", newline=newline)
+        try:
+            yield wrapper
+        finally:
+            wrapper.flush()
+            wrapper.detach()
+    else:
+        with open(path_or_file, "w", encoding="utf-8", newline=newline) as f:
+            yield f
+
+
+def _json_value(value):
+    """NaN -> null (JSON มาตรฐานไม่มี NaN)"""
+    return None if isinstance(value, float) and value != value else value
+
+
+def write_rows(path, columns: Sequence[str], rows: Iterable[Sequence], output_format: str) -> int:
+    """เขียนแถว (tuple ตามลำดับ columns) ในรูปแบบที่กำหนด คืนจำนวนแถวที่เขียน"""
+    fmt = validate_format(output_format)
+    count = 0
+
+    if fmt == "xlsx":
+        with StreamingXlsxWriter(path, columns) as writer:
+            return writer.write_rows(rows)
+
+    if fmt == "csv":
+        with _open_text(path, newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            for row in rows:
+                writer.writerow(["" if value is None else value for value in row])
+                count += 1
+        return count
+
+    if fmt == "jsonl":
+        with _open_text(path) as f:
+            for row in rows:
+                f.write(json.dumps({col: _json_value(value) for col, value in zip(columns, row)},
+                                   ensure_ascii=False, allow_nan=False))
+                f.write("\n")
+                count += 1
+        return count
+
+    # parquet - เขียนทีละ batch เป็น row group, schema มาจาก batch แรก
+    rows = iter(rows)
+    writer = None
+    try:
+        for batch in iter(lambda: list(islice(rows, PARQUET_BATCH_ROWS)), []):
+            data = list(zip(*batch))
+            if writer is None:
+                table = pa.table([pa.array(values) for values in data], names=list(columns))
+                writer = pq.ParquetWriter(path, table.schema)
+            else:
+                table = pa.table([pa.array(values, type=field.type) for values, field in zip(data, writer.schema)],
+                                 schema=writer.schema)
+            writer.write_table(table)
+            count += len(batch)
+        if writer is None:
+            pq.write_table(pa.table({col: pa.array([]) for col in columns}), path)
+    finally:
+        if writer is not None:
+            writer.close()
+    return count
+
+
+def write_price_store(path, store, output_format: str = DEFAULT_FORMAT) -> int:
+    """เขียน PriceRecordStore"""
+    if validate_format(output_format) == "parquet":
+        # ส่งคอลัมน์ตรงจาก store (Serie/Type/สี เป็น dictionary-encoded อยู่แล้ว)
+        pq.write_table(store.to_arrow(), path)
+        return len(store)
+    return write_rows(path, store.columns, store.iter_rows(), output_format)
+
+
+def write_records(path, records: Sequence[dict], output_format: str = DEFAULT_FORMAT,
+                  columns: Sequence[str] = None) -> int:
+    """เขียน list ของ dict (เช่น Type records) - ถ้าไม่ระบุ columns จะใช้ลำดับ key ที่พบ"""
+    if columns is None:
+        columns = list(dict.fromkeys(key for record in records for key in record))
+    return write_rows(path, columns, ([record.get(col) for col in columns] for record in records),
+                      output_format)
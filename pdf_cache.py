@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+pdf_cache.py - Cache ผลดึงข้อมูล PDF รายหน้าลงดิสก์ (ใช้ร่วมกันระหว่าง main3.py และ main4.py)
+key = hash เนื้อหา PDF + เลขหน้า + ชนิดผลลัพธ์ (tables/text/...) + settings + เวอร์ชันของ library
+PDF เดิมที่อัปโหลดซ้ำ (text-glass แล้วไป compare) จึงไม่ต้อง extract_tables/extract_text ใหม่
+release_page/peak_memory_mb: คุมหน่วยความจำตอนไล่อ่าน PDF หลายร้อยหน้า
+"""
+
+import hashlib
+import json
+import os
+import resource
+import sys
+from functools import lru_cache
+from importlib import metadata
+from typing import Any, Callable, Optional
+
+from disk_cache import DiskCache
+
+# เอกสารละหลายสิบหน้า - เก็บได้มากกว่า cache รายชีตของ matrix mode
+DEFAULT_MAX_PAGES = 20000
+
+# เปลี่ยนเมื่อรูปแบบของค่าที่เก็บเปลี่ยน (cache เก่าจะไม่ถูกใช้)
+# 2: ผลของ TableTemplate แยกออกจาก "pdfplumber.tables" (รุ่น 1 เก็บรวมกัน)
+CACHE_VERSION = 2
+
+
+def _library_version(name: str) -> str:
+    try:
+        return metadata.version(name)
+    except metadata.PackageNotFoundError:
+        return ""
+
+
+# ผลของ extract_tables/extract_text ขึ้นกับเวอร์ชันของ library
+LIBRARY_VERSIONS = {name: _library_version(name) for name in ("pdfplumber", "PyPDF2")}
+
+
+def release_page(page) -> None:
+    """ล้าง layout/objects/edges ที่ pdfplumber cache ไว้บน Page หลังเก็บผลของหน้านั้นแล้ว
+
+    ถ้าไม่ล้าง Page ทุกหน้าที่เคยแตะจะค้างอยู่ใน pdf.pages จนปิดไฟล์ (หน่วยความจำโตตามจำนวนหน้า)
+    """
+    close = getattr(page, "close", None)  # pdfplumber รุ่นใหม่มี Page.close()
+    if close is not None:
+        close()
+    else:
+        page.flush_cache()
+        textmap = getattr(page, "get_textmap", None)  # extract_text เก็บ TextMap ไว้ใน lru_cache ของแต่ละหน้า
+        if hasattr(textmap, "cache_clear"):
+            textmap.cache_clear()
+
+
+def peak_memory_mb() -> float:
+    """peak RSS (MB) ของ process นี้และ worker processes ที่จบไปแล้ว (บน Linux อ่าน VmHWM เหมือน benchmark.py)"""
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024  # ru_maxrss เป็น bytes บน macOS, KB บน Linux
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale
+    try:
+        with open("/proc/self/status", "r") as f:
+            own = next(int(line.split()[1]) for line in f if line.startswith("VmHWM:")) / 1024
+    except (OSError, StopIteration):
+        own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+    return round(max(own, children), 1)
+
+
+@lru_cache(maxsize=64)
+def _file_hash(path: str, size: int, mtime_ns: int) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def document_hash(source) -> str:
+    """sha256 ของเนื้อหา PDF (path, bytes หรือ file-like object) - path เดิมที่ไม่ถูกแก้ไข hash ครั้งเดียว"""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return hashlib.sha256(source).hexdigest()
+    if hasattr(source, "read"):
+        position = source.tell()
+        digest = hashlib.sha256()
+        for block in iter(lambda: source.read(1 << 20), b""):
+            digest.update(block)
+        source.seek(position)
+        return digest.hexdigest()
+    path = os.fspath(source)
+    stat = os.stat(path)
+    return _file_hash(os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+
+class PDFPageCache:
+    """Cache รายหน้าของ PDF หนึ่งไฟล์ (pickle ได้ - ส่งให้ worker processes ได้)
+
+    Example:
+        page_cache = PDFPageCache("cache/pdf", pdf_bytes)
+        tables = page_cache.tables(page)
+        text = page_cache.text(page)
+    """
+
+    def __init__(self, directory, source, max_entries: int = DEFAULT_MAX_PAGES):
+        self.cache = DiskCache(directory, max_entries)
+        self.doc_hash = document_hash(source)
+
+    def key(self, page_number: int, kind: str, settings: Optional[dict] = None) -> str:
+        payload = json.dumps([CACHE_VERSION, LIBRARY_VERSIONS, self.doc_hash, page_number, kind, settings or {}],
+                             sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get_or_compute(self, page_number: int, kind: str, compute: Callable[[], Any],
+                       settings: Optional[dict] = None) -> Any:
+        """ค่าจาก cache หรือคำนวณด้วย compute() แล้วเก็บไว้ (page_number เริ่มที่ 1)"""
+        key = self.key(page_number, kind, settings)
+        value = self.cache.get(key)
+        if value is None:
+            value = compute()
+            self.cache.put(key, value)
+        return value
+
+    def tables(self, page, table_settings: Optional[dict] = None,
+               extract: Optional[Callable[[Any], list]] = None, extract_kind: str = "pdf_tables.template") -> list:
+        """page.extract_tables(table_settings) ของ pdfplumber
+        extract(page): วิธีอื่น (เช่น TableTemplate.extract_tables) - เก็บแยกเป็น extract_kind
+        ผลของวิธีอื่นจึงไม่ถูกส่งให้งานที่ต้องการ page.extract_tables() จริงๆ"""
+        if extract:
+            return self.get_or_compute(page.page_number, extract_kind, lambda: extract(page), table_settings)
+        return self.get_or_compute(page.page_number, "pdfplumber.tables",
+                                   lambda: page.extract_tables(table_settings), table_settings)
+
+    def text(self, page) -> str:
+        """page.extract_text() ของ pdfplumber (หน้าว่างได้ "")"""
+        return self.get_or_compute(page.page_number, "pdfplumber.text", lambda: page.extract_text() or "")
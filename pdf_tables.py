@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+pdf_tables.py - ดึงตารางจากหน้า PDF ด้วย template คอลัมน์ที่เรียนรู้จากหน้าข้อมูลหน้าแรก (ใช้ร่วมกันระหว่าง main3.py และ main4.py)
+ใบเสนอราคามาจากระบบเดียวกัน เส้นแนวตั้งของตารางจึงอยู่ตำแหน่งเดิมทุกหน้า:
+    - หน้าแรกที่มีตารางข้อมูล (>= 17 คอลัมน์, >= 6 แถว) ใช้ page.extract_tables() แล้วจำตำแหน่งคอลัมน์
+    - หน้าที่เส้นทุกเส้นตรงกับ template สร้าง cells จากเส้นโดยตรงแล้วแบ่งตัวอักษรเข้า cell ตามตำแหน่ง
+      (ผลเท่ากับ page.extract_tables() แต่ไม่ต้องไล่หา cell/ตัวอักษรแบบ O(n^2) ของ TableFinder)
+    - หน้าที่ไม่ตรง template กลับไปใช้ page.extract_tables()
+
+ใช้ internals ของ pdfplumber (merge_edges, TableSettings, LIGATURES) - หลังเปลี่ยนเวอร์ชัน pdfplumber
+หรือก่อนเปิด PDF_TABLE_TEMPLATE ให้ตรวจกับเอกสารจริงว่าผลเท่ากับ page.extract_tables() ทุกหน้า:
+
+Example:
+    python pdf_tables.py samples/ other.pdf     # exit code 1 ถ้ามีหน้าที่ผลต่างกัน
+    python pdf_tables.py --synthetic 20         # ใบเสนอราคาสังเคราะห์จาก synthetic_pdf.py
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from bisect import bisect_left, bisect_right
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+import pdfplumber
+from pdfplumber.table import TableSettings, merge_edges
+from pdfplumber.utils import extract_text, filter_edges
+from pdfplumber.utils.text import LIGATURES
+
+# ตารางข้อมูลของใบเสนอราคา (เกณฑ์เดียวกับ _process_structured_table)
+DATA_MIN_COLUMNS, DATA_MIN_ROWS = 17, 6
+
+# เส้นที่ห่างจากคอลัมน์ของ template ไม่เกินค่านี้ (pt) ถือว่าเป็นคอลัมน์เดียวกัน
+COLUMN_TOLERANCE = 1.0
+
+# ค่า default ของ page.extract_tables() (strategy "lines")
+DEFAULT_SETTINGS = TableSettings.resolve(None)
+
+Point = Tuple[float, float]
+BBox = Tuple[float, float, float, float]
+
+
+def table_edges(page) -> List[dict]:
+    """เส้นตารางของหน้า - ขั้นตอนเดียวกับ TableFinder.get_edges() (snap/join แล้วตัดเส้นสั้น)"""
+    s = DEFAULT_SETTINGS
+    edges = filter_edges(page.edges, "v") + filter_edges(page.edges, "h")
+    edges = merge_edges(edges, s.snap_x_tolerance, s.snap_y_tolerance, s.join_x_tolerance, s.join_y_tolerance)
+    return filter_edges(edges, min_length=s.edge_min_length)
+
+
+def _edge_bbox(edge: dict) -> BBox:
+    return (edge["x0"], edge["top"], edge["x1"], edge["bottom"])
+
+
+def _intersections(edges: List[dict]) -> Dict[Point, Tuple[Set[BBox], Set[BBox]]]:
+    """จุดตัด (x, top) -> (เส้นแนวตั้ง, เส้นแนวนอน) ที่ผ่านจุดนั้น - เงื่อนไขเดียวกับ edges_to_intersections"""
+    x_tol = DEFAULT_SETTINGS.intersection_x_tolerance
+    y_tol = DEFAULT_SETTINGS.intersection_y_tolerance
+    v_edges = sorted((e for e in edges if e["orientation"] == "v"), key=lambda e: (e["x0"], e["top"]))
+    v_xs = [e["x0"] for e in v_edges]
+
+    intersections = {}
+    for h in (e for e in edges if e["orientation"] == "h"):
+        h_bbox = _edge_bbox(h)
+        for v in v_edges[bisect_left(v_xs, h["x0"] - x_tol):bisect_right(v_xs, h["x1"] + x_tol)]:
+            if v["top"] <= h["top"] + y_tol and v["bottom"] >= h["top"] - y_tol:
+                v_set, h_set = intersections.setdefault((v["x0"], h["top"]), (set(), set()))
+                v_set.add(_edge_bbox(v))
+                h_set.add(h_bbox)
+    return intersections
+
+
+def _cells(intersections: Dict[Point, Tuple[Set[BBox], Set[BBox]]]) -> List[BBox]:
+    """cell ที่เล็กที่สุดของแต่ละจุดตัด - ลำดับการค้นเดียวกับ intersections_to_cells
+    แต่หาจุดด้านล่าง/ด้านขวาจาก index แทนการไล่ทุกจุด"""
+    ys_at_x: Dict[float, List[float]] = {}
+    xs_at_y: Dict[float, List[float]] = {}
+    for x, y in sorted(intersections):
+        ys_at_x.setdefault(x, []).append(y)
+        xs_at_y.setdefault(y, []).append(x)
+
+    def v_connects(p1: Point, p2: Point) -> bool:
+        return not intersections[p1][0].isdisjoint(intersections[p2][0])
+
+    def h_connects(p1: Point, p2: Point) -> bool:
+        return not intersections[p1][1].isdisjoint(intersections[p2][1])
+
+    cells = []
+    for (x, y) in sorted(intersections):
+        ys, xs = ys_at_x[x], xs_at_y[y]
+        below = ys[bisect_right(ys, y):]
+        right = xs[bisect_right(xs, x):]
+        cell = None
+        for below_y in below:
+            if not v_connects((x, y), (x, below_y)):
+                continue
+            for right_x in right:
+                if not h_connects((x, y), (right_x, y)):
+                    continue
+                corner = (right_x, below_y)
+                if corner in intersections and v_connects(corner, (right_x, y)) and h_connects(corner, (x, below_y)):
+                    cell = (x, y, right_x, below_y)
+                    break
+            if cell:
+                break
+        if cell:
+            cells.append(cell)
+    return cells
+
+
+def _cells_to_tables(cells: List[BBox]) -> List[List[BBox]]:
+    """จัดกลุ่ม cell ที่มีมุมร่วมกันเป็นตาราง (connected components แบบเดียวกับ cells_to_tables)"""
+    parent = list(range(len(cells)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    owner: Dict[Point, int] = {}
+    for i, (x0, top, x1, bottom) in enumerate(cells):
+        for corner in ((x0, top), (x0, bottom), (x1, top), (x1, bottom)):
+            if corner in owner:
+                parent[find(i)] = find(owner[corner])
+            else:
+                owner[corner] = i
+
+    groups: Dict[int, List[BBox]] = {}
+    for i, cell in enumerate(cells):
+        groups.setdefault(find(i), []).append(cell)
+    tables = sorted(groups.values(), key=lambda t: min((c[1], c[0]) for c in t))
+    return [t for t in tables if len(t) > 1]
+
+
+def _cell_text(chars: List[dict], cell: BBox) -> str:
+    """ข้อความใน cell แบบ utils.extract_text - ข้อความบรรทัดเดียว (กรณีปกติ) ต่อคำเองโดยไม่ต้องสร้าง WordExtractor"""
+    x_tol = DEFAULT_SETTINGS.text_settings["x_tolerance"]
+    y_tol = DEFAULT_SETTINGS.text_settings["y_tolerance"]
+    # บรรทัดเดียวแน่นอนเมื่อ top/doctop ต่างกันไม่ถึงครึ่งของ y_tolerance (กรณีอื่นให้ pdfplumber จัดบรรทัด)
+    tops = [c["top"] for c in chars]
+    doctops = [c["doctop"] for c in chars]
+    if (max(tops) - min(tops) > y_tol / 2 or max(doctops) - min(doctops) > y_tol / 2
+            or not all(c["upright"] and c["text"] for c in chars)):
+        return extract_text(chars, x_shift=cell[0], y_shift=cell[1], **DEFAULT_SETTINGS.text_settings)
+
+    words, current, prev = [], [], None
+    for c in sorted(chars, key=lambda c: c["x0"]):
+        text = c["text"]
+        if text.isspace():
+            if current:
+                words.append("".join(current))
+            current = []
+            continue
+        if current and c["x0"] > prev["x1"] + x_tol:
+            words.append("".join(current))
+            current = []
+        current.append(LIGATURES.get(text, text))
+        prev = c
+    if current:
+        words.append("".join(current))
+    return " ".join(words)
+
+
+def extract_tables_from_edges(page, edges: List[dict]) -> List[List[List[Optional[str]]]]:
+    """page.extract_tables() จากเส้นที่ผ่าน table_edges แล้ว (ใช้ page.chars อย่างเดียว)"""
+    tables = _cells_to_tables(_cells(_intersections(edges)))
+    if not tables:
+        return []
+
+    # ตัวอักษรนอกช่วงของตารางไม่มีทางอยู่ใน cell ใด - ตัดทิ้งก่อน แล้วเรียงตามจุดกึ่งกลางแนวตั้งไว้ค้นแบบ bisect
+    left = min(c[0] for t in tables for c in t)
+    right = max(c[2] for t in tables for c in t)
+    chars = []
+    for char in page.chars:
+        h_mid = (char["x0"] + char["x1"]) / 2
+        if left <= h_mid < right:
+            chars.append(((char["top"] + char["bottom"]) / 2, len(chars), h_mid, char))
+    chars.sort(key=lambda c: c[0])
+    v_mids = [c[0] for c in chars]
+
+    results = []
+    for table in tables:
+        xs = sorted({c[0] for c in table})
+        rows: Dict[float, Dict[float, BBox]] = {}
+        for cell in sorted(table, key=lambda c: (c[1], c[0])):
+            rows.setdefault(cell[1], {})[cell[0]] = cell
+
+        table_arr = []
+        for row_cells in rows.values():
+            cells = list(row_cells.values())
+            x0, top = min(c[0] for c in cells), min(c[1] for c in cells)
+            x1, bottom = max(c[2] for c in cells), max(c[3] for c in cells)
+            # ตัวอักษรของแถวตามลำดับเดิมใน page.chars
+            row_chars = sorted((c for c in chars[bisect_left(v_mids, top):bisect_left(v_mids, bottom)]
+                                if x0 <= c[2] < x1), key=lambda c: c[1])
+
+            arr = []
+            for x in xs:
+                cell = row_cells.get(x)
+                if cell is None:
+                    arr.append(None)
+                    continue
+                cell_chars = [c[3] for c in row_chars
+                              if cell[0] <= c[2] < cell[2] and cell[1] <= c[0] < cell[3]]
+                arr.append(_cell_text(cell_chars, cell) if cell_chars else "")
+            table_arr.append(arr)
+        results.append(table_arr)
+    return results
+
+
+class TableTemplate:
+    """ตำแหน่งคอลัมน์ของตารางข้อมูล เรียนรู้จากหน้าข้อมูลหน้าแรกที่ผ่าน extract_tables()
+    (ใช้ต่อหนึ่งเอกสาร - ความสูงของตารางต่างกันได้ทุกหน้า จึงเทียบเฉพาะแนวนอน)
+
+    Example:
+        template = TableTemplate()
+        for page in pdf.pages:
+            tables = template.extract_tables(page)  # เท่ากับ page.extract_tables()
+    """
+
+    def __init__(self):
+        self.columns: Optional[List[float]] = None
+
+    def extract_tables(self, page) -> List[List[List[Optional[str]]]]:
+        edges = table_edges(page)
+        if self.columns is not None and self.fits(edges):
+            return extract_tables_from_edges(page, edges)
+
+        tables = page.find_tables()
+        if self.columns is None:
+            self.learn(tables, edges)
+        return [table.extract(**DEFAULT_SETTINGS.text_settings) for table in tables]
+
+    def learn(self, tables, edges: List[dict]) -> bool:
+        """จำคอลัมน์จากตารางข้อมูลตารางแรกของหน้า (คืน False ถ้าหน้านี้ไม่มีตารางข้อมูล)"""
+        for table in tables:
+            rows = table.rows
+            if len(rows) >= DATA_MIN_ROWS and len(rows[0].cells) >= DATA_MIN_COLUMNS:
+                x0, x1 = table.bbox[0] - COLUMN_TOLERANCE, table.bbox[2] + COLUMN_TOLERANCE
+                self.columns = sorted({e["x0"] for e in edges if e["orientation"] == "v" and x0 <= e["x0"] <= x1})
+                return True
+        return False
+
+    def fits(self, edges: List[dict]) -> bool:
+        """เส้นแนวตั้งทุกเส้นและปลายเส้นแนวนอนทุกเส้นอยู่บนคอลัมน์ของ template"""
+        for e in edges:
+            if not self._on_column(e["x0"]):
+                return False
+            if e["orientation"] == "h" and not self._on_column(e["x1"]):
+                return False
+        return True
+
+    def _on_column(self, x: float) -> bool:
+        i = bisect_left(self.columns, x)
+        return any(abs(self.columns[j] - x) <= COLUMN_TOLERANCE for j in (i - 1, i) if 0 <= j < len(self.columns))
+
+
+# ================== Verification ==================
+
+def verify_table_template(pdf_paths: List[str]) -> Dict:
+    """เทียบ TableTemplate.extract_tables กับ page.extract_tables() ทุกหน้าของทุกเอกสาร
+    template_pages = หน้าที่ใช้เส้นของ template (ไม่ใช่ fallback) - ถ้าเป็น 0 การตรวจไม่ได้ทดสอบอะไร
+    """
+    from pdf_cache import release_page
+
+    documents = []
+    for pdf_path in pdf_paths:
+        doc = {"file": pdf_path, "pages": 0, "template_pages": 0, "differences": [],
+               "seconds": {"extract_tables": 0.0, "template": 0.0}}
+        try:
+            template = TableTemplate()
+            with pdfplumber.open(pdf_path) as pdf:
+                for page in pdf.pages:
+                    start = time.perf_counter()
+                    expected = page.extract_tables()
+                    doc["seconds"]["extract_tables"] += time.perf_counter() - start
+                    release_page(page)
+
+                    if template.columns is not None and template.fits(table_edges(page)):
+                        doc["template_pages"] += 1
+                    start = time.perf_counter()
+                    actual = template.extract_tables(page)
+                    doc["seconds"]["template"] += time.perf_counter() - start
+                    release_page(page)
+
+                    doc["pages"] += 1
+                    if actual != expected:
+                        doc["differences"].append({"page": page.page_number, "expected": expected, "actual": actual})
+        except Exception as e:
+            doc["error"] = str(e)
+        doc["seconds"] = {name: round(value, 4) for name, value in doc["seconds"].items()}
+        doc["equivalent"] = "error" not in doc and not doc["differences"]
+        documents.append(doc)
+
+    return {
+        "success": True,
+        "documents": documents,
+        "template_pages": sum(doc["template_pages"] for doc in documents),
+        "all_equivalent": all(doc["equivalent"] for doc in documents)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify TableTemplate against page.extract_tables()")
+    parser.add_argument("paths", nargs="*", help="PDF files or folders (searched recursively)")
+    parser.add_argument("--synthetic", type=int, default=0, metavar="N",
+                        help="Also verify N synthetic quotations (synthetic_pdf.py, varied rows/glass sets)")
+    args = parser.parse_args()
+    if not args.paths and not args.synthetic:
+        parser.error("ต้องระบุ PDF/โฟลเดอร์ หรือ --synthetic N")
+
+    pdf_paths = []
+    for path in args.paths:
+        p = Path(path)
+        if p.is_dir():
+            pdf_paths.extend(sorted(str(f) for f in p.rglob("*") if f.suffix.lower() == ".pdf"))
+        else:
+            pdf_paths.append(str(p))
+
+    with tempfile.TemporaryDirectory(prefix="pdf_tables_") as tmp_dir:
+        if args.synthetic:
+            from synthetic_pdf import MAX_ROWS, build_quotation_pdf
+            for seed in range(1, args.synthetic + 1):
+                path = str(Path(tmp_dir) / f"synthetic_{seed}.pdf")
+                build_quotation_pdf(path, pages=3 + seed % 5, rows=1 + (seed * 7) % MAX_ROWS,
+                                    glass_sets=1 + seed % 2, cover_pages=seed % 3, seed=seed)
+                pdf_paths.append(path)
+        result = verify_table_template(pdf_paths)
+
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    sys.exit(0 if result["all_equivalent"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+record_store.py - Columnar accumulator สำหรับ Price records
+เก็บข้อมูลแบบคอลัมน์แทน list ของ dict:
+    - Width/Height/Price/Glass_QTY เป็น typed array (double)
+    - Serie/Type เก็บเป็นรหัส (dictionary-encoded)
+    - คอลัมน์สีเก็บเป็น index ของ palette (1 byte ต่อเซลล์จนกว่าจะมีเกิน 255 สี)
+ID ไม่ได้เก็บไว้ แต่สร้างต่อเนื่อง 1..n ตอนเขียนไฟล์
+"""
+
+from array import array
+from typing import Dict, Iterator, List, Sequence
+
+import numpy as np
+
+from xlsx_writer import StreamingXlsxWriter
+
+DEFAULT_COLOR = "FFFFFF"
+_CHUNK_ROWS = 50_000
+
+
+class PriceRecordStore:
+    """เก็บ Price records แบบคอลัมน์ รองรับทั้งการเพิ่มทีละแถวและทีละ block (numpy arrays)"""
+
+    NUMERIC_COLUMNS = ("Width", "Height", "Price", "Glass_QTY")
+
+    def __init__(self, color_columns: Sequence[str] = ()):
+        self._serie_codes = array("I")
+        self._type_codes = array("I")
+        self._labels: List[str] = []
+        self._label_index: Dict[str, int] = {}
+        self._numbers = {name: array("d") for name in self.NUMERIC_COLUMNS}
+        # คอลัมน์ที่เคยได้รับค่า float จะเขียนออกเป็น float ทั้งคอลัมน์ (เหมือน dtype ของ pandas)
+        self._float_columns = set()
+        self._palette: List[str] = [DEFAULT_COLOR]
+        self._palette_index: Dict[str, int] = {DEFAULT_COLOR: 0}
+        self._color_typecode = "B"
+        self._colors: Dict[str, array] = {}
+        self.add_color_columns(color_columns)
+
+    def __len__(self) -> int:
+        return len(self._serie_codes)
+
+    @property
+    def color_columns(self) -> List[str]:
+        return list(self._colors)
+
+    @property
+    def columns(self) -> List[str]:
+        return ["ID", "Serie", "Type", *self.NUMERIC_COLUMNS, *self._colors]
+
+    # -------------------- encoding helpers --------------------
+    def _label_code(self, text: str) -> int:
+        code = self._label_index.get(text)
+        if code is None:
+            code = self._label_index[text] = len(self._labels)
+            self._labels.append(text)
+        return code
+
+    def _color_code(self, color: str) -> int:
+        code = self._palette_index.get(color)
+        if code is None:
+            code = self._palette_index[color] = len(self._palette)
+            self._palette.append(color)
+            if code > 255 and self._color_typecode == "B":
+                # palette เกิน 1 byte - ขยายทุกคอลัมน์สีเป็น 2 bytes
+                self._color_typecode = "H"
+                self._colors = {name: array("H", codes) for name, codes in self._colors.items()}
+        return code
+
+    def add_color_columns(self, names: Sequence[str]):
+        """ประกาศคอลัมน์สี (แถวที่มีอยู่แล้วจะได้ FFFFFF)"""
+        for name in names:
+            if name not in self._colors:
+                codes = array(self._color_typecode)
+                codes.frombytes(bytes(len(self) * codes.itemsize))
+                self._colors[name] = codes
+
+    # -------------------- append --------------------
+    def append(self, serie: str, type_name: str, width, height, price, glass_qty,
+               colors: Dict[str, str] = None):
+        """เพิ่ม 1 แถว - คอลัมน์สีที่ไม่ได้ระบุจะเป็น FFFFFF"""
+        colors = colors or {}
+        self.add_color_columns(colors)
+        self._serie_codes.append(self._label_code(serie))
+        self._type_codes.append(self._label_code(type_name))
+        for name, value in zip(self.NUMERIC_COLUMNS, (width, height, price, glass_qty)):
+            if isinstance(value, (float, np.floating)):
+                self._float_columns.add(name)
+            self._numbers[name].append(value)
+        row_codes = [(name, self._color_code(colors.get(name, DEFAULT_COLOR))) for name in list(self._colors)]
+        for name, code in row_codes:
+            self._colors[name].append(code)
+
+    def extend(self, serie: str, type_name: str, widths, heights, prices, glass_qty,
+               colors: Dict[str, np.ndarray] = None):
+        """เพิ่มหลายแถวจาก numpy arrays ที่ยาวเท่ากัน (glass_qty เป็นค่าเดียวทั้ง block)"""
+        n = len(prices)
+        if not n:
+            return
+        colors = colors or {}
+        self.add_color_columns(colors)
+        self._serie_codes.frombytes(np.full(n, self._label_code(serie), dtype=np.uint32).tobytes())
+        self._type_codes.frombytes(np.full(n, self._label_code(type_name), dtype=np.uint32).tobytes())
+        for name, values in zip(self.NUMERIC_COLUMNS, (widths, heights, prices, np.full(n, glass_qty))):
+            values = np.asarray(values)
+            if values.dtype.kind == "f":
+                self._float_columns.add(name)
+            self._numbers[name].frombytes(np.ascontiguousarray(values, dtype=np.float64).tobytes())
+        for name in list(self._colors):
+            if name in colors:
+                # แปลงเป็น palette code ครั้งเดียวต่อสีที่ไม่ซ้ำ
+                uniques, inverse = np.unique(np.asarray(colors[name], dtype=str), return_inverse=True)
+                lookup = np.array([self._color_code(color) for color in uniques.tolist()])
+                block = lookup[inverse]
+            else:
+                block = np.zeros(n)
+            self._colors[name].frombytes(block.astype(self._colors[name].typecode).tobytes())
+
+    def extend_store(self, other: "PriceRecordStore"):
+        """ต่อท้ายด้วยทุกแถวของ store อื่น (เช่นผลจาก worker process) - ID ยังต่อเนื่องตามลำดับ"""
+        n = len(other)
+        if not n:
+            return
+        self.add_color_columns(other.color_columns)
+        label_map = np.array([self._label_code(label) for label in other._labels], dtype=np.uint32)
+        for codes, other_codes in ((self._serie_codes, other._serie_codes), (self._type_codes, other._type_codes)):
+            block = label_map[np.frombuffer(other_codes, dtype=np.dtype(other_codes.typecode))]
+            codes.frombytes(block.astype(codes.typecode).tobytes())
+        for name in self.NUMERIC_COLUMNS:
+            self._numbers[name].extend(other._numbers[name])
+        self._float_columns |= other._float_columns
+        # แปลง palette code ของอีก store เป็น code ของ store นี้ (อาจขยายคอลัมน์สีเป็น 2 bytes)
+        palette_map = np.array([self._color_code(color) for color in other._palette])
+        for name in list(self._colors):
+            if name in other._colors:
+                other_codes = other._colors[name]
+                block = palette_map[np.frombuffer(other_codes, dtype=np.dtype(other_codes.typecode))]
+            else:
+                block = np.zeros(n)
+            self._colors[name].frombytes(block.astype(self._colors[name].typecode).tobytes())
+
+    # -------------------- read back --------------------
+    def _numeric_array(self, name: str) -> np.ndarray:
+        values = np.frombuffer(self._numbers[name], dtype=np.float64) if len(self) else np.empty(0)
+        if name in self._float_columns:
+            return values
+        return values.astype(np.int64)
+
+    def iter_rows(self) -> Iterator[tuple]:
+        """วนแถวทีละ chunk ตามลำดับ columns (ID เริ่มที่ 1)"""
+        labels = np.array(self._labels, dtype=object)
+        palette = np.array(self._palette, dtype=object)
+        numbers = [self._numeric_array(name) for name in self.NUMERIC_COLUMNS]
+        serie_codes = np.frombuffer(self._serie_codes, dtype=np.uint32)
+        type_codes = np.frombuffer(self._type_codes, dtype=np.uint32)
+        colors = [np.frombuffer(codes, dtype=codes.typecode) for codes in self._colors.values()]
+
+        for start in range(0, len(self), _CHUNK_ROWS):
+            stop = min(start + _CHUNK_ROWS, len(self))
+            yield from zip(
+                range(start + 1, stop + 1),
+                labels[serie_codes[start:stop]].tolist(),
+                labels[type_codes[start:stop]].tolist(),
+                *(values[start:stop].tolist() for values in numbers),
+                *(palette[codes[start:stop]].tolist() for codes in colors),
+            )
+
+    def to_dataframe(self):
+        """แปลงเป็น DataFrame (Serie/Type/สี เป็น categorical เพื่อประหยัดหน่วยความจำ)"""
+        import pandas as pd
+
+        data = {"ID": np.arange(1, len(self) + 1)}
+        for name, codes in (("Serie", self._serie_codes), ("Type", self._type_codes)):
+            data[name] = pd.Categorical.from_codes(np.frombuffer(codes, dtype=np.uint32).astype(np.int64),
+                                                   categories=self._labels)
+        for name in self.NUMERIC_COLUMNS:
+            data[name] = self._numeric_array(name)
+        for name, codes in self._colors.items():
+            data[name] = pd.Categorical.from_codes(np.frombuffer(codes, dtype=codes.typecode).astype(np.int64),
+                                                   categories=self._palette)
+        return pd.DataFrame(data, columns=self.columns)
+
+    def to_arrow(self):
+        """แปลงเป็น pyarrow Table จากคอลัมน์ที่เก็บไว้โดยตรง (Serie/Type/สี เป็น DictionaryArray, ไม่ผ่าน pandas)"""
+        import pyarrow as pa
+
+        labels = pa.array(self._labels, type=pa.string())
+        palette = pa.array(self._palette, type=pa.string())
+        arrays = [pa.array(np.arange(1, len(self) + 1))]
+        for codes in (self._serie_codes, self._type_codes):
+            arrays.append(pa.DictionaryArray.from_arrays(np.frombuffer(codes, dtype=np.uint32), labels))
+        arrays.extend(pa.array(self._numeric_array(name)) for name in self.NUMERIC_COLUMNS)
+        for codes in self._colors.values():
+            arrays.append(pa.DictionaryArray.from_arrays(np.frombuffer(codes, dtype=codes.typecode), palette))
+        return pa.table(arrays, names=self.columns)
+
+    def write_xlsx(self, path_or_file) -> int:
+        """เขียนเป็น XLSX แบบ streaming ด้วย StreamingXlsxWriter"""
+        with StreamingXlsxWriter(path_or_file, self.columns) as writer:
+            return writer.write_rows(self.iter_rows())
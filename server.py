@@ -1,9 +1,8 @@
-from flask import Flask, request, jsonify, send_file, render_template_string
+from flask import Flask, Response, request, jsonify, send_file, render_template_string
 import os
 import subprocess
 import time
 import uuid
-import shutil
 import logging
 import json
 from datetime import datetime
@@ -11,6 +10,8 @@ from werkzeug.utils import secure_filename
 import sys
 from pathlib import Path
 
+from output_formats import DEFAULT_FORMAT, OUTPUT_FORMATS, output_filename, validate_format
+
 # -------------------- Config & Globals --------------------
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -19,12 +20,28 @@ app = Flask(__name__)
 
 UPLOAD_FOLDER = 'uploads'
 OUTPUT_FOLDER = 'outputs'
+CACHE_FOLDER = 'cache'                   # cache ผลดึงข้อมูลรายชีต (ไม่ถูกลบโดย cleanup_old_files)
+# cache ผลดึงข้อมูล PDF รายหน้า - ใช้ร่วมกันระหว่าง text-glass (main3.py) และ compare (main4.py)
+PDF_CACHE_DIR = os.path.abspath(os.path.join(CACHE_FOLDER, 'pdf'))
 MAX_FILE_SIZE = 25 * 1024 * 1024  # 25MB
 ALLOWED_EXTENSIONS = {'xlsx', 'pdf'}
 
 BASE_DIR = Path(__file__).resolve().parent
 PYTHON = sys.executable                  # ใช้ python ของ .venv แน่นอน
 
+# engines (main.py/main2.py/main3.py) ทำงานใน process ของ server - matrix mode ใช้ 1 process เป็นค่าเริ่มต้น
+# เพราะการ fork จาก server ที่มีหลาย thread ไม่ปลอดภัย (ตั้ง MATRIX_WORKERS เพื่อใช้ process pool)
+MATRIX_WORKERS = int(os.environ.get('MATRIX_WORKERS', '1'))
+# joint mode ที่มีหลายชีตตาราง - เหตุผลเดียวกัน (ตั้ง JOINT_WORKERS เพื่อใช้ process pool)
+JOINT_WORKERS = int(os.environ.get('JOINT_WORKERS', '1'))
+# PDF mode แบ่งหน้าให้ process pool - เหตุผลเดียวกัน (ตั้ง PDF_WORKERS เพื่อใช้ process pool)
+PDF_WORKERS = int(os.environ.get('PDF_WORKERS', '1'))
+# PDF mode/compare ใช้ตำแหน่งคอลัมน์จากหน้าข้อมูลหน้าแรกกับหน้าถัดไป (pdf_tables.TableTemplate)
+# ปิดเป็นค่าเริ่มต้น - ตั้ง 1 หลังตรวจเอกสารจริงด้วย `python pdf_tables.py <โฟลเดอร์ PDF>` ว่าผลเท่ากับ extract_tables
+PDF_TABLE_TEMPLATE = os.environ.get('PDF_TABLE_TEMPLATE', '0') == '1'
+# compare mode: JSON {template: text backend} จาก `main4.py --mode verify_text_backends --write-backend-map`
+PDF_TEXT_BACKEND_MAP = os.environ.get('PDF_TEXT_BACKEND_MAP', '')
+
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(OUTPUT_FOLDER, exist_ok=True)
 
@@ -121,8 +138,9 @@ def process_comparison_with_main_py(source_type: str, source_data: str, source_p
                     '--mode', 'text_vs_pdf',
                     '--text', source_data,
                     '--target-pdf', target_pdf_path,
-                    '--target-start-page', str(start_page)
-                ]
+                    '--target-start-page', str(start_page),
+                    '--cache-dir', PDF_CACHE_DIR
+                ] + (['--text-backend-map', PDF_TEXT_BACKEND_MAP] if PDF_TEXT_BACKEND_MAP else [])
             else:
                 # ลองใช้ main.py แบบใหม่
                 logger.info(f"Processing text vs PDF comparison with main.py (new format)")
@@ -144,8 +162,10 @@ def process_comparison_with_main_py(source_type: str, source_data: str, source_p
                     '--source-pdf', source_pdf_path,
                     '--target-pdf', target_pdf_path,
                     '--source-start-page', '3',  # Default for structured PDF
-                    '--target-start-page', str(start_page)
-                ]
+                    '--target-start-page', str(start_page),
+                    '--cache-dir', PDF_CACHE_DIR
+                ] + (['--table-template'] if PDF_TABLE_TEMPLATE else []) \
+                  + (['--text-backend-map', PDF_TEXT_BACKEND_MAP] if PDF_TEXT_BACKEND_MAP else [])
             else:
                 # ลองใช้ main.py แบบใหม่
                 logger.info(f"Processing PDF vs PDF comparison with main.py (new format)")
@@ -204,81 +224,45 @@ def process_comparison_with_main_py(source_type: str, source_data: str, source_p
         logger.exception("Unexpected error in comparison processing")
         return None, f'เกิดข้อผิดพลาดที่ไม่คาดคิด: {str(e)}'
 
+# -------------------- In-memory engines --------------------
+def write_artifact(filename: str, data: bytes) -> str:
+    """เขียนไฟล์ผลลัพธ์สุดท้ายลง OUTPUT_FOLDER (ไฟล์เดียวที่แตะดิสก์ของแต่ละงาน)"""
+    os.makedirs(OUTPUT_FOLDER, exist_ok=True)
+    path = os.path.join(OUTPUT_FOLDER, filename)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return path
+
 # -------------------- Matrix Mode --------------------
-def process_matrix_file_with_main_py(input_path: str, job_id: str, original_filename: str | None):
+def process_matrix_upload(file_content: bytes, job_id: str, original_filename: str | None,
+                          output_format: str = DEFAULT_FORMAT):
+    """ประมวลผล matrix workbook จาก bytes ที่อัปโหลดใน process นี้ (ไม่มีไฟล์ชั่วคราว)"""
     try:
-        start_time = time.time()
-
-        # ลองใช้ main.py แบบใหม่ก่อน (ถ้ารองรับ --mode)
-        cmd_new = [
-            PYTHON, str(BASE_DIR / 'main.py'),
-            '--mode', 'matrix',
-            '--input', input_path,
-            '--job-id', job_id,
-            '--output-dir', OUTPUT_FOLDER
-        ]
-        if original_filename:
-            cmd_new += ['--original-filename', original_filename]
-
-        # ลองใช้ main.py แบบเดิม (legacy format)
-        cmd_legacy = [
-            PYTHON, str(BASE_DIR / 'main.py'),
-            '--input', input_path,
-            '--job-id', job_id,
-            '--output-dir', OUTPUT_FOLDER
-        ]
-        if original_filename:
-            cmd_legacy += ['--original-filename', original_filename]
-
-        # ลองใช้ command แบบใหม่ก่อน
-        result = run_subprocess(cmd_new)
-        
-        # ถ้าใช้ไม่ได้ (return code 2 = argument error) ลองใช้แบบเดิม
-        if result.returncode == 2 and '--mode' in ' '.join(cmd_new):
-            logger.info("New format failed, trying legacy format...")
-            result = run_subprocess(cmd_legacy)
+        from main import ColorExtractor
 
+        start_time = time.time()
+        extractor = ColorExtractor(job_id)
+        json_output, artifacts = extractor.process_buffer(
+            file_content,
+            original_filename=original_filename,
+            workers=MATRIX_WORKERS,
+            output_format=output_format,
+            cache_dir=os.path.join(CACHE_FOLDER, 'matrix')
+        )
+        write_artifact(output_filename('Price', job_id, output_format), artifacts['price'])
+        write_artifact(output_filename('Type', job_id, output_format), artifacts['type'])
         processing_time = time.time() - start_time
 
-        # Clean input
-        try:
-            os.remove(input_path)
-        except Exception:
-            pass
-
-        if result.returncode != 0:
-            logger.error("Processing failed with main.py: %s", result.stderr)
-            return None, f'เกิดข้อผิดพลาดในการประมวลผล: {result.stderr}'
-
-        # หา JSON จาก stdout
-        output_lines = result.stdout.strip().split('\n')
-        json_output = None
-        for line in reversed(output_lines):
-            line = line.strip()
-            if line.startswith('{') and line.endswith('}'):
-                try:
-                    json_output = json.loads(line)
-                    break
-                except json.JSONDecodeError:
-                    pass
-
-        if not json_output:
-            return None, 'ไม่พบผลลัพธ์จาก main.py'
-
-        price_file = os.path.join(OUTPUT_FOLDER, f'Price_{job_id}.xlsx')
-        type_file = os.path.join(OUTPUT_FOLDER, f'Type_{job_id}.xlsx')
-
-        if not os.path.exists(price_file):
-            return None, 'ไม่พบไฟล์ Price ที่สร้างขึ้น'
-        if not os.path.exists(type_file):
-            return None, 'ไม่พบไฟล์ Type ที่สร้างขึ้น'
-
         return {
             'job_id': job_id,
             'total_records': json_output.get('total_records', 0),
-            'price_records': json_output.get('total_records', 0),
-            'type_records': json_output.get('processed_sheets', 0),
+            'price_records': json_output.get('price_records', 0),
+            'type_records': json_output.get('type_records', 0),
             'processed_sheets': json_output.get('processed_sheets', 0),
+            'cached_sheets': json_output.get('cached_sheets', 0),
+            'output_format': output_format,
             'processing_time': processing_time,
             'message': 'ประมวลผลสำเร็จ',
             'skipped_sheets': json_output.get('skipped_sheets', []),
@@ -286,147 +270,80 @@ def process_matrix_file_with_main_py(input_path: str, job_id: str, original_file
         }, None
 
     except Exception as e:
-        logger.exception("Unexpected error with main.py")
-        return None, f'เกิดข้อผิดพลาดที่ไม่คาดคิด: {str(e)}'
+        logger.exception("Unexpected error in matrix processing")
+        return None, f'เกิดข้อผิดพลาดในการประมวลผล: {str(e)}'
 
-# -------------------- Joint Mode --------------------
-def process_joint_file_with_main_py(input_path: str, job_id: str):
+def preview_matrix_upload(file_content: bytes, job_id: str):
+    """Dry-run: ตรวจการ detect matrix ทุกชีต โดยไม่อ่านสีและไม่สร้างไฟล์ผลลัพธ์"""
     try:
-        start_time = time.time()
+        from main import ColorExtractor
 
-        cmd = [
-            PYTHON, str(BASE_DIR / 'main.py'),
-            '--mode', 'joint',
-            '--input', input_path,
-            '--job-id', job_id,
-            '--output-dir', OUTPUT_FOLDER
-        ]
-        
-        result = run_subprocess(cmd)
+        start_time = time.time()
+        json_output = ColorExtractor(job_id).preview_file(file_content)
         processing_time = time.time() - start_time
 
-        try:
-            os.remove(input_path)
-        except Exception:
-            pass
+        json_output['job_id'] = job_id
+        json_output['processing_time'] = processing_time
+        json_output['message'] = f"ตรวจพบ matrix {json_output.get('detected_sheets', 0)}/{json_output.get('total_sheets', 0)} ชีต"
+        return json_output, None
 
-        if result.returncode != 0:
-            logger.error("Processing failed with main.py: %s", result.stderr)
-            return None, f'เกิดข้อผิดพลาดในการประมวลผล: {result.stderr}'
+    except Exception as e:
+        logger.exception("Unexpected error in matrix preview")
+        return None, f'เกิดข้อผิดพลาดในการตรวจสอบ: {str(e)}'
 
-        # Parse JSON output
-        output_lines = result.stdout.strip().split('\n')
-        json_output = None
-        
-        # Try to find JSON output
-        for line in reversed(output_lines):
-            line = line.strip()
-            if line.startswith('{') and line.endswith('}'):
-                try:
-                    json_output = json.loads(line)
-                    break
-                except json.JSONDecodeError:
-                    pass
-
-        if json_output:
-            # New JSON format
-            return {
-                'job_id': job_id,
-                'total_records': json_output.get('price_records', 0) + json_output.get('type_records', 0),
-                'price_records': json_output.get('price_records', 0),
-                'type_records': json_output.get('type_records', 0),
-                'processed_sheets': 1,
-                'processing_time': processing_time,
-                'message': 'ประมวลผลสำเร็จ'
-            }, None
-        else:
-            # Legacy format for backward compatibility
-            price_file = None
-            type_file = None
-            price_count = 0
-            type_count = 0
-
-            for line in output_lines:
-                if line.startswith('MOVED_PRICE:'):
-                    price_file = line.split(':', 1)[1]
-                elif line.startswith('MOVED_TYPE:'):
-                    type_file = line.split(':', 1)[1]
-                elif line.startswith('PRICE_COUNT:'):
-                    price_count = int(line.split(':', 1)[1])
-                elif line.startswith('TYPE_COUNT:'):
-                    type_count = int(line.split(':', 1)[1])
-
-            if price_file and os.path.exists(price_file):
-                shutil.move(price_file, os.path.join(OUTPUT_FOLDER, f'Price_{job_id}.xlsx'))
-            if type_file and os.path.exists(type_file):
-                shutil.move(type_file, os.path.join(OUTPUT_FOLDER, f'Type_{job_id}.xlsx'))
-
-            return {
-                'job_id': job_id,
-                'total_records': price_count + type_count,
-                'price_records': price_count,
-                'type_records': type_count,
-                'processed_sheets': 1,
-                'processing_time': processing_time,
-                'message': 'ประมวลผลสำเร็จ'
-            }, None
+# -------------------- Joint Mode --------------------
+def process_joint_upload(file_content: bytes, job_id: str, original_filename: str | None,
+                         output_format: str = DEFAULT_FORMAT):
+    """ประมวลผล joint workbook (ExcelProcessor ของ main2.py) จาก bytes ที่อัปโหลด"""
+    try:
+        from main2 import ExcelProcessor
+
+        start_time = time.time()
+        processor = ExcelProcessor(file_content, original_filename)
+        if not processor.process(job_id, output_format, in_memory=True, workers=JOINT_WORKERS):
+            return None, 'เกิดข้อผิดพลาดในการประมวลผล'
+        for prefix, key in (('Price', 'price'), ('Type', 'type')):
+            if key in processor.artifacts:
+                write_artifact(output_filename(prefix, job_id, output_format), processor.artifacts[key])
+        processing_time = time.time() - start_time
+
+        price_count = len(processor.price_records)
+        type_count = len(processor.type_records)
+        return {
+            'job_id': job_id,
+            'total_records': price_count + type_count,
+            'price_records': price_count,
+            'type_records': type_count,
+            'processed_sheets': len(processor.table_sheets),
+            'output_format': output_format,
+            'processing_time': processing_time,
+            'message': 'ประมวลผลสำเร็จ'
+        }, None
 
     except Exception as e:
-        logger.exception("Unexpected error with main.py")
+        logger.exception("Unexpected error in joint processing")
         return None, f'เกิดข้อผิดพลาดที่ไม่คาดคิด: {str(e)}'
 
 # -------------------- PDF Format Mode --------------------
-def process_pdf_file_with_main_py(input_path: str, start_page: int, job_id: str):
+def process_pdf_upload(file_content: bytes, start_page: int | None, job_id: str):
+    """ดึง Reference Code / GLASS จาก PDF (PDFExtractorWeb ของ main3.py) จาก bytes ที่อัปโหลด"""
     try:
-        start_time = time.time()
-
-        # ใช้ main3.py ถ้ามี (ไม่เปลี่ยนแปลง)
-        main3_py_path = BASE_DIR / 'main3.py'
-        if os.path.exists(main3_py_path):
-            logger.info(f"Processing PDF file with main3.py")
-            cmd = [PYTHON, str(main3_py_path), input_path, str(start_page), job_id]
-        else:
-            # ใช้ main.py แบบใหม่
-            logger.info(f"Processing PDF file with main.py (new format)")
-            cmd = [
-                PYTHON, str(BASE_DIR / 'main.py'),
-                '--mode', 'text-glass',
-                '--input', input_path,
-                '--start-page', str(start_page),
-                '--job-id', job_id,
-                '--output-dir', OUTPUT_FOLDER
-            ]
-        
-        result = run_subprocess(cmd)
-        processing_time = time.time() - start_time
-
-        try:
-            os.remove(input_path)
-        except Exception:
-            pass
+        from main3 import PDFExtractorWeb, pdf_result_filename, render_artifacts
+        from pdf_cache import peak_memory_mb
 
-        if result.returncode != 0:
-            logger.error("Processing failed: %s", result.stderr)
-            return None, f'เกิดข้อผิดพลาดในการประมวลผล: {result.stderr}'
-
-        output_lines = result.stdout.strip().split('\n')
-        json_output = None
-        for line in reversed(output_lines):
-            line = line.strip()
-            if line.startswith('{') and line.endswith('}'):
-                try:
-                    json_output = json.loads(line)
-                    break
-                except json.JSONDecodeError:
-                    pass
-
-        if not json_output:
-            return None, 'ไม่พบผลลัพธ์จากการประมวลผล'
+        start_time = time.time()
+        json_output = PDFExtractorWeb(PDF_CACHE_DIR, PDF_TABLE_TEMPLATE).extract_data_from_file(
+            file_content, start_page, PDF_WORKERS)
         if 'error' in json_output:
             return None, json_output['error']
+        for ext, content in render_artifacts(json_output).items():
+            write_artifact(pdf_result_filename(ext, job_id), content)
+        processing_time = time.time() - start_time
+        logger.info(f"PDF extraction peak memory: {peak_memory_mb()} MB")
 
         return {
             'success': True,
+            'job_id': job_id,
             'data': json_output,
             'processing_time': processing_time,
             'message': f"ประมวลผลสำเร็จ: พบ {json_output.get('total_references', 0)} Reference Code และ {json_output.get('total_glass', 0)} GLASS"
@@ -436,6 +353,27 @@ def process_pdf_file_with_main_py(input_path: str, start_page: int, job_id: str)
         logger.exception("Unexpected error in PDF processing")
         return None, f'เกิดข้อผิดพลาดที่ไม่คาดคิด: {str(e)}'
 
+def stream_pdf_upload(file_content: bytes, start_page: int | None, job_id: str) -> Response:
+    """ส่งผลรายหน้าเป็น NDJSON ทันทีที่แต่ละหน้าเสร็จ (stream_results ของ main3.py)
+    TXT/JSON ของ job_id ถูกเขียนไปพร้อมกัน (ไฟล์จริงปรากฏเมื่อสำเร็จ) - record สุดท้ายเป็น 'done' หรือ 'error'"""
+    from main3 import stream_results
+
+    def generate():
+        start_time = time.time()
+        for record in stream_results(file_content, start_page, PDF_WORKERS, OUTPUT_FOLDER, PDF_CACHE_DIR,
+                                     PDF_TABLE_TEMPLATE, job_id):
+            if record['type'] == 'done':
+                record['job_id'] = job_id
+                record['processing_time'] = time.time() - start_time
+                record['message'] = (f"ประมวลผลสำเร็จ: พบ {record['total_references']} Reference Code "
+                                     f"และ {record['total_glass']} GLASS")
+                logger.info(f"PDF streaming completed for job_id: {job_id}")
+            elif record['type'] == 'error':
+                logger.error(f"PDF streaming failed for job_id: {job_id}: {record['error']}")
+            yield json.dumps(record, ensure_ascii=False) + '\n'
+
+    return Response(generate(), mimetype='application/x-ndjson')
+
 # -------------------- Routes --------------------
 @app.route('/')
 @app.route('/matrix')
@@ -574,22 +512,20 @@ def process_matrix_file():
         file_content = file.read()
         if len(file_content) > MAX_FILE_SIZE:
             return jsonify({'message': 'ไฟล์ใหญ่เกินไป (สูงสุด 25MB)'}), 400
-        file.seek(0)
+
+        try:
+            output_format = validate_format(request.form.get('output_format', DEFAULT_FORMAT))
+        except (ValueError, RuntimeError) as e:
+            return jsonify({'message': str(e)}), 400
 
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         random_suffix = str(uuid.uuid4())[:8]
         job_id = f"{timestamp}_{random_suffix}"
 
         filename = secure_filename(file.filename)
-        input_path = os.path.join(UPLOAD_FOLDER, f'{job_id}_{filename}')
-        file.save(input_path)
-
         logger.info(f"Processing Matrix file: {filename} with job_id: {job_id}")
 
-        if not os.path.exists(BASE_DIR / 'main.py'):
-            return jsonify({'message': 'ไม่พบไฟล์ main.py สำหรับ Matrix mode'}), 500
-
-        result, error = process_matrix_file_with_main_py(input_path, job_id, file.filename)
+        result, error = process_matrix_upload(file_content, job_id, file.filename, output_format)
         if error:
             return jsonify({'message': error}), 500
 
@@ -600,6 +536,38 @@ def process_matrix_file():
         logger.exception("Unexpected error in matrix processing")
         return jsonify({'message': f'เกิดข้อผิดพลาดที่ไม่คาดคิด: {str(e)}'}), 500
 
+@app.route('/api/preview-matrix', methods=['POST'])
+def preview_matrix_file():
+    """ตรวจสอบการ detect ของแต่ละชีตก่อน export จริง (ไม่อ่านสี ไม่เขียนไฟล์)"""
+    try:
+        if 'file' not in request.files:
+            return jsonify({'message': 'ไม่พบไฟล์'}), 400
+        file = request.files['file']
+        if file.filename == '':
+            return jsonify({'message': 'ไม่ได้เลือกไฟล์'}), 400
+        if not file.filename.lower().endswith('.xlsx'):
+            return jsonify({'message': 'ประเภทไฟล์ไม่ถูกต้อง กรุณาอัพโหลดไฟล์ .xlsx'}), 400
+
+        file_content = file.read()
+        if len(file_content) > MAX_FILE_SIZE:
+            return jsonify({'message': 'ไฟล์ใหญ่เกินไป (สูงสุด 25MB)'}), 400
+
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        random_suffix = str(uuid.uuid4())[:8]
+        job_id = f"{timestamp}_{random_suffix}"
+
+        filename = secure_filename(file.filename)
+        logger.info(f"Previewing Matrix file: {filename} with job_id: {job_id}")
+
+        result, error = preview_matrix_upload(file_content, job_id)
+        if error:
+            return jsonify({'message': error}), 500
+        return jsonify(result)
+
+    except Exception as e:
+        logger.exception("Unexpected error in matrix preview")
+        return jsonify({'message': f'เกิดข้อผิดพลาดที่ไม่คาดคิด: {str(e)}'}), 500
+
 @app.route('/api/process-joint', methods=['POST'])
 def process_joint_file():
     try:
@@ -614,22 +582,20 @@ def process_joint_file():
         file_content = file.read()
         if len(file_content) > MAX_FILE_SIZE:
             return jsonify({'message': 'ไฟล์ใหญ่เกินไป (สูงสุด 25MB)'}), 400
-        file.seek(0)
+
+        try:
+            output_format = validate_format(request.form.get('output_format', DEFAULT_FORMAT))
+        except (ValueError, RuntimeError) as e:
+            return jsonify({'message': str(e)}), 400
 
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         random_suffix = str(uuid.uuid4())[:8]
         job_id = f"{timestamp}_{random_suffix}"
 
         filename = secure_filename(file.filename)
-        input_path = os.path.join(UPLOAD_FOLDER, f'{job_id}_{filename}')
-        file.save(input_path)
-
         logger.info(f"Processing Joint file: {filename} with job_id: {job_id}")
 
-        if not os.path.exists(BASE_DIR / 'main.py'):
-            return jsonify({'message': 'ไม่พบไฟล์ main.py สำหรับ Joint mode'}), 500
-
-        result, error = process_joint_file_with_main_py(input_path, job_id)
+        result, error = process_joint_upload(file_content, job_id, file.filename, output_format)
         if error:
             return jsonify({'message': error}), 500
 
@@ -654,24 +620,23 @@ def upload_pdf():
         file_content = file.read()
         if len(file_content) > MAX_FILE_SIZE:
             return jsonify({'error': 'ไฟล์ใหญ่เกินไป (สูงสุด 25MB)'}), 400
-        file.seek(0)
 
-        start_page = int(request.form.get('start_page', 3))
+        # ไม่ระบุ start_page (หรือ 'auto') = ตรวจหาหน้าที่มีตารางรายการเอง
+        start_page = request.form.get('start_page', '').strip()
+        start_page = int(start_page) if start_page and start_page.lower() != 'auto' else None
 
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         random_suffix = str(uuid.uuid4())[:8]
         job_id = f"{timestamp}_{random_suffix}"
 
         filename = secure_filename(file.filename)
-        input_path = os.path.join(UPLOAD_FOLDER, f'{job_id}_{filename}')
-        file.save(input_path)
-
         logger.info(f"Processing PDF file: {filename} with job_id: {job_id}, start_page: {start_page}")
 
-        if not os.path.exists(BASE_DIR / 'main.py'):
-            return jsonify({'error': 'ไม่พบไฟล์ main.py สำหรับ Format mode'}), 500
+        # stream=1: ผลทีละหน้าแบบ NDJSON (application/x-ndjson) แทน JSON ก้อนเดียวตอนจบ
+        if request.values.get('stream', '').lower() in ('1', 'true', 'yes'):
+            return stream_pdf_upload(file_content, start_page, job_id)
 
-        result, error = process_pdf_file_with_main_py(input_path, start_page, job_id)
+        result, error = process_pdf_upload(file_content, start_page, job_id)
         if error:
             return jsonify({'error': error}), 500
 
@@ -684,19 +649,19 @@ def upload_pdf():
 
 @app.route('/download/<format>')
 def download_pdf_results(format: str):
+    """ไฟล์ผลลัพธ์ PDF ของงาน: /download/txt?job_id=<job_id> (ไม่ระบุ job_id = pdf_results.* ที่ main3.py CLI เขียน)"""
     try:
-        if format == 'txt':
-            txt_file = os.path.join(OUTPUT_FOLDER, 'pdf_results.txt')
-            if not os.path.exists(txt_file):
-                return jsonify({'error': 'ไม่พบไฟล์ผลลัพธ์'}), 404
-            return send_file(txt_file, as_attachment=True, download_name='pdf_extraction_results.txt')
-        elif format == 'json':
-            json_file = os.path.join(OUTPUT_FOLDER, 'pdf_results.json')
-            if not os.path.exists(json_file):
-                return jsonify({'error': 'ไม่พบไฟล์ผลลัพธ์'}), 404
-            return send_file(json_file, as_attachment=True, download_name='pdf_extraction_results.json')
-        else:
+        from main3 import pdf_result_filename
+
+        if format not in ('txt', 'json'):
             return jsonify({'error': 'รูปแบบไฟล์ไม่ถูกต้อง'}), 400
+        job_id = request.args.get('job_id')
+        if job_id is not None and secure_filename(job_id) != job_id:
+            return jsonify({'error': 'job_id ไม่ถูกต้อง'}), 400
+        result_file = os.path.join(OUTPUT_FOLDER, pdf_result_filename(format, job_id))
+        if not os.path.exists(result_file):
+            return jsonify({'error': 'ไม่พบไฟล์ผลลัพธ์'}), 404
+        return send_file(result_file, as_attachment=True, download_name=f'pdf_extraction_results.{format}')
     except Exception as e:
         return jsonify({'error': f'เกิดข้อผิดพลาดในการดาวน์โหลด: {str(e)}'}), 500
 
@@ -704,22 +669,29 @@ def download_pdf_results(format: str):
 def download_file(job_id: str, file_type: str):
     try:
         if file_type == 'price':
-            filename = f'Price_{job_id}.xlsx'
+            prefix = 'Price'
         elif file_type == 'type':
-            filename = f'Type_{job_id}.xlsx'
+            prefix = 'Type'
         else:
             return jsonify({'message': 'ประเภทไฟล์ไม่ถูกต้อง'}), 400
 
-        file_path = os.path.join(OUTPUT_FOLDER, filename)
-        if not os.path.exists(file_path):
+        # ?format=csv|jsonl|parquet|xlsx - ถ้าไม่ระบุจะใช้ไฟล์ที่มีอยู่ของ job นั้น
+        requested_format = request.args.get('format')
+        if requested_format and requested_format not in OUTPUT_FORMATS:
+            return jsonify({'message': 'รูปแบบไฟล์ไม่ถูกต้อง'}), 400
+
+        for output_format in ([requested_format] if requested_format else OUTPUT_FORMATS):
+            file_path = os.path.join(OUTPUT_FOLDER, output_filename(prefix, job_id, output_format))
+            if os.path.exists(file_path):
+                break
+        else:
             return jsonify({'message': 'ไม่พบไฟล์'}), 404
 
-        download_name = 'Price.xlsx' if file_type == 'price' else 'Type.xlsx'
         return send_file(
             file_path,
             as_attachment=True,
-            download_name=download_name,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            download_name=output_filename(prefix, output_format=output_format),
+            mimetype=OUTPUT_FORMATS[output_format]
         )
     except Exception as e:
         logger.error(f"Download error: {e}")
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+synthetic_pdf.py - สร้าง PDF ใบเสนอราคาสังเคราะห์สำหรับ benchmark ของ PDF mode (main3.py) และ compare mode (main4.py)
+เขียน PDF เองด้วย Python ล้วน (ฟอนต์ Helvetica มาตรฐาน ไม่ต้องมี library เพิ่ม) - ใช้แทนไฟล์ลูกค้าจริงที่แชร์ไม่ได้
+
+    quotation: ตารางแบบใบเสนอราคาจริง - แถว Product name / Order Qty (sets), header, แถว Reference Code
+               (No, Code, Wo, Ho, ..., Qty) และชุด GLASS GW/GH/Qty ตั้งแต่คอลัมน์ 12
+    order:     ใบสั่งกระจกแบบรายการ "seq ชื่อ qty W x H #D1.1" จากรายการเดียวกัน (เป้าหมายของ compare mode)
+               mismatch = สัดส่วนรายการที่ถูกแก้ qty/ขนาด หรือถูกตัดออก
+
+Example:
+    python synthetic_pdf.py quotation quote.pdf --pages 50 --rows 25 --glass-sets 2
+    python synthetic_pdf.py order order.pdf --pages 50 --rows 25 --mismatch 0.05
+    python synthetic_pdf.py text glass.txt --pages 50 --rows 25
+"""
+
+import argparse
+import random
+from typing import Dict, List, Tuple
+
+# A4 แนวนอน (pt)
+PAGE_WIDTH, PAGE_HEIGHT = 842, 595
+
+# ตารางใบเสนอราคา: 19 คอลัมน์, แถว 0-1 = Product name / Order Qty, แถว 4 = header, ข้อมูลเริ่มแถว 5
+COLUMNS = ["No", "Code", "Wo", "Ho", "Name", "AL", "GLS", "W", "H", "Spec", "", "Qty",
+           "GW", "GH", "Q", "GW", "GH", "Q", ""]
+COLUMN_WIDTH, ROW_HEIGHT = 42, 14
+HEADER_ROWS = 5
+TABLE_LEFT, TABLE_TOP = 20, 570
+MAX_ROWS = (TABLE_TOP - 20) // ROW_HEIGHT - HEADER_ROWS
+MAX_GLASS_SETS = 2
+
+# ใบสั่งกระจก: บรรทัดละรายการ
+ORDER_LINE_HEIGHT = 15
+ORDER_LINES_PER_PAGE = (PAGE_HEIGHT - 80) // ORDER_LINE_HEIGHT
+
+CODE_PREFIXES = ["D", "W", "SD", "FW"]
+NAMES = ["Sliding window", "Casement", "Fixed glass", "Swing door"]
+
+GlassItem = Tuple[str, int, int, int]  # (code, gw, gh, qty)
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _text(x: float, y: float, text: str, size: float = 6) -> str:
+    return f"BT /F1 {size} Tf {x:.2f} {y:.2f} Td ({_escape(text)}) Tj ET"
+
+
+def write_pdf(path, page_streams: List[bytes], info: Dict[str, str] = None) -> None:
+    """เขียน PDF หลายหน้า (content stream ละหน้า, ฟอนต์ Helvetica) พร้อม xref ที่ถูกต้อง"""
+    objects: List[bytes] = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    pages_id = add(b"")  # เติมทีหลังเมื่อรู้เลข object ของทุกหน้า
+    kids = []
+    for stream in page_streams:
+        content = add(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        kids.append(add(f"<< /Type /Page /Parent {pages_id} 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+                        f"/Resources << /Font << /F1 {font} 0 R >> >> /Contents {content} 0 R >>".encode()))
+    objects[pages_id - 1] = (f"<< /Type /Pages /Kids [{' '.join(f'{k} 0 R' for k in kids)}] "
+                             f"/Count {len(kids)} >>").encode()
+    catalog = add(f"<< /Type /Catalog /Pages {pages_id} 0 R >>".encode())
+    info_ref = ""
+    if info:
+        entries = " ".join(f"/{key} ({_escape(value)})" for key, value in info.items())
+        info_ref = f" /Info {add(f'<< {entries} >>'.encode())} 0 R"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for offset in offsets:
+        out += f"{offset:010d} 00000 n \n".encode()
+    out += (f"trailer\n<< /Size {len(objects) + 1} /Root {catalog} 0 R{info_ref} >>\n"
+            f"startxref\n{xref}\n%%EOF\n").encode()
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def make_quotation(pages: int = 10, rows: int = 20, glass_sets: int = 2, seed: int = 1) -> List[dict]:
+    """ข้อมูลของหน้าตารางแต่ละหน้า: product, order_qty และแถว Reference Code พร้อมชุด GLASS"""
+    if not 1 <= rows <= MAX_ROWS:
+        raise ValueError(f"rows ต้องอยู่ระหว่าง 1-{MAX_ROWS}")
+    if not 1 <= glass_sets <= MAX_GLASS_SETS:
+        raise ValueError(f"glass_sets ต้องอยู่ระหว่าง 1-{MAX_GLASS_SETS}")
+    rnd = random.Random(seed)
+    quotation = []
+    for p in range(pages):
+        prefix = rnd.choice(CODE_PREFIXES)
+        page_rows = []
+        for r in range(rows):
+            width, height = rnd.randint(500, 3000), rnd.randint(500, 3000)
+            page_rows.append({
+                "no": r + 1,
+                "code": f"{prefix}{p + 1}.{r + 1}",
+                "wo": width, "ho": height,
+                "name": rnd.choice(NAMES),
+                "al": f"AL{rnd.randint(1, 9)}",
+                "gls": f"G{rnd.choice([5, 6, 8])}",
+                "w": width - 10, "h": height - 10,
+                "spec": "S",
+                "qty": rnd.randint(1, 5),
+                "glass": [(rnd.randint(300, 2900), rnd.randint(300, 2900), rnd.randint(1, 9))
+                          for _ in range(rnd.randint(1, glass_sets))],
+            })
+        quotation.append({"product": f"PRD-{p + 1:04d}", "order_qty": rnd.randint(1, 20), "rows": page_rows})
+    return quotation
+
+
+def glass_items(quotation: List[dict]) -> List[GlassItem]:
+    """รายการกระจกตามลำดับในใบเสนอราคา (ตรงกับผล GLASS ของ main3.py)"""
+    return [(row["code"], gw, gh, qty) for page in quotation for row in page["rows"] for gw, gh, qty in row["glass"]]
+
+
+def glass_text(items: List[GlassItem]) -> str:
+    """ข้อความ TXT แบบที่ผู้ใช้วางใน compare mode: "Code GW * GH = Qty" + Total Qty"""
+    lines = [f"{code} {gw} * {gh} = {qty}" for code, gw, gh, qty in items]
+    lines.append(f"Total Qty = {sum(item[3] for item in items)}")
+    return "\n".join(lines) + "\n"
+
+
+def _quotation_page(page: dict) -> bytes:
+    n_rows = HEADER_ROWS + len(page["rows"])
+    xs = [TABLE_LEFT + c * COLUMN_WIDTH for c in range(len(COLUMNS) + 1)]
+    ys = [TABLE_TOP - r * ROW_HEIGHT for r in range(n_rows + 1)]
+    ops = ["0.5 w"]
+
+    for y in ys:
+        ops.append(f"{xs[0]} {y} m {xs[-1]} {y} l S")
+    # แถว Product name / Order Qty: label กิน 2 คอลัมน์ ค่ากิน 8 คอลัมน์ (เส้นแนวตั้งขาดช่วงเหมือนเซลล์ที่ merge)
+    header_breaks = {0, 2, 10, len(COLUMNS)}
+    for c, x in enumerate(xs):
+        top = ys[0] if c in header_breaks else ys[2]
+        ops.append(f"{x} {top} m {x} {ys[-1]} l S")
+
+    def cell(r: int, c: int, text: str) -> None:
+        ops.append(_text(xs[c] + 2, ys[r] - 10, text))
+
+    cell(0, 0, "Product name")
+    cell(0, 2, page["product"])
+    cell(1, 0, "Order Qty (sets)")
+    cell(1, 2, str(page["order_qty"]))
+    for c, title in enumerate(COLUMNS):
+        if title:
+            cell(4, c, title)
+    for i, row in enumerate(page["rows"]):
+        r = HEADER_ROWS + i
+        values = [row["no"], row["code"], row["wo"], row["ho"], row["name"], row["al"], row["gls"],
+                  row["w"], row["h"], row["spec"], "", row["qty"]]
+        for gw, gh, qty in row["glass"]:
+            values += [f"{gw:04d}", f"{gh:04d}", qty]
+        for c, value in enumerate(values):
+            if value != "":
+                cell(r, c, str(value))
+    return "\n".join(ops).encode()
+
+
+def _cover_page(number: int, quotation_number: str) -> bytes:
+    return "\n".join([
+        _text(50, 520, "QUOTATION", 18),
+        _text(50, 490, f"Quotation No. {quotation_number}", 11),
+        _text(50, 470, "Project : Synthetic Residence", 11),
+        _text(50, 450, f"Cover page {number}", 9),
+    ]).encode()
+
+
+def build_quotation_pdf(path, pages: int = 10, rows: int = 20, glass_sets: int = 2, cover_pages: int = 2,
+                        seed: int = 1) -> dict:
+    """ใบเสนอราคา: cover_pages หน้าแรกเป็นหน้าปก แล้วหน้าตารางหน้าละ 1 product"""
+    quotation = make_quotation(pages, rows, glass_sets, seed)
+    streams = [_cover_page(i + 1, f"QT-{seed:07d}") for i in range(cover_pages)]
+    streams += [_quotation_page(page) for page in quotation]
+    write_pdf(path, streams, {"Creator": "Synthetic Quotation", "Producer": "synthetic_pdf.py"})
+    items = glass_items(quotation)
+    return {"kind": "quotation", "pages": len(streams), "data_pages": pages,
+            "references": pages * rows, "glass_items": len(items)}
+
+
+def build_glass_order_pdf(path, pages: int = 10, rows: int = 20, glass_sets: int = 2, mismatch: float = 0.0,
+                          seed: int = 1) -> dict:
+    """ใบสั่งกระจกจากรายการเดียวกับ build_quotation_pdf (seed เดียวกัน) แบบบรรทัดละรายการ
+    mismatch: สัดส่วนรายการที่ถูกแก้ qty หรือขนาดเล็กน้อย หรือถูกตัดออก
+    """
+    rnd = random.Random(seed + 1)
+    items = []
+    for code, gw, gh, qty in glass_items(make_quotation(pages, rows, glass_sets, seed)):
+        if rnd.random() < mismatch:
+            change = rnd.choice(["qty", "size", "drop"])
+            if change == "drop":
+                continue
+            if change == "qty":
+                qty += 1
+            else:
+                gw += rnd.choice([-5, 5])
+        items.append((code, gw, gh, qty))
+
+    streams = []
+    for start in range(0, max(len(items), 1), ORDER_LINES_PER_PAGE):
+        ops = [_text(40, PAGE_HEIGHT - 40, f"Glass order QT-{seed:07d}", 12)]
+        y = PAGE_HEIGHT - 70
+        for seq, (code, gw, gh, qty) in enumerate(items[start:start + ORDER_LINES_PER_PAGE], start + 1):
+            ops.append(_text(40, y, f"{seq} {NAMES[seq % len(NAMES)]} {qty} {gw} x {gh} #{code}", 9))
+            y -= ORDER_LINE_HEIGHT
+        streams.append("\n".join(ops).encode())
+    write_pdf(path, streams, {"Creator": "Synthetic Glass Order", "Producer": "synthetic_pdf.py"})
+    return {"kind": "order", "pages": len(streams), "items": len(items)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetic quotation PDF generator for PDF/compare benchmarks")
+    parser.add_argument("kind", choices=["quotation", "order", "text"],
+                        help="quotation = ตาราง (main3.py), order = ใบสั่งกระจก (main4.py), text = ข้อความ TXT")
+    parser.add_argument("output")
+    parser.add_argument("--pages", type=int, default=10, help="Data pages (one product per page)")
+    parser.add_argument("--rows", type=int, default=20, help=f"Reference rows per page (max {MAX_ROWS})")
+    parser.add_argument("--glass-sets", type=int, default=2, help="Max GW/GH/Qty sets per row (1-2)")
+    parser.add_argument("--cover-pages", type=int, default=2, help="Cover pages before the tables (quotation)")
+    parser.add_argument("--mismatch", type=float, default=0.0, help="Fraction of altered/dropped items (order)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    if args.kind == "quotation":
+        info = build_quotation_pdf(args.output, args.pages, args.rows, args.glass_sets, args.cover_pages, args.seed)
+    elif args.kind == "order":
+        info = build_glass_order_pdf(args.output, args.pages, args.rows, args.glass_sets, args.mismatch, args.seed)
+    else:
+        items = glass_items(make_quotation(args.pages, args.rows, args.glass_sets, args.seed))
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(glass_text(items))
+        info = {"kind": "text", "items": len(items)}
+    print(f"✅ สร้าง {args.output}: {info}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+synthetic_xlsx.py - สร้าง workbook สังเคราะห์สำหรับ benchmark ของ matrix mode (main.py) และ joint mode (main2.py)
+ปรับได้: จำนวนชีต, ขนาด matrix, จำนวน thickness matrices, จำนวนสีใน palette,
+จำนวนตาราง/แถวใน joint mode และ used range ผิดปกติ (เซลล์ว่างที่มี format ไกลออกไป)
+
+Example:
+    python synthetic_xlsx.py matrix bench.xlsx --sheets 20 --heights 40 --widths 60 --thickness 3
+    python synthetic_xlsx.py joint joint.xlsx --tables 30 --rows 200 --far-row 1048576
+"""
+
+import argparse
+import colorsys
+import random
+from typing import List
+
+from openpyxl import Workbook
+from openpyxl.styles import PatternFill
+
+# แถว/คอลัมน์สุดท้ายของ Excel - ใช้สร้าง used range ผิดปกติ
+EXCEL_MAX_ROW = 1_048_576
+
+
+def make_palette(size: int, seed: int = 1) -> List[PatternFill]:
+    """สร้าง fill สีทึบ `size` สี (สีไม่ซ้ำกัน, ไม่มีสีขาว) - ใช้ object เดียวกันซ้ำเพื่อให้ได้ fillId เดียวกัน"""
+    rnd = random.Random(seed)
+    fills = []
+    for i in range(size):
+        hue = (i / max(size, 1) + rnd.random() * 0.01) % 1.0
+        r, g, b = colorsys.hsv_to_rgb(hue, 0.35 + 0.4 * rnd.random(), 0.75 + 0.2 * rnd.random())
+        fills.append(PatternFill("solid", fgColor=f"{int(r * 255):02X}{int(g * 255):02X}{int(b * 255):02X}"))
+    return fills
+
+
+def add_pathological_range(ws, first_row: int, n_cols: int, fill: PatternFill,
+                           styled_blank_rows: int = 0, far_row: int = 0):
+    """เซลล์ว่างที่มีแต่ format ต่อท้ายข้อมูล (เหมือนลาก format ลงไปทั้งคอลัมน์)
+
+    styled_blank_rows: จำนวนแถวว่างที่มี fill ต่อจาก first_row
+    far_row: ใส่ fill ให้เซลล์ว่างเซลล์เดียวที่แถวนี้ (ทำให้ dimension ของชีตยาวถึงแถวนั้น)
+    """
+    for r in range(first_row, first_row + styled_blank_rows):
+        for c in range(1, n_cols + 1):
+            ws.cell(r, c).fill = fill
+    if far_row:
+        ws.cell(far_row, n_cols).fill = fill
+
+
+def build_matrix_workbook(path, sheets: int = 5, heights: int = 20, widths: int = 25, thickness: int = 2,
+                          palette: int = 5, fill_ratio: float = 0.7, styled_blank_rows: int = 0,
+                          far_row: int = 0, seed: int = 1) -> dict:
+    """Workbook แบบ matrix mode: ชีตสารบัญ + ชีตละ 1 main matrix และ thickness matrices (Thk.2, Thk.3, ...)
+
+    คืนข้อมูลสรุปของ workbook ที่สร้าง
+    """
+    rnd = random.Random(seed)
+    fills = make_palette(palette, seed)
+    wb = Workbook()
+    wb.remove(wb.active)
+    wb.create_sheet("สารบัญ")["A1"] = "สารบัญ"
+
+    for s in range(sheets):
+        ws = wb.create_sheet(f"T{s + 1:03d}")
+        ws["A1"] = "Glass_QTY"
+        ws["B1"] = 1 + s % 4
+        ws["A2"] = "Description"
+        ws["B2"] = f"Synthetic type {s + 1}"
+
+        # main matrix: header "1" ที่คอลัมน์ A, width ตามแถว header, height ตามคอลัมน์ A
+        hr = 4
+        ws.cell(hr, 1, "1")
+        for j in range(widths):
+            ws.cell(hr, 2 + j, 400 + 50 * j)
+        for i in range(heights):
+            ws.cell(hr + 1 + i, 1, 400 + 50 * i)
+            for j in range(widths):
+                cell = ws.cell(hr + 1 + i, 2 + j, round(1000 + 10 * i + 7.5 * j + rnd.random() * 100, 2))
+                if rnd.random() < fill_ratio:
+                    cell.fill = rnd.choice(fills)
+
+        # thickness matrices ต่อลงไปด้านล่าง (สีอยู่ในบริเวณเดียวกับ main matrix แต่เลื่อนลง)
+        r = hr + heights + 2
+        for t in range(2, 2 + thickness):
+            ws.cell(r, 1, f"Thk.{t}")
+            for i in range(heights):
+                for j in range(widths):
+                    cell = ws.cell(r + 1 + i, 2 + j, t)
+                    if rnd.random() < fill_ratio:
+                        cell.fill = rnd.choice(fills)
+            r += heights + 2
+
+        add_pathological_range(ws, r, widths + 1, fills[0], styled_blank_rows, far_row)
+
+    wb.save(path)
+    return {"kind": "matrix", "sheets": sheets, "matrices_per_sheet": 1 + thickness}
+
+
+def build_joint_workbook(path, tables: int = 10, rows: int = 30, palette: int = 3, fill_ratio: float = 0.6,
+                         styled_blank_rows: int = 0, far_row: int = 0, seed: int = 2) -> dict:
+    """Workbook แบบ joint mode: sheet แรกมีหลายตารางวางเรียงกัน (header 2 แถว: ชื่อตาราง / W หรือ H + Price)
+    sheet ที่สองเป็น Type -> Description
+    """
+    rnd = random.Random(seed)
+    fills = make_palette(palette, seed)
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Tables"
+    desc = wb.create_sheet("Description")
+    desc["A1"] = "Type"
+    desc["B1"] = "Description"
+
+    col = 1
+    for t in range(tables):
+        name = f"J{t + 1:03d}"
+        mode = "W" if t % 2 == 0 else "H"
+        ws.cell(1, col, name)
+        ws.cell(2, col, mode)
+        ws.cell(2, col + 1, "Price")
+        n_rows = rows - rnd.randint(0, min(3, rows - 1))
+        for r in range(n_rows):
+            ws.cell(3 + r, col, 400 + 50 * r)
+            cell = ws.cell(3 + r, col + 1, round(500 + 25 * r + rnd.random() * 50, 2))
+            if rnd.random() < fill_ratio:
+                cell.fill = rnd.choice(fills)
+        desc.cell(t + 2, 1, name)
+        desc.cell(t + 2, 2, f"Synthetic joint type {t + 1}")
+        col += 3
+
+    add_pathological_range(ws, rows + 3, max(col - 1, 1), fills[0], styled_blank_rows, far_row)
+    wb.save(path)
+    return {"kind": "joint", "tables": tables}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Synthetic XLSX generator for matrix/joint benchmarks")
+    sub = parser.add_subparsers(dest="kind", required=True)
+
+    matrix = sub.add_parser("matrix", help="Matrix mode workbook (main.py)")
+    matrix.add_argument("output")
+    matrix.add_argument("--sheets", type=int, default=5)
+    matrix.add_argument("--heights", type=int, default=20, help="Rows per matrix")
+    matrix.add_argument("--widths", type=int, default=25, help="Columns per matrix")
+    matrix.add_argument("--thickness", type=int, default=2, help="Thickness matrices per sheet")
+
+    joint = sub.add_parser("joint", help="Joint mode workbook (main2.py)")
+    joint.add_argument("output")
+    joint.add_argument("--tables", type=int, default=10)
+    joint.add_argument("--rows", type=int, default=30, help="Rows per table")
+
+    for p in (matrix, joint):
+        p.add_argument("--palette", type=int, default=5, help="Number of distinct fill colors")
+        p.add_argument("--fill-ratio", type=float, default=0.7, help="Fraction of value cells with a fill")
+        p.add_argument("--styled-blank-rows", type=int, default=0,
+                       help="Formatted empty rows after the data (pathological used range)")
+        p.add_argument("--far-row", type=int, default=0,
+                       help=f"Put one formatted empty cell at this row (e.g. {EXCEL_MAX_ROW})")
+        p.add_argument("--seed", type=int, default=1)
+
+    args = parser.parse_args()
+    common = dict(palette=args.palette, fill_ratio=args.fill_ratio, styled_blank_rows=args.styled_blank_rows,
+                  far_row=args.far_row, seed=args.seed)
+    if args.kind == "matrix":
+        info = build_matrix_workbook(args.output, args.sheets, args.heights, args.widths, args.thickness, **common)
+    else:
+        info = build_joint_workbook(args.output, args.tables, args.rows, **common)
+    print(f"✅ สร้าง {args.output}: {info}")
+
+
+if __name__ == "__main__":
+    main()
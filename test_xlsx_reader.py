@@ -0,0 +1,103 @@
+"""
+test_xlsx_reader.py - sheet_fingerprint ต้องเปลี่ยนเฉพาะชีตที่ถูกแก้ (cache รายชีตของ matrix mode)
+
+    python -m pytest -q test_xlsx_reader.py
+"""
+
+import zipfile
+
+from xlsx_reader import StreamingXlsxReader
+
+MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+WORKSHEET_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"
+FILLS = {"red": "FFFF0000", "green": "FF00FF00"}
+
+
+def build_workbook(path, sheets, prefix="", fill_order=("red", "green")):
+    """workbook ที่ทุกข้อความเป็น shared string: sheets = [(name, [(ref, text, fill), ...])]
+
+    ลำดับใน sharedStrings.xml และ fills เรียงใหม่ได้ (เหมือน Excel เรียงใหม่ตอนบันทึก)
+    prefix="x:" เขียน XML แบบมี namespace prefix
+    """
+    ns = f' xmlns{":" + prefix[:-1] if prefix else ""}="{MAIN_NS}"'
+    strings = sorted({text for _, cells in sheets for _, text, _ in cells})
+    fills = "".join(f'<{prefix}fill><{prefix}patternFill patternType="solid"><{prefix}fgColor rgb="{FILLS[name]}"/>'
+                    f'</{prefix}patternFill></{prefix}fill>' for name in fill_order)
+    xfs = "".join(f'<{prefix}xf fillId="{i + 1}"/>' for i in range(len(fill_order)))
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr("xl/workbook.xml",
+                    f'<{prefix}workbook{ns} xmlns:r="{REL_NS}"><{prefix}sheets>' +
+                    "".join(f'<{prefix}sheet name="{name}" sheetId="{i + 1}" r:id="rId{i + 1}"/>'
+                            for i, (name, _) in enumerate(sheets)) +
+                    f'</{prefix}sheets></{prefix}workbook>')
+        zf.writestr("xl/_rels/workbook.xml.rels",
+                    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">' +
+                    "".join(f'<Relationship Id="rId{i + 1}" Type="{WORKSHEET_REL}" '
+                            f'Target="worksheets/sheet{i + 1}.xml"/>' for i in range(len(sheets))) +
+                    "</Relationships>")
+        zf.writestr("xl/sharedStrings.xml",
+                    f'<{prefix}sst{ns}>' + "".join(f"<{prefix}si><{prefix}t>{text}</{prefix}t></{prefix}si>"
+                                                  for text in strings) + f"</{prefix}sst>")
+        zf.writestr("xl/styles.xml",
+                    f'<{prefix}styleSheet{ns}><{prefix}fills><{prefix}fill><{prefix}patternFill patternType="none"/>'
+                    f'</{prefix}fill>{fills}</{prefix}fills><{prefix}cellXfs><{prefix}xf fillId="0"/>{xfs}'
+                    f'</{prefix}cellXfs></{prefix}styleSheet>')
+        for i, (_, cells) in enumerate(sheets):
+            rows = {}
+            for ref, text, fill in cells:
+                style = fill_order.index(fill) + 1 if fill else 0
+                rows.setdefault(int(ref[1:]), []).append(
+                    f'<{prefix}c r="{ref}" t="s" s="{style}"><{prefix}v>{strings.index(text)}</{prefix}v></{prefix}c>')
+            sheet_data = "".join(f'<{prefix}row r="{r}">{"".join(cells)}</{prefix}row>' for r, cells in sorted(rows.items()))
+            zf.writestr(f"xl/worksheets/sheet{i + 1}.xml",
+                        f"<{prefix}worksheet{ns}><{prefix}sheetData>{sheet_data}</{prefix}sheetData></{prefix}worksheet>")
+
+
+def fingerprints(path):
+    with StreamingXlsxReader(path) as reader:
+        return {name: reader.sheet_fingerprint(name) for name in reader.sheet_names}
+
+
+S1 = ("S1", [("A1", "alpha", "red"), ("B1", "beta", None)])
+S2 = ("S2", [("A1", "gamma", "green")])
+
+
+def test_editing_one_sheet_keeps_other_fingerprints(tmp_path):
+    build_workbook(tmp_path / "a.xlsx", [S1, S2])
+    before = fingerprints(tmp_path / "a.xlsx")
+    # ข้อความใหม่ใน S2 ทำให้ shared strings ทั้งไฟล์ถูกเรียงใหม่ (index ของ S1 เปลี่ยนด้วย)
+    build_workbook(tmp_path / "b.xlsx", [S1, ("S2", [("A1", "aardvark", "green")])])
+    after = fingerprints(tmp_path / "b.xlsx")
+    assert after["S1"] == before["S1"]
+    assert after["S2"] != before["S2"]
+
+
+def test_fill_change_changes_fingerprint(tmp_path):
+    build_workbook(tmp_path / "a.xlsx", [S1, S2])
+    build_workbook(tmp_path / "b.xlsx", [S1, ("S2", [("A1", "gamma", "red")])])
+    before, after = fingerprints(tmp_path / "a.xlsx"), fingerprints(tmp_path / "b.xlsx")
+    assert after["S1"] == before["S1"]
+    assert after["S2"] != before["S2"]
+
+
+def test_renumbered_styles_keep_fingerprint(tmp_path):
+    build_workbook(tmp_path / "a.xlsx", [S1, S2])
+    build_workbook(tmp_path / "b.xlsx", [S1, S2], fill_order=("green", "red"))
+    assert fingerprints(tmp_path / "a.xlsx") == fingerprints(tmp_path / "b.xlsx")
+
+
+def test_prefixed_xml(tmp_path):
+    build_workbook(tmp_path / "a.xlsx", [S1, S2], prefix="x:")
+    build_workbook(tmp_path / "b.xlsx", [S1, S2])
+    build_workbook(tmp_path / "c.xlsx", [S1, ("S2", [("A1", "WORLD", "green")])], prefix="x:")
+    prefixed, plain, edited = (fingerprints(tmp_path / f"{name}.xlsx") for name in "abc")
+    assert prefixed == plain
+    assert edited["S1"] == prefixed["S1"]
+    assert edited["S2"] != prefixed["S2"]
+
+
+def test_copied_sheet_shares_fingerprint(tmp_path):
+    build_workbook(tmp_path / "a.xlsx", [S1, ("S1 copy", S1[1])])
+    result = fingerprints(tmp_path / "a.xlsx")
+    assert result["S1"] == result["S1 copy"]
@@ -0,0 +1,538 @@
+#!/usr/bin/env python3
+"""
+xlsx_reader.py - Streaming XLSX reader สำหรับ matrix mode
+อ่าน xl/styles.xml, xl/sharedStrings.xml และ xl/worksheets/sheetN.xml ทีละไฟล์ด้วย iterparse
+(ไม่สร้าง cell object ของทุกเซลล์แบบ load_workbook)
+
+ชีตหนึ่งอ่าน 2 รอบ:
+    1. read_sheet()  - เก็บเฉพาะเซลล์ที่มีค่า คืน DataFrame แบบเดียวกับ pd.read_excel(header=None)
+    2. load_fills()  - เก็บ fillId เฉพาะบริเวณที่ต้องอ่านสี แล้วหยุดทันทีเมื่อเลยแถวสุดท้ายที่ต้องใช้
+หน่วยความจำจึงขึ้นกับขนาดของข้อมูลและ matrices ไม่ใช่ used range ของชีต
+(เช่นชีตที่มี formatting ลากไปถึงแถว 1,048,576)
+
+joint mode อ่านชีตรอบเดียว: read_sheet(..., header=[0, 1], dtype=str, with_fills=True)
+เก็บทั้งค่าและ fillId ของทุกเซลล์ในแถวที่มีค่า แล้วดูสีด้วย ws.cell_fill(row, col)
+"""
+
+import hashlib
+import io
+import posixpath
+import zipfile
+import xml.etree.ElementTree as ET
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas.errors import EmptyDataError
+from pandas.io.parsers import TextParser
+from openpyxl.styles.fills import Fill
+from openpyxl.styles.numbers import builtin_format_code, is_date_format, is_timedelta_format
+from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900, from_excel, from_ISO8601
+
+_MAIN_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+_ROW = _MAIN_NS + "row"
+_CELL = _MAIN_NS + "c"
+_VALUE = _MAIN_NS + "v"
+_INLINE = _MAIN_NS + "is"
+_TEXT = _MAIN_NS + "t"
+_RUN = _MAIN_NS + "r"
+_SHEET_DATA = _MAIN_NS + "sheetData"
+_MERGE_CELL = _MAIN_NS + "mergeCell"
+
+_DIGITS = "0123456789"
+
+
+# Region = (top_row, left_col, n_rows, n_cols) แบบ 1-based
+Region = Tuple[int, int, int, int]
+
+
+def _column_index(letters: str, _cache: Dict[str, int] = {}) -> int:
+    """แปลงตัวอักษรคอลัมน์เป็น index (1-based): A -> 1, AA -> 27"""
+    index = _cache.get(letters)
+    if index is None:
+        index = 0
+        for ch in letters:
+            index = index * 26 + (ord(ch) - 64)
+        _cache[letters] = index
+    return index
+
+
+def _split_ref(ref: str) -> Tuple[int, int]:
+    """'B12' -> (12, 2)"""
+    letters = ref.rstrip(_DIGITS)
+    return int(ref[len(letters):]), _column_index(letters.upper())
+
+
+def _range_bounds(ref: str) -> Tuple[int, int, int, int]:
+    """'A1:C3' -> (min_row, min_col, max_row, max_col)"""
+    first, _, last = ref.partition(":")
+    min_row, min_col = _split_ref(first)
+    max_row, max_col = _split_ref(last) if last else (min_row, min_col)
+    return min_row, min_col, max_row, max_col
+
+
+def _text_content(element) -> str:
+    """ข้อความของ <si>/<is>: <t> ตรงๆ + <t> ในแต่ละ run (ไม่รวม phonetic <rPh>)"""
+    snippets = []
+    plain = element.find(_TEXT)
+    if plain is not None and plain.text:
+        snippets.append(plain.text)
+    for run in element.iterfind(_RUN):
+        text = run.findtext(_TEXT)
+        if text:
+            snippets.append(text)
+    return "".join(snippets)
+
+
+def _fill_mi_header(row: list, control_row: List[bool]):
+    """forward fill แถว header ของ MultiIndex แบบเดียวกับ pandas.read_excel"""
+    last = row[0]
+    for i in range(1, len(row)):
+        if not control_row[i]:
+            last = row[i]
+        if row[i] == "" or row[i] is None:
+            row[i] = last
+        else:
+            control_row[i] = False
+            last = row[i]
+    return row, control_row
+
+
+def frame_from_rows(data: List[list], header=None, dtype=None) -> pd.DataFrame:
+    """DataFrame จากแถวของชีต (กว้างเท่ากันทุกแถว) ให้ผลเหมือน pd.read_excel(header=..., dtype=...)"""
+    if not data:
+        return pd.DataFrame()
+    if isinstance(header, (list, tuple)) and len(header) == 1:
+        header = header[0]
+    if isinstance(header, (list, tuple)):
+        data = list(data)
+        control_row = [True] * len(data[0])
+        for row in header:
+            if row > len(data) - 1:
+                raise ValueError(f"header index {row} exceeds maximum index {len(data) - 1} of data.")
+            data[row], control_row = _fill_mi_header(list(data[row]), control_row)
+    try:
+        return TextParser(data, header=header, dtype=dtype, skip_blank_lines=False).read()
+    except EmptyDataError:
+        return pd.DataFrame()
+
+
+class StreamingWorksheet:
+    """ชีตที่อ่านแบบ streaming: values (DataFrame) + fillId เฉพาะ regions ที่โหลดไว้
+
+    max_row / max_column นับจากทุก <c> ในชีต (รวมเซลล์ที่มีแต่ style) เหมือน openpyxl
+    """
+
+    def __init__(self, reader: "StreamingXlsxReader", title: str, path: str):
+        self.reader = reader
+        self.title = title
+        self.path = path
+        self.values: Optional[pd.DataFrame] = None
+        self.max_row = 1
+        self.max_column = 1
+        self.merged_ranges: List[Tuple[int, int, int, int]] = []
+        self._regions: List[Tuple[Region, np.ndarray]] = []
+        # with_fills: fillId ของทุกเซลล์ในแถวที่มีค่า (-1 = ไม่มีเซลล์ใน XML)
+        self.fill_grid: Optional[np.ndarray] = None
+
+    def fill(self, fill_id: int):
+        """openpyxl Fill object ของ fillId (ใช้กับ ColorExtractor.normalize_rgb)"""
+        return self.reader.fills[fill_id]
+
+    def cell_fill_id(self, row: int, col: int) -> int:
+        """fillId ของเซลล์ (1-based) หรือ -1 ถ้าไม่มีเซลล์ใน XML (ต้องอ่านชีตด้วย with_fills=True)"""
+        grid = self.fill_grid
+        if grid is None or not (1 <= row <= grid.shape[0] and 1 <= col <= grid.shape[1]):
+            return -1
+        return int(grid[row - 1, col - 1])
+
+    def cell_fill_ids(self, rows: np.ndarray, col: int) -> np.ndarray:
+        """fillId ของหลายแถวในคอลัมน์เดียว (1-based) - นอก grid ได้ -1"""
+        rows = np.asarray(rows, dtype=np.int64)
+        result = np.full(len(rows), -1, dtype=np.int32)
+        grid = self.fill_grid
+        if grid is None or not 1 <= col <= grid.shape[1]:
+            return result
+        inside = (rows >= 1) & (rows <= grid.shape[0])
+        result[inside] = grid[rows[inside] - 1, col - 1]
+        return result
+
+    def cell_fill(self, row: int, col: int):
+        """Fill ของเซลล์ (1-based) แบบ openpyxl read-only: เซลล์ที่ไม่มีใน XML ได้ None"""
+        fill_id = self.cell_fill_id(row, col)
+        return self.reader.fills[fill_id] if fill_id >= 0 else None
+
+    def fill_ids(self, top_row: int, left_col: int, n_rows: int, n_cols: int) -> np.ndarray:
+        """fillId ของบริเวณที่ขอ (n_rows x n_cols) - ถ้ายังไม่ได้โหลดจะอ่านชีตเพิ่มอีกรอบ"""
+        for (top, left, height, width), ids in self._regions:
+            if (top <= top_row and top_row + n_rows <= top + height
+                    and left <= left_col and left_col + n_cols <= left + width):
+                r, c = top_row - top, left_col - left
+                return ids[r:r + n_rows, c:c + n_cols]
+        self.reader.load_fills(self, [(top_row, left_col, n_rows, n_cols)])
+        return self._regions[-1][1]
+
+
+class StreamingXlsxReader:
+    """อ่าน workbook แบบ streaming - ใช้แทน pd.ExcelFile + load_workbook ใน matrix mode
+
+    Example:
+        with StreamingXlsxReader("matrix.xlsx") as reader:
+            ws = reader.read_sheet(reader.sheet_names[0])
+            reader.load_fills(ws, [(6, 3, 10, 12)])
+    """
+
+    def __init__(self, path_or_file):
+        # รับได้ทั้ง path, file-like object หรือ bytes ของไฟล์ (เช่นไฟล์ที่อัปโหลดมา)
+        if isinstance(path_or_file, (bytes, bytearray, memoryview)):
+            path_or_file = io.BytesIO(path_or_file)
+        self._zip = zipfile.ZipFile(path_or_file)
+        self._names = set(self._zip.namelist())
+        self.epoch = CALENDAR_WINDOWS_1900
+        self.sheet_names: List[str] = []
+        self._sheet_paths: Dict[str, str] = {}
+        self._shared_strings: Optional[List[str]] = None
+
+        # styles: fillId ต่อ cellXfs index และ style ที่เป็นวันที่
+        self.fills: List = []
+        self._fill_xml: List[bytes] = []
+        self._xf_fill_ids: List[int] = []
+        self._xf_format_codes: List[str] = []
+        self._date_styles = set()
+        self._timedelta_styles = set()
+
+        self._read_workbook()
+        self._read_styles()
+
+    def close(self):
+        self._zip.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # -------------------- workbook parts --------------------
+    def _open(self, name: str):
+        return self._zip.open(name)
+
+    def _read_workbook(self):
+        """อ่านรายชื่อ worksheet (ไม่รวม chartsheet) และ path ของแต่ละชีตจาก workbook.xml.rels"""
+        targets = {}
+        rels_path = "xl/_rels/workbook.xml.rels"
+        if rels_path in self._names:
+            for rel in ET.parse(self._open(rels_path)).getroot().iter(_PKG_REL_NS + "Relationship"):
+                if rel.get("Type", "").endswith("/worksheet"):
+                    target = rel.get("Target", "")
+                    path = target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join("xl", target))
+                    targets[rel.get("Id")] = path
+
+        workbook = ET.parse(self._open("xl/workbook.xml")).getroot()
+        props = workbook.find(_MAIN_NS + "workbookPr")
+        if props is not None and props.get("date1904", "").lower() in ("1", "true"):
+            self.epoch = CALENDAR_MAC_1904
+        for sheet in workbook.iter(_MAIN_NS + "sheet"):
+            path = targets.get(sheet.get(_REL_NS + "id"))
+            if path in self._names:
+                self.sheet_names.append(sheet.get("name"))
+                self._sheet_paths[sheet.get("name")] = path
+
+    def _read_styles(self):
+        """iterparse styles.xml: numFmts, fills และ cellXfs (เฉพาะ fillId/numFmtId)"""
+        if "xl/styles.xml" not in self._names:
+            return
+        custom_formats = {}
+        xf_formats = []
+        section = None
+        for event, element in ET.iterparse(self._open("xl/styles.xml"), events=("start", "end")):
+            tag = element.tag[len(_MAIN_NS):] if element.tag.startswith(_MAIN_NS) else element.tag
+            if event == "start":
+                if tag in ("numFmts", "fills", "cellXfs", "cellStyleXfs", "dxfs"):
+                    section = tag
+                continue
+            if tag == "numFmt" and section == "numFmts":
+                custom_formats[int(element.get("numFmtId"))] = element.get("formatCode")
+            elif tag == "fill" and section == "fills":
+                self.fills.append(Fill.from_tree(element))
+                self._fill_xml.append(ET.tostring(element))
+                element.clear()
+            elif tag == "xf" and section == "cellXfs":
+                self._xf_fill_ids.append(int(element.get("fillId", 0)))
+                xf_formats.append(int(element.get("numFmtId", 0)))
+                element.clear()
+            elif tag == section:
+                section = None
+
+        for idx, fmt_id in enumerate(xf_formats):
+            fmt = custom_formats.get(fmt_id) or builtin_format_code(fmt_id)
+            self._xf_format_codes.append(fmt or "")
+            if is_date_format(fmt):
+                self._date_styles.add(idx)
+            if is_timedelta_format(fmt):
+                self._timedelta_styles.add(idx)
+
+    @property
+    def shared_strings(self) -> List[str]:
+        """iterparse sharedStrings.xml ครั้งเดียวเมื่อใช้ครั้งแรก"""
+        if self._shared_strings is None:
+            strings = []
+            if "xl/sharedStrings.xml" in self._names:
+                root = None
+                for event, element in ET.iterparse(self._open("xl/sharedStrings.xml"), events=("start", "end")):
+                    if root is None:
+                        root = element
+                    if event == "end" and element.tag == _MAIN_NS + "si":
+                        strings.append(_text_content(element).replace("x005F_", ""))
+                        root.clear()
+            self._shared_strings = strings
+        return self._shared_strings
+
+    def _iter_rows(self, path: str, on_merge=None):
+        """วน <row> ของชีตทีละแถว (ลบแถวที่อ่านแล้วออกจาก tree ทันที)
+
+        Yields:
+            (row_number, row_element)
+        """
+        sheet_data = None
+        row_counter = 0
+        for event, element in ET.iterparse(self._open(path), events=("start", "end")):
+            if event == "start":
+                if element.tag == _SHEET_DATA:
+                    sheet_data = element
+                continue
+            if element.tag == _ROW:
+                r = element.get("r")
+                row_counter = int(float(r)) if r else row_counter + 1
+                yield row_counter, element
+                if sheet_data is not None:
+                    sheet_data.clear()
+            elif element.tag == _MERGE_CELL and on_merge is not None:
+                on_merge(element.get("ref"))
+
+    def header_rows(self, sheet_name: str, n_rows: int = 2) -> List[list]:
+        """ค่าของ n_rows แถวแรก (หยุดอ่านทันทีที่เลยแถวนั้น) - ใช้ตรวจชนิดของชีตโดยไม่ต้องอ่านทั้งชีต"""
+        rows = [[] for _ in range(n_rows)]
+        for row_number, row in self._iter_rows(self._sheet_paths[sheet_name]):
+            if row_number > n_rows:
+                break
+            if row_number < 1:
+                continue
+            for cell in row:
+                if cell.tag == _CELL and (cell.get("t") == "inlineStr" or cell.find(_VALUE) is not None):
+                    rows[row_number - 1].append(self._cell_value(cell))
+        return rows
+
+    # -------------------- cell values --------------------
+    def _cell_value(self, cell):
+        """ค่าของเซลล์แบบเดียวกับ openpyxl (data_only) + pandas _convert_cell"""
+        data_type = cell.get("t", "n")
+        if data_type == "inlineStr":
+            inline = cell.find(_INLINE)
+            return _text_content(inline) if inline is not None else ""
+        value = cell.findtext(_VALUE) or None
+        if value is None:
+            return ""
+        if data_type == "n":
+            number = float(value) if ("." in value or "E" in value or "e" in value) else int(value)
+            style_id = int(cell.get("s") or 0)
+            if style_id in self._date_styles:
+                try:
+                    return from_excel(number, self.epoch, timedelta=style_id in self._timedelta_styles)
+                except (OverflowError, ValueError):
+                    return np.nan
+            as_int = int(number)
+            return as_int if as_int == number else float(number)
+        if data_type == "s":
+            return self.shared_strings[int(value)]
+        if data_type == "b":
+            return bool(int(value))
+        if data_type == "e":
+            return np.nan
+        if data_type == "d":
+            return from_ISO8601(value)
+        return value
+
+    def read_sheet(self, sheet_name: str, header=None, dtype=None, with_fills: bool = False) -> StreamingWorksheet:
+        """รอบที่ 1: อ่านค่าของชีตเป็น DataFrame (เหมือน pd.read_excel(header=header, dtype=dtype))
+        เก็บเฉพาะแถวที่มีค่า - แถวที่มีแต่ formatting ไม่ถูกเก็บ
+
+        with_fills=True จะเก็บ fillId ของเซลล์ในแถวที่มีค่าไปพร้อมกัน (ws.fill_grid / ws.cell_fill)
+        โดยไม่ต้องอ่านชีตซ้ำ
+        """
+        ws = StreamingWorksheet(self, sheet_name, self._sheet_paths[sheet_name])
+        rows: Dict[int, list] = {}
+        fill_rows: Dict[int, list] = {}
+        xf_fill_ids = self._xf_fill_ids
+        max_row = max_col = 0
+        next_row = 1  # แถวที่ read-only reader ของ openpyxl คาดว่าจะเจอถัดไป
+
+        def on_merge(ref):
+            if ref:
+                ws.merged_ranges.append(_range_bounds(ref))
+
+        for row_number, row in self._iter_rows(ws.path, on_merge):
+            col_counter = 0
+            cells = []
+            for cell in row:
+                if cell.tag != _CELL:
+                    continue
+                ref = cell.get("r")
+                if ref:
+                    _, col_counter = _split_ref(ref)
+                else:
+                    col_counter += 1
+                cells.append((col_counter, cell))
+            # แถวซ้ำ/ย้อนกลับจะถูกข้ามเหมือน openpyxl read-only
+            duplicate = row_number < next_row
+            next_row = max(next_row, row_number + 1)
+            if not cells:
+                continue
+            max_row = max(max_row, row_number)
+            max_col = max(max_col, max(col for col, _ in cells))
+            if duplicate:
+                continue
+
+            # ความกว้างของแถว = คอลัมน์ของเซลล์สุดท้ายใน XML
+            width = cells[-1][0]
+            values = [""] * width
+            for col, cell in cells:
+                if col <= width and (cell.get("t") == "inlineStr" or cell.find(_VALUE) is not None):
+                    values[col - 1] = self._cell_value(cell)
+            while values and isinstance(values[-1], str) and values[-1] == "":
+                values.pop()
+            if values:
+                rows[row_number] = values
+                if with_fills:
+                    fill_rows[row_number] = [
+                        (col, xf_fill_ids[style_id] if style_id < len(xf_fill_ids) else 0)
+                        for col, style_id in ((col, int(cell.get("s") or 0)) for col, cell in cells)
+                    ]
+
+        for min_row, min_col, m_row, m_col in ws.merged_ranges:
+            if (min_row, min_col) != (m_row, m_col):
+                max_row = max(max_row, m_row)
+                max_col = max(max_col, m_col)
+        ws.max_row = max(max_row, 1)
+        ws.max_column = max(max_col, 1)
+
+        if not rows:
+            ws.values = pd.DataFrame()
+            return ws
+        last_row = max(rows)
+        width = max(len(values) for values in rows.values())
+        data = [rows.get(r, []) for r in range(1, last_row + 1)]
+        data = [values + [""] * (width - len(values)) for values in data]
+        ws.values = frame_from_rows(data, header, dtype)
+
+        if with_fills:
+            grid_width = max(col for cells in fill_rows.values() for col, _ in cells)
+            ws.fill_grid = np.full((last_row, grid_width), -1, dtype=np.int32)
+            for row_number, cells in fill_rows.items():
+                for col, fill_id in cells:
+                    ws.fill_grid[row_number - 1, col - 1] = fill_id
+        return ws
+
+    # -------------------- cell styles --------------------
+    def load_fills(self, ws: StreamingWorksheet, regions: Sequence[Region]):
+        """รอบที่ 2: อ่าน fillId เฉพาะ regions ที่ระบุ (1-based) แล้วหยุดเมื่อเลยแถวสุดท้าย
+
+        เซลล์ที่ไม่มีใน XML และเซลล์ที่ถูก merge (ยกเว้นมุมซ้ายบน) มี fillId 0 เหมือน openpyxl
+        """
+        regions = [tuple(int(v) for v in region) for region in regions if region[2] > 0 and region[3] > 0]
+        if not regions:
+            return
+        blocks = [(region, np.zeros((region[2], region[3]), dtype=np.int32)) for region in regions]
+        first_row = min(top for top, _, _, _ in regions)
+        last_row = max(top + height - 1 for top, _, height, _ in regions)
+        xf_fill_ids = self._xf_fill_ids
+
+        for row_number, row in self._iter_rows(ws.path):
+            if row_number > last_row:
+                break
+            if row_number < first_row:
+                continue
+            active = [(top, left, width, ids) for (top, left, height, width), ids in blocks
+                      if top <= row_number < top + height]
+            if not active:
+                continue
+            col_counter = 0
+            for cell in row:
+                if cell.tag != _CELL:
+                    continue
+                ref = cell.get("r")
+                if ref:
+                    _, col_counter = _split_ref(ref)
+                else:
+                    col_counter += 1
+                for top, left, width, ids in active:
+                    if left <= col_counter < left + width:
+                        style_id = int(cell.get("s") or 0)
+                        fill_id = xf_fill_ids[style_id] if style_id < len(xf_fill_ids) else 0
+                        ids[row_number - top, col_counter - left] = fill_id
+
+        # merged cells (ยกเว้นมุมซ้ายบน) ไม่มี fill
+        for min_row, min_col, max_row, max_col in ws.merged_ranges:
+            for (top, left, height, width), ids in blocks:
+                r0, r1 = max(min_row, top), min(max_row, top + height - 1)
+                c0, c1 = max(min_col, left), min(max_col, left + width - 1)
+                if r0 > r1 or c0 > c1:
+                    continue
+                anchor = ids[min_row - top, min_col - left] if (r0 == min_row and c0 == min_col) else None
+                ids[r0 - top:r1 - top + 1, c0 - left:c1 - left + 1] = 0
+                if anchor is not None:
+                    ids[min_row - top, min_col - left] = anchor
+
+        ws._regions.extend(blocks)
+
+    # -------------------- content hash --------------------
+    def _style_digest(self, style_id: int) -> str:
+        """hash ของ fill XML และ number format ที่ style id อ้างถึง (ไม่ขึ้นกับเลข index ใน styles.xml)"""
+        fill_id = self._xf_fill_ids[style_id] if style_id < len(self._xf_fill_ids) else 0
+        fill_xml = self._fill_xml[fill_id] if fill_id < len(self._fill_xml) else b""
+        fmt = self._xf_format_codes[style_id] if style_id < len(self._xf_format_codes) else ""
+        return hashlib.sha1(fill_xml + b"\x00" + fmt.encode("utf-8")).hexdigest()
+
+    def sheet_fingerprint(self, sheet_name: str) -> str:
+        """hash ของเนื้อหาชีต (ไม่รวมชื่อชีต) สำหรับ cache ผลดึงข้อมูลรายชีต
+
+        อ่านชีตด้วย iterparse (tag ตาม namespace จึงรับทั้ง <c> และ <x:c>) แล้ว hash ทีละเซลล์:
+        ตำแหน่ง, ชนิด, ค่า (shared string ใช้ข้อความจริงแทนเลข index ที่ Excel เรียงใหม่ทุกครั้งที่บันทึก),
+        fill/number format ของ style ที่เซลล์ใช้ และ merged cells
+        แก้ชีตหนึ่งจึงไม่กระทบ hash ของชีตอื่น และชีตที่ copy มา (ต่างแค่ชื่อ) ได้ hash เดียวกัน
+        """
+        digest = hashlib.sha256()
+        styles: Dict[Optional[str], str] = {}  # ค่า s="..." ของเซลล์ -> _style_digest
+        merges = []
+        for row_number, row in self._iter_rows(self._sheet_paths[sheet_name], merges.append):
+            parts = [f"r{row_number}"]
+            col_counter = 0
+            for cell in row:
+                if cell.tag != _CELL:
+                    continue
+                ref = cell.get("r")
+                if ref:
+                    _, col_counter = _split_ref(ref)
+                else:
+                    col_counter += 1
+                data_type = cell.get("t", "n")
+                if data_type == "inlineStr":
+                    inline = cell.find(_INLINE)
+                    value = _text_content(inline) if inline is not None else ""
+                else:
+                    value = cell.findtext(_VALUE) or ""
+                    if data_type == "s" and value:
+                        strings = self.shared_strings
+                        index = int(value)
+                        value = strings[index] if index < len(strings) else "\x01"
+                style = styles.get(cell.get("s"))
+                if style is None:
+                    style = styles[cell.get("s")] = self._style_digest(int(cell.get("s") or 0))
+                parts.append(f"c{col_counter}:{data_type}:{value}\x00{style}")
+            digest.update("".join(parts).encode("utf-8"))
+        digest.update(repr(merges).encode("utf-8"))
+        digest.update(str(self.epoch).encode("ascii"))
+        return digest.hexdigest()
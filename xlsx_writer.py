@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+xlsx_writer.py - Streaming XLSX writer สำหรับไฟล์ Price/Type
+เขียน sheet XML ทีละแถวลง zip โดยตรง (ไม่สร้าง DataFrame/openpyxl object model)
+ใช้หน่วยความจำคงที่ไม่ว่าจะมีกี่แถว และได้ไฟล์เหมือนเดิมทุก byte เมื่อข้อมูลเหมือนเดิม
+"""
+
+import math
+import numbers
+import re
+import zipfile
+from typing import Iterable, List, Sequence
+
+# zip entries ใช้ timestamp คงที่เพื่อให้ไฟล์ออกมาเหมือนกันทุกครั้ง
+_ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+_FLUSH_ROWS = 1000
+
+_ILLEGAL_XML_CHARS = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{sheet_name}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '</Relationships>'
+)
+
+# style 0 = ปกติ, style 1 = header ตัวหนา (เหมือน header ของ pandas.to_excel)
+_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="2">'
+    '<font><sz val="11"/><name val="Calibri"/><family val="2"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/><family val="2"/></font>'
+    '</fonts>'
+    '<fills count="2">'
+    '<fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill>'
+    '</fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="2">'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/>'
+    '</cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+_SHEET_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<sheetData>'
+)
+_SHEET_TAIL = '</sheetData></worksheet>'
+
+
+def column_letter(index: int) -> str:
+    """แปลง column index (0-based) เป็นตัวอักษรแบบ Excel: 0 -> A, 26 -> AA"""
+    letters = ""
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+def _escape(text: str) -> str:
+    text = _ILLEGAL_XML_CHARS.sub("", text)
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def _cell_xml(ref: str, value, style: str = "") -> str:
+    """สร้าง XML ของเซลล์เดียว - คืนค่าว่างสำหรับ None/NaN (ไม่เขียนเซลล์)"""
+    if value is None:
+        return ""
+    if isinstance(value, bool) or type(value).__name__ == "bool_":
+        return f'<c r="{ref}"{style} t="b"><v>{int(bool(value))}</v></c>'
+    if isinstance(value, numbers.Integral):
+        return f'<c r="{ref}"{style}><v>{int(value)}</v></c>'
+    if isinstance(value, numbers.Real):
+        value = float(value)
+        if not math.isfinite(value):
+            return ""
+        return f'<c r="{ref}"{style}><v>{value!r}</v></c>'
+    text = str(value)
+    space = ' xml:space="preserve"' if text != text.strip() else ""
+    return f'<c r="{ref}"{style} t="inlineStr"><is><t{space}>{_escape(text)}</t></is></c>'
+
+
+class StreamingXlsxWriter:
+    """เขียนไฟล์ XLSX ที่มีชีตเดียวแบบ streaming
+
+    ใช้ inline strings แทน shared strings table เพื่อไม่ต้องเก็บ string ทั้งหมดไว้ในหน่วยความจำ
+
+    Example:
+        with StreamingXlsxWriter("Price.xlsx", ["ID", "Price"]) as writer:
+            writer.write_row([1, 100])
+    """
+
+    def __init__(self, path_or_file, columns: Sequence[str], sheet_name: str = "Sheet1"):
+        self.columns = list(columns)
+        self.row_count = 0
+        self._refs = [column_letter(i) for i in range(len(self.columns))]
+        self._row_number = 0
+        self._pending: List[str] = []
+
+        self._zip = zipfile.ZipFile(path_or_file, "w")
+        self._write_entry("[Content_Types].xml", _CONTENT_TYPES)
+        self._write_entry("_rels/.rels", _ROOT_RELS)
+        self._write_entry("xl/workbook.xml", _WORKBOOK.format(sheet_name=_escape(sheet_name).replace('"', "&quot;")))
+        self._write_entry("xl/_rels/workbook.xml.rels", _WORKBOOK_RELS)
+        self._write_entry("xl/styles.xml", _STYLES)
+
+        self._sheet = self._zip.open(self._zip_info("xl/worksheets/sheet1.xml"), "w", force_zip64=True)
+        self._sheet.write(_SHEET_HEAD.encode("utf-8"))
+        if self.columns:
+            self._append_row(self.columns, ' s="1"')
+
+    def _zip_info(self, name: str) -> zipfile.ZipInfo:
+        info = zipfile.ZipInfo(name, date_time=_ZIP_DATE_TIME)
+        info.compress_type = zipfile.ZIP_DEFLATED
+        info.external_attr = 0o600 << 16
+        return info
+
+    def _write_entry(self, name: str, content: str):
+        self._zip.writestr(self._zip_info(name), content.encode("utf-8"))
+
+    def _append_row(self, values, style: str = ""):
+        self._row_number += 1
+        r = self._row_number
+        cells = "".join(
+            _cell_xml(f"{ref}{r}", value, style) for ref, value in zip(self._refs, values)
+        )
+        self._pending.append(f'<row r="{r}">{cells}</row>')
+        if len(self._pending) >= _FLUSH_ROWS:
+            self._flush()
+
+    def _flush(self):
+        if self._pending:
+            self._sheet.write("".join(self._pending).encode("utf-8"))
+            self._pending = []
+
+    def write_row(self, values: Sequence):
+        """เขียนข้อมูล 1 แถว (ลำดับค่าตาม columns)"""
+        self._append_row(values)
+        self.row_count += 1
+
+    def write_rows(self, rows: Iterable[Sequence]) -> int:
+        """เขียนหลายแถวจาก iterable ใดๆ (list, generator, itertuples)"""
+        for values in rows:
+            self.write_row(values)
+        return self.row_count
+
+    def close(self):
+        if self._zip is None:
+            return
+        self._flush()
+        self._sheet.write(_SHEET_TAIL.encode("utf-8"))
+        self._sheet.close()
+        self._zip.close()
+        self._zip = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()